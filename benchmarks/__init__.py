@@ -0,0 +1 @@
+"""性能基准：合成数据生成与各热点路径计时"""
@@ -0,0 +1,201 @@
+"""热点路径基准测试，结果以JSON输出
+
+    python -m benchmarks.run --sizes 5000,100000 --repeat 5 --output bench.json
+
+每个规模先生成（或复用）合成CSV，再分别计时：load_data（冷启动解析与快照命中，
+冷启动另计一次不限内存的整表解析作对照）、数据框紧凑化前后的内存、
+构建编码索引、侧边栏筛选链、前N菜系排名、菜系分布/统计、城市奢华排名、设施热力图，
+以及立方体能回答的组合下各汇总分别由预聚合立方体（*_cube）与逐行计算（*_rows）得到的对照。
+耗时统计不开启内存追踪；峰值内存由额外一次开启 tracemalloc 的运行测得。
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from michelin import (
+    FilterSpec,
+    build_dataset,
+    calculate_award_price_distribution,
+    calculate_city_luxury_stats,
+    calculate_cuisine_award_tables,
+    calculate_facility_prevalence,
+    count_cities,
+    file_fingerprint,
+    get_city_counts,
+    get_common_facilities,
+    get_filtered_top_cuisines_by_restaurants,
+    load_data,
+    memory_report,
+    parse_csv,
+    select,
+)
+from michelin.cube import cube_supports
+from michelin.data import CHUNK_MEMORY, SNAPSHOT_DIR
+
+from .synthetic import write_synthetic_csv
+
+DEFAULT_SIZES = [5_000, 100_000, 1_000_000, 10_000_000]
+ALL_AWARDS = ['1 Star', '2 Stars', '3 Stars', 'Bib Gourmand']
+
+def measure(func, repeat):
+    """多次计时（秒），再开启 tracemalloc 运行一次测峰值内存（字节）"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, max(0, peak - baseline), result
+
+def sidebar_specs(dataset):
+    """代表性的侧边栏组合：默认全选、大洲、城市、菜系（任一）、设施（全部）、组合条件"""
+    df = dataset.df
+    continent = df['Continent'].value_counts().index[0]
+    city = df['City'].value_counts().index[0]
+    cuisines = tuple(dataset.cuisines.vocab[i] for i in np.argsort(-dataset.cuisines.matrix.sum(axis=0))[:2])
+    facilities = tuple(dataset.facilities.vocab[i] for i in np.argsort(-dataset.facilities.matrix.sum(axis=0))[:2])
+    return [
+        FilterSpec(awards=ALL_AWARDS, price_levels=(1, 2, 3, 4)),
+        FilterSpec(continent=continent, awards=ALL_AWARDS),
+        FilterSpec(city=city, awards=ALL_AWARDS),
+        FilterSpec(awards=ALL_AWARDS, cuisines=cuisines),
+        FilterSpec(awards=ALL_AWARDS, facilities=facilities),
+        FilterSpec(continent=continent, awards=('1 Star', '2 Stars'), cuisines=cuisines[:1], price_levels=(3, 4)),
+    ]
+
+def run_size(n_rows, data_dir, repeat, seed, chunk_memory=CHUNK_MEMORY):
+    """单个规模的全部阶段"""
+    csv_path = os.path.join(data_dir, f"synthetic_{n_rows}_{seed}.csv")
+    if not os.path.exists(csv_path):
+        write_synthetic_csv(csv_path, n_rows, seed=seed)
+    fingerprint = file_fingerprint(csv_path)
+    snapshot_dir = os.path.join(data_dir, SNAPSHOT_DIR)
+    results = []
+
+    def record(stage, func, stage_repeat=repeat, rows_processed=n_rows):
+        timings, peak, result = measure(func, stage_repeat)
+        median = statistics.median(timings)
+        results.append({
+            'rows': n_rows,
+            'stage': stage,
+            'repeat': stage_repeat,
+            'seconds': {'min': min(timings), 'median': median, 'max': max(timings)},
+            'rows_per_second': rows_processed / median if median > 0 else None,
+            'peak_memory_bytes': peak,
+        })
+        return result
+
+    def cold_load(memory=chunk_memory):
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        return load_data(csv_path, fingerprint, memory)
+
+    # 冷启动只计少量次数，大规模时解析本身就很耗时
+    record('load_data_cold_unbounded', lambda: cold_load(None), stage_repeat=1)
+    record('load_data_cold', cold_load, stage_repeat=1)
+    df = record('load_data_snapshot', lambda: load_data(csv_path, fingerprint, chunk_memory))
+
+    # 紧凑类型前后的数据框内存（不计时）
+    report = memory_report(parse_csv(csv_path), df)
+    results.append({
+        'rows': n_rows,
+        'stage': 'frame_memory',
+        'bytes_before': int(report.loc['Total', 'before']),
+        'bytes_after': int(report.loc['Total', 'after']),
+    })
+    dataset = record('build_dataset', lambda: build_dataset(df, fingerprint))
+
+    specs = sidebar_specs(dataset)
+    record('filter_chain', lambda: [dataset.df.take(select(dataset, spec)) for spec in specs],
+           rows_processed=n_rows * len(specs))
+
+    rows = select(dataset, specs[0])
+    top_cuisines = record('top_cuisines', lambda: get_filtered_top_cuisines_by_restaurants(dataset, rows, 30))
+    record('cuisine_award_tables', lambda: calculate_cuisine_award_tables(dataset, rows, top_cuisines, ALL_AWARDS))
+    record('city_luxury', lambda: calculate_city_luxury_stats(dataset, rows))
+
+    def facility_heatmap():
+        common = get_common_facilities(dataset, rows, 15)
+        calculate_facility_prevalence(dataset, rows, common, by='Award')
+        calculate_facility_prevalence(dataset, rows, common, by='Price_level')
+
+    record('facility_heatmap', facility_heatmap)
+
+    # 立方体对照：只取立方体能回答的组合，两条路径都从已选好的行号出发（立方体另需选出单元格）
+    cube_cases = [(spec, select(dataset, spec)) for spec in specs if cube_supports(spec)]
+    aggregates = {
+        'count_cities': lambda rows, spec: count_cities(dataset, rows, spec),
+        'city_counts': lambda rows, spec: get_city_counts(dataset, rows, spec),
+        'award_price_distribution': lambda rows, spec: calculate_award_price_distribution(dataset, rows, spec),
+        'common_facilities': lambda rows, spec: get_common_facilities(dataset, rows, 15, spec),
+        'cuisine_award_tables': lambda rows, spec: calculate_cuisine_award_tables(dataset, rows, top_cuisines, ALL_AWARDS, spec),
+    }
+    for name, aggregate in aggregates.items():
+        for path in ('rows', 'cube'):
+            record(f'{name}_{path}',
+                   lambda: [aggregate(rows, spec if path == 'cube' else None) for spec, rows in cube_cases],
+                   rows_processed=n_rows * len(cube_cases))
+    return results
+
+def max_rss_bytes():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="米其林看板热点路径基准测试")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="逗号分隔的行数列表")
+    parser.add_argument('--repeat', type=int, default=5, help="每个阶段的计时次数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default='.bench_data', help="合成CSV及其快照的目录（可复用）")
+    parser.add_argument('--chunk-memory-mb', type=int, default=CHUNK_MEMORY >> 20,
+                        help="流式加载每块的工作内存上限（MB）")
+    parser.add_argument('--output', help="结果JSON路径，缺省输出到标准输出")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = []
+    for n_rows in [int(size) for size in args.sizes.split(',') if size]:
+        print(f"benchmarking {n_rows:,} rows ...", file=sys.stderr)
+        results.extend(run_size(n_rows, args.data_dir, args.repeat, args.seed, args.chunk_memory_mb << 20))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'max_rss_bytes': max_rss_bytes(),
+            'chunk_memory_bytes': args.chunk_memory_mb << 20,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+if __name__ == '__main__':
+    main()
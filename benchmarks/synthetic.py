@@ -0,0 +1,178 @@
+"""合成米其林数据集：列与 cleaned.csv 一致，菜系/设施的基数与列表长度接近真实数据"""
+import os
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['Name', 'Address', 'Location', 'Price', 'Cuisine', 'Longitude', 'Latitude',
+           'Award', 'FacilitiesAndServices', 'Description', 'Price_level']
+
+# 国家 -> (货币符号, 大致中心坐标)；包含大洲映射之外的国家，与真实数据一样会出现缺失大洲
+COUNTRIES = {
+    'France': ('€', 46.6, 2.4), 'Japan': ('¥', 36.2, 138.3), 'USA': ('$', 39.8, -98.6),
+    'Germany': ('€', 51.2, 10.4), 'Italy': ('€', 42.8, 12.6), 'Spain': ('€', 40.4, -3.7),
+    'United Kingdom': ('£', 53.0, -1.5), 'China Mainland': ('¥', 31.2, 116.4),
+    'Switzerland': ('CHF', 46.8, 8.2), 'Belgium': ('€', 50.5, 4.5), 'Taiwan': ('$', 23.7, 121.0),
+    'Hong Kong': ('$', 22.3, 114.2), 'Netherlands': ('€', 52.1, 5.3), 'Thailand': ('฿', 15.9, 100.9),
+    'Singapore': ('$', 1.35, 103.8), 'Canada': ('$', 56.1, -106.3), 'Portugal': ('€', 39.4, -8.2),
+    'Malaysia': ('RM', 4.2, 101.9), 'Brazil': ('$', -14.2, -51.9), 'Ireland': ('€', 53.4, -8.2),
+    'South Korea': ('₩', 36.5, 127.8), 'Denmark': ('kr', 56.3, 9.5), 'Austria': ('€', 47.5, 14.6),
+    'Sweden': ('kr', 60.1, 18.6), 'Argentina': ('$', -38.4, -63.6), 'Mexico': ('$', 23.6, -102.6),
+    'Australia': ('$', -25.3, 133.8), 'New Zealand': ('$', -40.9, 174.9),
+}
+# 按真实数据的国家分布加权（长尾国家权重较低）
+COUNTRY_WEIGHTS = np.array([746, 650, 596, 444, 376, 333, 294, 242, 206, 186, 181, 143, 143, 136,
+                            130, 60, 51, 50, 46, 38, 35, 27, 21, 22, 14, 12, 10, 8], dtype=float)
+
+CUISINE_NAMES = [
+    'Modern Cuisine', 'Creative', 'Japanese', 'French', 'Italian', 'Contemporary', 'Classic Cuisine',
+    'Traditional Cuisine', 'Cantonese', 'Spanish', 'Sushi', 'Market Cuisine', 'Seafood', 'Regional Cuisine',
+    'Mediterranean Cuisine', 'Country cooking', 'Chinese', 'Thai', 'Tempura', 'Asian', 'Korean',
+    'Steakhouse', 'Vegetarian', 'Fusion', 'Mexican', 'Indian', 'Peruvian', 'Portuguese', 'Teppanyaki',
+    'Kaiseki', 'Noodles', 'Street Food', 'Dim Sum', 'Taiwanese', 'Vietnamese', 'Malaysian', 'Nordic',
+    'Farm to table', 'Grills', 'Basque',
+]
+FACILITY_NAMES = [
+    'Air conditioning', 'Terrace', 'Wheelchair access', 'Car park', 'Interesting wine list',
+    'Counter dining', 'Great view', 'Garden or park', 'Private dining room', 'Valet parking',
+    'Restaurant offering vegetarian menus', 'Brunch', 'Notable sake list', 'Notable cocktail list',
+    'Shoes must be removed', 'Bring your own bottle', 'Cash only', 'Booking essential',
+    'Credit card / Debit card accepted', 'Mastercard credit card', 'Visa credit card',
+    'American Express credit card', 'Mobile payments', 'Dog friendly', 'Small plates', 'Chef\'s table',
+    'Open kitchen', 'Seasonal menu', 'Tasting menu', 'Non-smoking', 'Pet friendly', 'Accommodation',
+    'Lunch only', 'Dinner only', 'Takeaway', 'Live music', 'Fireplace', 'Lake view', 'Sea view',
+    'Late night',
+]
+AWARDS = ['Bib Gourmand', '1 Star', '2 Stars', '3 Stars']
+AWARD_WEIGHTS = np.array([0.499, 0.385, 0.089, 0.027])
+# 各评级下的价格等级分布（星级越高越贵）
+PRICE_BY_AWARD = np.array([
+    [0.15, 0.70, 0.12, 0.03],
+    [0.01, 0.15, 0.10, 0.74],
+    [0.00, 0.02, 0.05, 0.93],
+    [0.00, 0.01, 0.02, 0.97],
+])
+
+def _zipf_weights(n, exponent=1.1):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+def _vocabulary(base_names, size, prefix):
+    """真实名称不够时补充合成名称"""
+    names = list(base_names)
+    names += [f"{prefix} {i}" for i in range(size - len(names))]
+    return np.array(names[:size], dtype=object)
+
+def _join_lists(vocab, picks, lengths, sep):
+    """按行拼接前 length 个取值（对象数组逐列相加，避免逐行Python循环）"""
+    joined = vocab[picks[:, 0]]
+    for j in range(1, picks.shape[1]):
+        joined = joined + np.where(lengths > j, sep + vocab[picks[:, j]], '')
+    return np.where(lengths > 0, joined, None)
+
+def _words(rng, size):
+    syllables = np.array(['ka', 'ro', 'mi', 'te', 'sa', 'lu', 'ne', 'po', 'ri', 'va', 'de', 'chi',
+                          'or', 'an', 'el', 'is', 'um', 'tra', 'gel', 'bro'], dtype=object)
+    words = syllables[rng.integers(0, len(syllables), size)]
+    for _ in range(2):
+        words = words + np.where(rng.random(size) < 0.7, syllables[rng.integers(0, len(syllables), size)], '')
+    return pd.unique(words)
+
+class SyntheticGenerator:
+    """可复现的合成数据生成器；城市数随行数增长（上限 max_cities）"""
+
+    def __init__(self, seed=0, n_cuisines=180, n_facilities=40, max_cities=2000, sentence_pool=3000):
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.cuisines = _vocabulary(CUISINE_NAMES, n_cuisines, 'Regional Cuisine')
+        self.facilities = _vocabulary(FACILITY_NAMES, n_facilities, 'Facility')
+        self.max_cities = max_cities
+        
+        # 描述文本：从句子池中抽取拼接，保证词频分布有长尾
+        words = _words(rng, 20000)
+        word_weights = _zipf_weights(len(words))
+        lengths = rng.integers(8, 20, sentence_pool)
+        sentences = []
+        for length in lengths:
+            sentence = ' '.join(rng.choice(words, size=length, p=word_weights))
+            sentences.append(sentence.capitalize() + '.')
+        self.sentences = np.array(sentences, dtype=object)
+
+    def cities(self, n_rows):
+        """城市表：(城市名, 国家, 纬度, 经度)"""
+        rng = np.random.default_rng(self.seed + 1)
+        n_cities = int(min(self.max_cities, max(40, n_rows // 5)))
+        countries = list(COUNTRIES)
+        weights = COUNTRY_WEIGHTS / COUNTRY_WEIGHTS.sum()
+        country_idx = rng.choice(len(countries), size=n_cities, p=weights)
+        rows = []
+        for i, c in enumerate(country_idx):
+            _, lat, lon = COUNTRIES[countries[c]]
+            rows.append((f"{countries[c]} City {i}", countries[c], lat + rng.normal(0, 3), lon + rng.normal(0, 3)))
+        return pd.DataFrame(rows, columns=['City', 'Country', 'Lat', 'Lon'])
+
+    def generate(self, n_rows, start=0, cities=None):
+        """生成第 start 行起的 n_rows 行（分块生成时各块互不重复）"""
+        rng = np.random.default_rng([self.seed, start])
+        if cities is None:
+            cities = self.cities(start + n_rows)
+        
+        # 城市热度也服从长尾分布
+        city_idx = rng.choice(len(cities), size=n_rows, p=_zipf_weights(len(cities), 0.8))
+        city = cities['City'].to_numpy(dtype=object)[city_idx]
+        country = cities['Country'].to_numpy(dtype=object)[city_idx]
+        
+        award_idx = rng.choice(len(AWARDS), size=n_rows, p=AWARD_WEIGHTS)
+        cumulative = PRICE_BY_AWARD.cumsum(axis=1)[award_idx]
+        price_level = (rng.random(n_rows)[:, None] > cumulative).sum(axis=1) + 1
+        price_level = np.minimum(price_level, 4)
+        currency = np.array([COUNTRIES[c][0] for c in country], dtype=object)
+        
+        # 菜系：1~3个，多数为1个
+        cuisine_lengths = rng.choice([1, 2, 3], size=n_rows, p=[0.70, 0.28, 0.02])
+        cuisine_picks = rng.choice(len(self.cuisines), size=(n_rows, 3), p=_zipf_weights(len(self.cuisines)))
+        # 设施：平均约4项
+        facility_lengths = np.minimum(rng.poisson(4.0, n_rows), 12)
+        facility_picks = rng.choice(len(self.facilities), size=(n_rows, 12), p=_zipf_weights(len(self.facilities), 0.9))
+        
+        sentence_count = rng.integers(3, 7, n_rows)
+        sentence_picks = rng.integers(0, len(self.sentences), size=(n_rows, 6))
+        
+        # 约5%的餐厅缺少坐标
+        lat = cities['Lat'].to_numpy()[city_idx] + rng.normal(0, 0.05, n_rows)
+        lon = cities['Lon'].to_numpy()[city_idx] + rng.normal(0, 0.05, n_rows)
+        missing = rng.random(n_rows) < 0.05
+        lat[missing] = np.nan
+        lon[missing] = np.nan
+        
+        ids = np.arange(start, start + n_rows).astype(str).astype(object)
+        street_numbers = rng.integers(1, 400, n_rows).astype(str).astype(object)
+        return pd.DataFrame({
+            'Name': 'Restaurant ' + ids,
+            'Address': street_numbers + ' Main Street ' + ids + ', ' + city + ', ' + country,
+            'Location': city + ', ' + country,
+            'Price': np.array([c * p for c, p in zip(currency, price_level)], dtype=object),
+            'Cuisine': _join_lists(self.cuisines, cuisine_picks, cuisine_lengths, ', '),
+            'Longitude': lon,
+            'Latitude': lat,
+            'Award': np.array(AWARDS, dtype=object)[award_idx],
+            'FacilitiesAndServices': _join_lists(self.facilities, facility_picks, facility_lengths, ','),
+            'Description': _join_lists(self.sentences, sentence_picks, sentence_count, ' '),
+            'Price_level': price_level,
+        }, columns=COLUMNS)
+
+def generate_restaurants(n_rows, seed=0):
+    """一次性生成 n_rows 行合成数据"""
+    return SyntheticGenerator(seed).generate(n_rows)
+
+def write_synthetic_csv(path, n_rows, seed=0, chunk_rows=500_000):
+    """分块写出合成CSV，内存占用与块大小相关而与总行数无关"""
+    generator = SyntheticGenerator(seed)
+    cities = generator.cities(n_rows)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        for start in range(0, n_rows, chunk_rows):
+            chunk = generator.generate(min(chunk_rows, n_rows - start), start=start, cities=cities)
+            chunk.to_csv(f, index=False, header=(start == 0))
+    os.replace(tmp_path, path)
+    return path
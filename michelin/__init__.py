@@ -0,0 +1,50 @@
+"""米其林餐厅分析核心：不依赖Streamlit/Plotly，可在批处理或工作进程中直接使用
+
+    from michelin import load_dataset, FilterSpec, select, get_cuisine_ranking
+
+    dataset = load_dataset('cleaned.csv')
+    rows = select(dataset, FilterSpec(continent='Europe', awards=('1 Star',)))
+    ranking = get_cuisine_ranking(dataset, rows)
+"""
+from .data import (
+    DATA_PATH,
+    Dataset,
+    MultiHot,
+    InvertedIndex,
+    build_dataset,
+    compact_frame,
+    derive_columns,
+    encode_multi_hot,
+    file_fingerprint,
+    load_data,
+    load_dataset,
+    membership_matrix,
+    memory_report,
+    parse_csv,
+)
+from .filters import FilterSpec, filter_bitmap, filter_frame, select
+from .autocomplete import TrigramIndex, build_trigram_index
+from .search import SearchIndex, build_search_index, rank_rows
+from .similar import SimilarityIndex, build_similarity_index, similar_rows
+from .spatial import SpatialIndex, build_spatial_index, haversine_km
+from .cache import ResultCache, cache_key
+from .cube import AggregateCube, build_cube, update_cube
+from .ingest import apply_delta, ingest_delta, read_delta, replay_delta_log
+from .table import PAGE_SIZES, SORT_COLUMNS, page_count, page_rows, sort_order
+from .timing import LatencyRecorder, StageTimer
+from .analytics import (
+    STAR_AWARDS,
+    STAR_AWARD_SCORES,
+    calculate_award_price_distribution,
+    calculate_city_luxury_stats,
+    calculate_cuisine_award_tables,
+    calculate_facility_prevalence,
+    count_cities,
+    get_city_counts,
+    get_common_facilities,
+    get_cuisine_ranking,
+    get_filtered_top_cuisines_by_restaurants,
+    get_top_cuisines_by_restaurants,
+    get_unique_cuisines,
+    get_unique_facilities,
+)
@@ -0,0 +1,202 @@
+"""分析计算：菜系排名与分布、星级价格分布、城市奢华排名、设施普及率
+
+所有函数接收数据集和行号（见 filters.select），返回 DataFrame 或列表。
+可选的 spec 为产生这些行号的筛选条件：条件只涉及立方体维度时，计数直接由预聚合立方体求和得到。
+"""
+import numpy as np
+import pandas as pd
+
+from .cube import cross_counts, cube_supports, dimension_counts, select_cells
+from .data import membership_matrix
+
+# 星级评级对应的评分
+STAR_AWARD_SCORES = {'1 Star': 1, '2 Stars': 2, '3 Stars': 3}
+STAR_AWARDS = list(STAR_AWARD_SCORES)
+
+def get_unique_cuisines(dataset):
+    """获取去重后的唯一菜系列表（多热编码的词表，排序后返回）"""
+    return sorted(dataset.cuisines.vocab)
+
+def get_unique_facilities(dataset):
+    """获取去重后的唯一设施列表"""
+    return sorted(dataset.facilities.vocab)
+
+def get_cuisine_ranking(dataset, rows):
+    """多热矩阵按列求和得到完整菜系排名，并列时按首次出现的先后排序"""
+    encoding = dataset.cuisines
+    members = encoding.matrix[rows]
+    if len(members) == 0:
+        return pd.DataFrame({'Cuisine': pd.Series(dtype=object), 'Restaurant_Count': pd.Series(dtype=np.int64)})
+    counts = members.sum(axis=0)
+    first_seen = members.argmax(axis=0)
+    order = np.lexsort((first_seen, -counts))
+    order = order[counts[order] > 0]
+    return pd.DataFrame({
+        'Cuisine': [encoding.vocab[i] for i in order],
+        'Restaurant_Count': counts[order]
+    })
+
+def get_top_cuisines_by_restaurants(dataset, top_n=10):
+    """获取基于餐厅数量的前N大菜系（全部数据）"""
+    return get_filtered_top_cuisines_by_restaurants(dataset, dataset.live_rows(), top_n)
+
+def get_filtered_top_cuisines_by_restaurants(dataset, rows, top_n=10):
+    """基于筛选后的数据获取前N大菜系"""
+    return get_cuisine_ranking(dataset, rows)['Cuisine'].head(top_n).tolist()
+
+def calculate_cuisine_award_tables(dataset, rows, top_cuisines_list, selected_awards, spec=None):
+    """单次分组聚合：菜系成员矩阵与评级独热矩阵相乘，同时得到分布表和统计表
+
+    条件可由立方体回答时，改用单元格的菜系计数（单元格内评级、价格等级相同）。
+    """
+    top_cuisines_list = list(top_cuisines_list)
+    selected_awards = list(selected_awards)
+    cells = _cube_cells(dataset, spec)
+    if cells is not None:
+        counts, price_total, price_count = _cube_cuisine_totals(dataset, cells, top_cuisines_list, selected_awards)
+    else:
+        # 行×菜系 与 行×评级 的指示矩阵
+        cuisine_members = membership_matrix(dataset.cuisines, rows, top_cuisines_list).astype(np.int64)
+        awards = dataset.column('Award', rows)
+        award_onehot = np.column_stack([awards == award for award in selected_awards]).astype(np.int64) if selected_awards else np.zeros((len(rows), 0), dtype=np.int64)
+        
+        # 菜系×评级 计数
+        counts = cuisine_members.T @ award_onehot
+        
+        # 价格等级之和与有价格的餐厅数（基于所有选中评级的餐厅，忽略缺失值）
+        price = dataset.column('Price_level', rows).astype(float)
+        has_price = ~np.isnan(price)
+        price_total = cuisine_members.T @ np.where(has_price, price, 0.0)
+        price_count = cuisine_members.T @ has_price.astype(np.int64)
+    
+    # 分布表：按菜系、评级顺序展开非零单元格
+    cuisine_idx, award_idx = np.nonzero(counts)
+    if len(cuisine_idx) == 0:
+        return pd.DataFrame(), pd.DataFrame()
+    distribution_df = pd.DataFrame({
+        'Cuisine': [top_cuisines_list[i] for i in cuisine_idx],
+        'Award': [selected_awards[j] for j in award_idx],
+        'Count': counts[cuisine_idx, award_idx]
+    })
+    
+    # 统计表：总数、有星级数量、加权星级评分（只基于选中的星级评级）
+    award_scores = np.array([STAR_AWARD_SCORES.get(award, 0) for award in selected_awards], dtype=np.int64)
+    restaurant_count = counts.sum(axis=1)
+    starred_count = counts[:, award_scores > 0].sum(axis=1)
+    total_score = counts @ award_scores
+    avg_award_score = np.divide(total_score, starred_count, out=np.zeros(len(starred_count)), where=starred_count > 0)
+    
+    # 平均价格等级
+    avg_price_level = np.divide(price_total, price_count, out=np.zeros(len(price_count)), where=price_count > 0)
+    
+    present = restaurant_count > 0
+    stats_df = pd.DataFrame({
+        'Cuisine': [cuisine for cuisine, keep in zip(top_cuisines_list, present) if keep],
+        'Restaurant_Count': restaurant_count[present],
+        'Avg_Price_Level': avg_price_level[present],
+        'Starred_Count': starred_count[present],
+        'Avg_Award_Score': avg_award_score[present]
+    })
+    
+    return distribution_df, stats_df
+
+def _cube_cells(dataset, spec):
+    """筛选条件可由立方体回答时返回满足条件的单元格，否则返回None"""
+    if spec is None or dataset.cube is None or not cube_supports(spec):
+        return None
+    return select_cells(dataset.cube, spec)
+
+def _cube_cuisine_totals(dataset, cells, cuisines, awards):
+    """由单元格的菜系计数得到 菜系×评级 计数，以及各菜系的价格等级之和与有价格的餐厅数"""
+    cube = dataset.cube
+    cols = [dataset.cuisines.position.get(cuisine) for cuisine in cuisines]
+    members = np.zeros((len(cells), len(cuisines)), dtype=np.int64)
+    known = [i for i, col in enumerate(cols) if col is not None]
+    if known:
+        members[:, known] = cube.cuisine_counts.take(cells, [cols[i] for i in known])
+    by_award = dimension_counts(cube, cells, 'Award', members)
+    counts = by_award.reindex(awards, fill_value=0).to_numpy().T
+    price_codes = cube.codes['Price_level'][cells]
+    has_price = price_codes >= 0
+    price = np.asarray(cube.labels['Price_level'] + [0], dtype=float)[price_codes]
+    return counts, members.T @ np.where(has_price, price, 0.0), members.T @ has_price.astype(np.int64)
+
+def count_cities(dataset, rows, spec=None):
+    """覆盖城市数"""
+    cells = _cube_cells(dataset, spec)
+    if cells is not None:
+        return int((dimension_counts(dataset.cube, cells, 'City') > 0).sum())
+    return pd.Series(dataset.column('City', rows)).nunique()
+
+def get_city_counts(dataset, rows, spec=None):
+    """各城市餐厅数量（降序，数量相同时按城市名）"""
+    cells = _cube_cells(dataset, spec)
+    if cells is not None:
+        counts = dimension_counts(dataset.cube, cells, 'City')
+    else:
+        counts = pd.Series(dataset.column('City', rows)).value_counts()
+    city_counts = counts[counts > 0].rename_axis('City').reset_index(name='Count')
+    return city_counts.sort_values(['Count', 'City'], ascending=[False, True], ignore_index=True)
+
+def calculate_award_price_distribution(dataset, rows, spec=None):
+    """星级 × 价格等级 的行内占比(%)，只保留有数据的星级"""
+    cells = _cube_cells(dataset, spec)
+    if cells is not None:
+        counts = cross_counts(dataset.cube, cells, 'Award', 'Price_level')
+    else:
+        counts = pd.crosstab(
+            pd.Series(dataset.column('Award', rows), name='Award'),
+            pd.Series(dataset.column('Price_level', rows), name='Price_level')
+        )
+    award_price_cross = counts.div(counts.sum(axis=1), axis=0).round(4) * 100  # 转换为百分比
+    return award_price_cross.loc[award_price_cross.sum(axis=1) > 0]
+
+def calculate_city_luxury_stats(dataset, rows, luxury_level=4, min_restaurants=2):
+    """各城市奢华餐厅（指定价格等级）占比，按占比降序；过滤餐厅数过少的城市"""
+    city_stats = pd.DataFrame({
+        'City': dataset.column('City', rows),
+        'is_luxury': dataset.column('Price_level', rows) == luxury_level
+    }).groupby('City').agg(
+        total_restaurants=('is_luxury', 'size'),
+        luxury_count=('is_luxury', 'sum')
+    )
+    city_stats['luxury_ratio'] = (city_stats['luxury_count'] / city_stats['total_restaurants'] * 100).round(2)
+    city_stats = city_stats[city_stats['total_restaurants'] >= min_restaurants]
+    return city_stats.sort_values('luxury_ratio', ascending=False, kind='stable')
+
+def get_common_facilities(dataset, rows, top_n=15, spec=None):
+    """多热矩阵（或立方体单元格的设施计数）按列求和，取前N热门设施"""
+    encoding = dataset.facilities
+    cells = _cube_cells(dataset, spec)
+    if cells is not None:
+        counts = dataset.cube.facility_counts.take(cells).sum(axis=0)
+    else:
+        counts = encoding.matrix[rows].sum(axis=0)
+    order = np.argsort(-counts, kind='stable')
+    order = order[counts[order] > 0][:top_n]
+    return [encoding.vocab[i] for i in order]
+
+def calculate_facility_prevalence(dataset, rows, facilities, by='Award', levels=None):
+    """设施在各评级/价格等级中的普及率(%)及计数
+
+    只统计至少具备一项所给设施的餐厅。设施指示矩阵转置 × 评级/价格独热矩阵
+    一次得到计数，再除以各列餐厅总数。levels 默认为三个星级，或出现过的价格等级。
+    """
+    facilities = list(facilities)
+    members = membership_matrix(dataset.facilities, rows, facilities)
+    has_facility = members.any(axis=1)
+    members = members[has_facility]
+    level_values = dataset.column(by, rows)[has_facility]
+    
+    if levels is None:
+        levels = STAR_AWARDS if by == 'Award' else sorted(pd.Series(level_values).dropna().unique().astype(int))
+    levels = list(levels)
+    
+    level_onehot = np.column_stack([level_values == level for level in levels]).astype(np.int64) if levels else np.zeros((len(members), 0), dtype=np.int64)
+    counts = members.T.astype(np.int64) @ level_onehot
+    totals = level_onehot.sum(axis=0)
+    prevalence = np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0) * 100
+    return (
+        pd.DataFrame(prevalence, index=facilities, columns=levels),
+        pd.DataFrame(counts, index=facilities, columns=levels)
+    )
@@ -0,0 +1,199 @@
+"""名称/地址/城市的容错自动补全：字符三元组倒排索引
+
+每个 (字段, 取值) 是一个条目，条目文本经去重音、小写化并把非字母数字折叠为空格后，
+前补两个空格、后补一个空格切成字符三元组。查询只在前面补空格，因此输入前缀也能完整命中。
+候选按“查询三元组被覆盖的比例”排序，相同时按 Jaccard 相似度，拼写错误只损失少数三元组。
+"""
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+
+from .buffers import extended
+from .search import fold_array
+
+AUTOCOMPLETE_FIELDS = ['Name', 'Address', 'City']
+MIN_COVERAGE = 0.5   # 候选至少覆盖查询三元组的比例
+# 增量缓冲区超过该三元组数且超过索引规模的该比例时，整体重建倒排表
+MIN_MERGE_TRIGRAMS = 50_000
+MERGE_RATIO = 0.05
+
+def fold_text(values):
+    """规范化文本：去重音、小写，非字母数字折叠为单个空格；缺失值为空字符串"""
+    text = pc.replace_substring_regex(fold_array(values), r'[^\p{L}\p{N}]+', ' ')
+    return [value or '' for value in pc.utf8_trim_whitespace(text).to_pylist()]
+
+def trigram_pairs(texts, trail=' '):
+    """文本列表 -> (文本序号, 三元组编码)，按编码、序号排序且同一文本内去重
+
+    三个字符的码点（均小于2^21）拼成一个int64编码，整个过程在码点数组上向量化完成。
+    """
+    padded = [f"  {text}{trail}" for text in texts]
+    lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+    chars = np.frombuffer(''.join(padded).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    # 三元组起点需距所在文本末尾至少三个字符
+    ends = np.repeat(np.cumsum(lengths), lengths)
+    positions = np.flatnonzero(np.arange(len(chars)) + 3 <= ends)
+    owners = np.repeat(np.arange(len(padded)), lengths)[positions]
+    codes = (chars[positions] << 42) | (chars[positions + 1] << 21) | chars[positions + 2]
+    # owners 本身有序，按编码稳定排序即得到 (编码, 序号) 顺序
+    order = np.argsort(codes, kind='stable')
+    owners, codes = owners[order], codes[order]
+    keep = np.ones(len(codes), dtype=bool)
+    keep[1:] = (codes[1:] != codes[:-1]) | (owners[1:] != owners[:-1])
+    return owners[keep], codes[keep]
+
+@dataclass
+class TrigramIndex:
+    """三元组 -> 条目 的倒排表（编码升序，indptr 给出各三元组的区间）
+
+    增量追加的条目先放在缓冲区 extra_* 中（按编码排序），累积到一定规模后再并入倒排表。
+    live_counts 为各条目对应的有效行数，已全部删除的条目不再出现在补全结果中。
+    labels、lookup 与各版本共享并只追加，本版本的条目数为 len(sizes)；每行条目写入只追加缓冲区。
+    """
+    labels: list                 # 条目 -> (字段, 取值)
+    lookup: dict                 # (字段, 取值) -> 条目
+    codes: np.ndarray
+    indptr: np.ndarray
+    entries: np.ndarray
+    sizes: np.ndarray            # 各条目的三元组数
+    live_counts: np.ndarray
+    row_entries: dict            # 字段 -> 每行对应的条目（缺失值为-1）
+    extra_codes: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    extra_entries: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    _buffers: dict = field(default_factory=dict, repr=False)  # row_entries、sizes 所在的只追加缓冲区
+
+    @property
+    def n_entries(self):
+        return len(self.sizes)
+
+    def _matches(self, codes):
+        """查询三元组命中的条目（可重复，每命中一个三元组出现一次）"""
+        lo = np.searchsorted(self.codes, codes, side='left')
+        found = lo < len(self.codes)
+        found[found] = self.codes[lo[found]] == codes[found]
+        parts = [self.entries[self.indptr[i]:self.indptr[i + 1]] for i in lo[found]]
+        if len(self.extra_codes):
+            lo = np.searchsorted(self.extra_codes, codes, side='left')
+            hi = np.searchsorted(self.extra_codes, codes, side='right')
+            parts += [self.extra_entries[a:b] for a, b in zip(lo, hi) if b > a]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def suggest(self, query, limit=10, min_coverage=MIN_COVERAGE):
+        """补全候选：Field、Value、Score（覆盖比例）、Count（有效餐厅数），按相关度降序"""
+        text = fold_text([query])[0]
+        columns = {'Field': [], 'Value': [], 'Score': [], 'Count': []}
+        if not text:
+            return pd.DataFrame(columns)
+        _, codes = trigram_pairs([text], trail='')
+        hits = np.bincount(self._matches(codes), minlength=self.n_entries)
+        candidates = np.flatnonzero(hits >= max(min_coverage * len(codes), 1))
+        candidates = candidates[self.live_counts[candidates] > 0]
+        # 覆盖比例以 1/len(codes) 为步长，Jaccard 乘以更小的系数只用于同覆盖比例内排序
+        matched = hits[candidates]
+        jaccard = matched / (len(codes) + self.sizes[candidates] - matched)
+        score = matched + jaccard * 0.5
+        if len(candidates) > limit:
+            keep = np.argpartition(-score, limit)[:limit]
+            candidates, score = candidates[keep], score[keep]
+        top = candidates[np.argsort(-score, kind='stable')]
+        return pd.DataFrame({
+            'Field': [self.labels[i][0] for i in top],
+            'Value': [self.labels[i][1] for i in top],
+            'Score': hits[top] / len(codes),
+            'Count': self.live_counts[top]
+        })
+
+    def rows(self, field, value):
+        """某个 (字段, 取值) 条目对应的行号（含已失效的行，由调用方按有效行过滤）"""
+        entry = self.lookup.get((field, value))
+        if entry is None or entry >= self.n_entries:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.row_entries[field] == entry)
+
+    def appended(self, frame, start, retired=()):
+        """追加第 start 行起的行、扣除失效行，返回新的索引（原索引不变）"""
+        retired = np.asarray(retired, dtype=np.int64)
+        n_entries = self.n_entries
+        if len(self.labels) == n_entries:
+            labels, lookup = self.labels, self.lookup
+        else:
+            # 共享的条目表已被其他版本追加过：复制本版本的部分
+            labels = self.labels[:n_entries]
+            lookup = {label: i for i, label in enumerate(labels)}
+        buffers = dict(self._buffers)
+        row_entries = {}
+        new_texts = []
+        for name in AUTOCOMPLETE_FIELDS:
+            values = frame[name].to_numpy(dtype=object)
+            entries = np.full(len(values), -1, dtype=np.int64)
+            for i, value in enumerate(values):
+                if pd.isna(value):
+                    continue
+                entry = lookup.get((name, value))
+                if entry is None:
+                    entry = lookup[(name, value)] = len(labels)
+                    labels.append((name, value))
+                    new_texts.append(value)
+                entries[i] = entry
+            old = self.row_entries[name]
+            row_entries[name] = extended(buffers, name, len(old), entries, lambda: old)
+
+        live_counts = np.concatenate([self.live_counts, np.zeros(len(labels) - n_entries, dtype=np.int64)])
+        for name in AUTOCOMPLETE_FIELDS:
+            old = self.row_entries[name][retired]
+            np.subtract.at(live_counts, old[old >= 0], 1)
+            new = row_entries[name][start:]
+            np.add.at(live_counts, new[new >= 0], 1)
+
+        owners, codes = trigram_pairs(fold_text(new_texts))
+        sizes = extended(buffers, 'sizes', n_entries, np.bincount(owners, minlength=len(new_texts)), lambda: self.sizes)
+        owners = owners + n_entries
+        extra_codes = np.concatenate([self.extra_codes, codes])
+        extra_entries = np.concatenate([self.extra_entries, owners])
+        order = np.argsort(extra_codes, kind='stable')
+        updated = replace(
+            self, labels=labels, lookup=lookup, sizes=sizes, live_counts=live_counts, row_entries=row_entries,
+            extra_codes=extra_codes[order], extra_entries=extra_entries[order], _buffers=buffers
+        )
+        if len(extra_codes) > max(MIN_MERGE_TRIGRAMS, MERGE_RATIO * len(self.entries)):
+            all_codes = np.concatenate([np.repeat(self.codes, np.diff(self.indptr)), extra_codes])
+            all_entries = np.concatenate([self.entries, extra_entries])
+            order = np.lexsort((all_entries, all_codes))
+            updated = _postings(updated, all_entries[order], all_codes[order])
+        return updated
+
+def _postings(index, entries, codes):
+    """由按编码排序的 (条目, 编码) 构建倒排表，清空缓冲区"""
+    unique_codes, counts = np.unique(codes, return_counts=True)
+    return replace(
+        index,
+        codes=unique_codes,
+        indptr=np.concatenate([[0], np.cumsum(counts)]),
+        entries=entries,
+        extra_codes=np.empty(0, dtype=np.int64),
+        extra_entries=np.empty(0, dtype=np.int64)
+    )
+
+def build_trigram_index(df, live=None):
+    """由数据框的 Name、Address、City 列构建自动补全索引；live 为有效行位图，失效行不计入条目的餐厅数"""
+    labels, row_entries, texts = [], {}, []
+    for name in AUTOCOMPLETE_FIELDS:
+        codes, uniques = pd.factorize(df[name])
+        row_entries[name] = np.where(codes >= 0, codes + len(labels), -1).astype(np.int64)
+        labels.extend((name, value) for value in uniques)
+        texts.extend(uniques)
+    entries, codes = trigram_pairs(fold_text(texts))
+    flat = np.concatenate([entries if live is None else entries[live] for entries in row_entries.values()])
+    index = TrigramIndex(
+        labels=labels,
+        lookup={label: i for i, label in enumerate(labels)},
+        codes=np.empty(0, dtype=np.int64),
+        indptr=np.zeros(1, dtype=np.int64),
+        entries=np.empty(0, dtype=np.int64),
+        sizes=np.bincount(entries, minlength=len(labels)),
+        live_counts=np.bincount(flat[flat >= 0], minlength=len(labels)),
+        row_entries=row_entries
+    )
+    return _postings(index, entries, codes)
@@ -0,0 +1,35 @@
+"""增量更新用的只追加存储：数据框各列、多热编码矩阵、搜索索引的文档长度"""
+import numpy as np
+
+class AppendBuffer:
+    """只追加的行缓冲区：按倍增预留容量，各版本持有同一块内存的前缀视图
+
+    只有长度等于已写入行数的版本（最新版本）在其后的空闲容量中原地写入；
+    从较旧的版本追加时先复制出新的缓冲区，已发出的视图内容因此不会改变，追加的均摊开销只与新增行数相关。
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.length = len(data)
+
+    def extend(self, length, rows):
+        """在前 length 行之后写入 rows，返回 (所用缓冲区, 前 length + len(rows) 行的视图)"""
+        buffer = self if length == self.length else AppendBuffer(self.data[:length])
+        total = length + len(rows)
+        if total > len(buffer.data) or buffer is not self:
+            grown = np.empty((max(total, 2 * length),) + buffer.data.shape[1:], dtype=buffer.data.dtype)
+            grown[:length] = buffer.data[:length]
+            buffer.data = grown
+        buffer.data[length:total] = rows
+        buffer.length = total
+        return buffer, buffer.data[:total]
+
+def extended(buffers, name, length, rows, initial):
+    """在本版本前 length 行之后追加 rows，返回新视图；buffers[name] 缺省时由 initial() 建立，并被替换为所用的缓冲区
+
+    buffers 为新版本所持有的缓冲区表（由旧版本的表复制而来）。
+    """
+    if name not in buffers:
+        buffers[name] = AppendBuffer(initial())
+    buffers[name], view = buffers[name].extend(length, rows)
+    return view
@@ -0,0 +1,222 @@
+"""两级查询结果缓存：键为 (结果名, 规范化筛选条件, 数据集指纹, 其余参数)
+
+内存层按最近最少使用（LRU）淘汰并受字节预算约束；可选的磁盘层以pickle文件保存结果，
+服务重启后仍可命中，同样按预算淘汰最久未访问的文件。数据集每次变化（源文件或增量）
+都会得到新指纹，旧结果不会再被命中，随后自然淘汰。
+
+缓存返回的是共享对象，调用方不应原地修改结果。
+"""
+import hashlib
+import os
+import pickle
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .data import SNAPSHOT_DIR
+
+MEMORY_BUDGET = 64 << 20   # 内存层字节预算
+DISK_BUDGET = 512 << 20    # 磁盘层字节预算
+RESULT_DIR = 'results'     # 磁盘层位于快照目录下
+
+def cache_key(name, spec, fingerprint, *args):
+    """规范化缓存键：列表参数转为元组，使键可哈希且与传参方式无关"""
+    return (name, spec, fingerprint) + tuple(tuple(arg) if isinstance(arg, list) else arg for arg in args)
+
+def result_nbytes(value):
+    """估算结果占用的字节数"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return 64 + sum(result_nbytes(item) for item in value)
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+def result_cache_dir(path):
+    """与快照同目录的磁盘缓存目录"""
+    return os.path.join(os.path.dirname(os.path.abspath(path)), SNAPSHOT_DIR, RESULT_DIR)
+
+class ResultCache:
+    """内存LRU + 可选磁盘层；stats 记录命中、未命中与淘汰次数
+
+    锁只保护内存层与磁盘占用的记账；pickle 序列化、读写文件都在锁外进行，
+    写盘较慢的结果不会阻塞其他线程的读取。磁盘层的文件大小在首次访问时扫描一次目录，
+    此后随写入、淘汰增量记账（其他进程写入的文件在下次启动时计入）。
+    """
+
+    def __init__(self, memory_budget=MEMORY_BUDGET, disk_dir=None, disk_budget=DISK_BUDGET):
+        self.memory_budget = memory_budget
+        self.disk_dir = disk_dir
+        self.disk_budget = disk_budget
+        self.stats = Counter()
+        self._entries = OrderedDict()  # 键 -> (结果, 字节数)，末尾为最近使用
+        self._bytes = 0
+        self._disk_files = None        # 文件名 -> 字节数，末尾为最近使用；首次访问磁盘层时扫描
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """键是否在内存层（不查磁盘层，也不计入命中统计）"""
+        return key in self._entries
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def _disk_name(self, key):
+        # 键中各部分均为确定性的repr（筛选条件已规范化为排序元组）
+        return f"{hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()}.pkl"
+
+    def _remember(self, key, value, nbytes):
+        """放入内存层并按预算淘汰；超过整个预算的结果不进入内存层（须持有锁）"""
+        if nbytes > self.memory_budget:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (value, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.memory_budget:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self.stats['evictions'] += 1
+
+    def _scan_disk(self):
+        """按修改时间（最近访问时间）登记已有的磁盘文件（须持有锁）"""
+        if self._disk_files is not None:
+            return
+        files = []
+        if os.path.isdir(self.disk_dir):
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.pkl'):
+                    try:
+                        stat = os.stat(os.path.join(self.disk_dir, name))
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, name, stat.st_size))
+        self._disk_files = OrderedDict((name, size) for _, name, size in sorted(files))
+        self._disk_bytes = sum(self._disk_files.values())
+
+    def _load(self, key):
+        """读取磁盘层（锁外调用）"""
+        if self.disk_dir is None:
+            return None
+        name = self._disk_name(key)
+        file = os.path.join(self.disk_dir, name)
+        try:
+            with open(file, 'rb') as f:
+                stored_key, value = pickle.load(f)
+            os.utime(file)  # 记录访问时间，重启后仍按LRU淘汰
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        if stored_key != key:  # 摘要碰撞
+            return None
+        with self._lock:
+            self._scan_disk()
+            if name in self._disk_files:
+                self._disk_files.move_to_end(name)
+        return value
+
+    def _store(self, key, value):
+        """写入磁盘层（锁外调用）：先写临时文件再原子替换，之后在锁内记账并淘汰"""
+        if self.disk_dir is None:
+            return
+        try:
+            payload = pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        name = self._disk_name(key)
+        file = os.path.join(self.disk_dir, name)
+        tmp_file = f"{file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            with open(tmp_file, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_file, file)
+        except OSError:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            return
+        with self._lock:
+            self._scan_disk()
+            self._disk_bytes += len(payload) - self._disk_files.pop(name, 0)
+            self._disk_files[name] = len(payload)
+            self.stats['disk_writes'] += 1
+            evicted = self._trim_disk()
+        for old in evicted:
+            try:
+                os.remove(os.path.join(self.disk_dir, old))
+            except OSError:
+                continue
+
+    def _trim_disk(self):
+        """磁盘层超出预算时从记账中移除最久未访问的文件，返回待删除的文件名（须持有锁）"""
+        evicted = []
+        while self._disk_bytes > self.disk_budget and self._disk_files:
+            name, size = self._disk_files.popitem(last=False)
+            self._disk_bytes -= size
+            self.stats['disk_evictions'] += 1
+            evicted.append(name)
+        return evicted
+
+    def get(self, key, default=None):
+        """依次查内存层、磁盘层；磁盘命中的结果提升到内存层"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[0]
+        value = self._load(key)
+        if value is None:
+            with self._lock:
+                self.stats['misses'] += 1
+            return default
+        nbytes = result_nbytes(value)
+        with self._lock:
+            self.stats['disk_hits'] += 1
+            self._remember(key, value, nbytes)
+        return value
+
+    def put(self, key, value):
+        nbytes = result_nbytes(value)
+        with self._lock:
+            self._remember(key, value, nbytes)
+        self._store(key, value)
+
+    def get_or_compute(self, key, compute):
+        """命中则返回缓存结果，否则计算并写入两级缓存"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if disk and self.disk_dir is not None and os.path.isdir(self.disk_dir):
+                for name in os.listdir(self.disk_dir):
+                    if name.endswith('.pkl'):
+                        os.remove(os.path.join(self.disk_dir, name))
+                self._disk_files = OrderedDict()
+                self._disk_bytes = 0
+
+    def summary(self):
+        """当前状态与计数，供界面或日志展示"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'memory_budget': self.memory_budget,
+            'disk_bytes': self._disk_bytes,
+            **{name: self.stats[name] for name in ('hits', 'disk_hits', 'misses', 'evictions', 'disk_writes', 'disk_evictions')},
+        }
@@ -0,0 +1,244 @@
+"""预聚合立方体：按 大洲×城市×评级×价格等级 汇总餐厅数及各菜系、设施的餐厅数，侧边栏组合直接对单元格求和"""
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from .buffers import AppendBuffer, extended
+from .data import build_inverted_index, column_array
+from .filters import filter_bitmap
+
+CUBE_DIMENSIONS = ['Continent', 'City', 'Award', 'Price_level']
+# 计数修正表超过该单元格数且超过单元格总数的该比例时，并回基础计数
+MIN_MERGE_CELLS = 1_000
+MERGE_RATIO = 0.05
+
+class CellCounts:
+    """单元格计数（一维，或 单元格×取值 二维）：基础数组 + 已有单元格的修正表
+
+    增量更新中已有单元格的变化记在修正表中（按单元格号排序），新单元格写入基础数组的只追加缓冲区；
+    修正表累积到一定规模后并回基础数组。每次更新的均摊开销只与变化的单元格数相关，原计数保持不变。
+    """
+
+    def __init__(self, base, patch_cells=None, patch=None, buffer=None):
+        self.base = base
+        self.patch_cells = np.empty(0, dtype=np.int64) if patch_cells is None else patch_cells
+        self.patch = np.zeros((0,) + base.shape[1:], dtype=base.dtype) if patch is None else patch
+        self._buffer = buffer
+
+    def __len__(self):
+        return len(self.base)
+
+    def take(self, cells, columns=None):
+        """给定单元格（二维计数可再指定列）的计数（新数组）"""
+        def pick(array, rows):
+            return array[rows] if columns is None else array[np.ix_(rows, columns)]
+
+        values = pick(self.base, cells)
+        if len(self.patch_cells) and len(cells):
+            pos = np.minimum(np.searchsorted(self.patch_cells, cells), len(self.patch_cells) - 1)
+            hit = self.patch_cells[pos] == cells
+            values[hit] += pick(self.patch, pos[hit])
+        return values
+
+    def dense(self):
+        """全部单元格的计数（新数组）"""
+        values = self.base.copy()
+        values[self.patch_cells] += self.patch
+        return values
+
+    def updated(self, cells, values, n_cells, width=None):
+        """在 cells（可重复）上加 values，单元格数扩充到 n_cells、二维计数的列数扩充到 width，返回新的计数"""
+        counts = self
+        if width is not None and width > self.base.shape[1]:
+            # 出现新的菜系/设施：整体补齐新列（只在词表变化时发生）
+            padded = np.pad(self.dense(), ((0, 0), (0, width - self.base.shape[1])))
+            counts = CellCounts(padded)
+        n_old = len(counts.base)
+        cells = np.asarray(cells, dtype=np.int64)
+        is_new = cells >= n_old
+
+        block = np.zeros((n_cells - n_old,) + counts.base.shape[1:], dtype=counts.base.dtype)
+        np.add.at(block, cells[is_new] - n_old, values[is_new])
+        buffer, base = (counts._buffer or AppendBuffer(counts.base)).extend(n_old, block)
+
+        patch_cells, inverse = np.unique(np.concatenate([counts.patch_cells, cells[~is_new]]), return_inverse=True)
+        patch = np.zeros((len(patch_cells),) + counts.base.shape[1:], dtype=counts.base.dtype)
+        np.add.at(patch, inverse, np.concatenate([counts.patch, values[~is_new]]))
+        if len(patch_cells) > max(MIN_MERGE_CELLS, MERGE_RATIO * n_cells):
+            merged = base.copy()
+            merged[patch_cells] += patch
+            return CellCounts(merged)
+        return CellCounts(base, patch_cells, patch, buffer)
+
+@dataclass
+class AggregateCube:
+    """预聚合立方体，每个单元格是一种 (大洲, 城市, 评级, 价格等级) 组合
+
+    counts 为各单元格的有效餐厅数，cuisine_counts、facility_counts 为单元格内具备各菜系/设施的有效餐厅数
+    （列与数据集的多热编码词表对应）。一家餐厅可有多个菜系与设施，这些计数还原不出“任一菜系”“全部设施”
+    条件，含菜系或设施条件的筛选回到逐行位图。单元格上的倒排索引与数据集同构，可直接复用 filters.filter_bitmap。
+    """
+    labels: dict                  # 维度 -> 取值列表
+    codes: dict                   # 维度 -> 各单元格的取值序号（缺失为-1）
+    index: dict                   # 维度 -> 单元格倒排索引
+    counts: CellCounts
+    cuisine_counts: CellCounts
+    facility_counts: CellCounts
+    cell_of_row: np.ndarray       # 数据集每行所属的单元格
+    lookup: dict = field(default=None, repr=False)  # 取值序号组合 -> 单元格，增量更新时构建并随新立方体移交
+    _buffers: dict = field(default_factory=dict, repr=False)  # codes、cell_of_row 所在的只追加缓冲区
+
+    @property
+    def n_rows(self):
+        return len(self.counts)
+
+    @cached_property
+    def live(self):
+        return self.counts.dense() > 0
+
+def cube_supports(spec):
+    """筛选条件是否只涉及立方体维度（菜系、设施、空间范围、全文搜索需逐行判断）"""
+    return not spec.cuisines and not spec.facilities and spec.near is None and spec.bbox is None and spec.query is None
+
+def _member_counts(cell_of_row, matrix, n_cells):
+    """按单元格累加各行的多热编码（只遍历为真的项）"""
+    rows, cols = np.nonzero(matrix)
+    width = matrix.shape[1]
+    return np.bincount(cell_of_row[rows] * width + cols, minlength=n_cells * width).reshape(n_cells, width)
+
+def build_cube(dataset):
+    """由数据集构建立方体（只统计有效行）"""
+    labels, row_codes = {}, {}
+    key = np.zeros(dataset.n_rows, dtype=np.int64)
+    for name in CUBE_DIMENSIONS:
+        codes, uniques = pd.factorize(column_array(dataset.df[name]))
+        labels[name] = uniques.tolist()
+        row_codes[name] = codes
+        key = key * (len(uniques) + 1) + (codes + 1)
+    _, first_row, cell_of_row = np.unique(key, return_index=True, return_inverse=True)
+    cell_of_row = cell_of_row.reshape(-1)
+    n_cells = len(first_row)
+    codes = {name: row_codes[name][first_row].astype(np.int64) for name in CUBE_DIMENSIONS}
+    live_rows = dataset.live_rows()
+    live_cells = cell_of_row[live_rows]
+    return AggregateCube(
+        labels=labels,
+        codes=codes,
+        index={name: build_inverted_index(_cell_values(labels[name], codes[name])) for name in CUBE_DIMENSIONS},
+        counts=CellCounts(np.bincount(live_cells, minlength=n_cells)),
+        cuisine_counts=CellCounts(_member_counts(live_cells, dataset.cuisines.matrix[live_rows], n_cells)),
+        facility_counts=CellCounts(_member_counts(live_cells, dataset.facilities.matrix[live_rows], n_cells)),
+        cell_of_row=cell_of_row
+    )
+
+def _cell_values(labels, codes):
+    """单元格取值序号 -> 取值（缺失为None）"""
+    return pd.Series(np.asarray(labels + [None], dtype=object)[codes])
+
+def update_cube(cube, dataset, retired, start):
+    """增量更新立方体，返回新立方体（原立方体不变）
+
+    dataset 为应用增量后的数据集，retired 为失效的旧行，start 起为新追加的行；
+    计数只按增量行加减，新出现的维度组合追加为新单元格。
+    """
+    n_old_cells = cube.n_rows
+    if cube.lookup is None:
+        cube.lookup = dict(zip(zip(*(cube.codes[name].tolist() for name in CUBE_DIMENSIONS)), range(n_old_cells)))
+    lookup = cube.lookup
+    cube.lookup = None  # 与主键映射相同，查找表随新立方体移交
+
+    # 新行的各维度取值序号，新取值追加到取值列表末尾
+    labels = {}
+    new_codes = []
+    for name in CUBE_DIMENSIONS:
+        codes, uniques = pd.factorize(column_array(dataset.df[name])[start:])
+        position = {value: i for i, value in enumerate(cube.labels[name])}
+        labels[name] = list(cube.labels[name]) + [value for value in uniques.tolist() if value not in position]
+        position.update((value, i) for i, value in enumerate(labels[name]))
+        mapping = np.array([position[value] for value in uniques.tolist()] + [-1], dtype=np.int64)
+        new_codes.append(mapping[codes])
+
+    new_cells = {name: [] for name in CUBE_DIMENSIONS}
+    new_cell_of_row = np.empty(dataset.n_rows - start, dtype=np.int64)
+    for i, combo in enumerate(zip(*(codes.tolist() for codes in new_codes))):
+        cell = lookup.get(combo)
+        if cell is None:
+            cell = lookup[combo] = n_old_cells + len(new_cells['City'])
+            for name, code in zip(CUBE_DIMENSIONS, combo):
+                new_cells[name].append(code)
+        new_cell_of_row[i] = cell
+    n_cells = n_old_cells + len(new_cells['City'])
+
+    buffers = dict(cube._buffers)
+    codes = {
+        name: extended(buffers, name, n_old_cells, np.array(new_cells[name], dtype=np.int64), lambda name=name: cube.codes[name])
+        for name in CUBE_DIMENSIONS
+    }
+    cell_of_row = extended(buffers, 'cell_of_row', len(cube.cell_of_row), new_cell_of_row, lambda: cube.cell_of_row)
+
+    # 失效行减一、新行加一；菜系/设施计数按多热编码的行加减
+    retired = np.asarray(retired, dtype=np.int64)
+    new_rows = np.arange(start, dataset.n_rows)
+    cells = np.concatenate([cube.cell_of_row[retired], new_cell_of_row])
+    signs = np.concatenate([-np.ones(len(retired), dtype=np.int64), np.ones(len(new_rows), dtype=np.int64)])
+    rows = np.concatenate([retired, new_rows])
+
+    def member_counts(counts, encoding):
+        values = encoding.matrix[rows].astype(np.int64) * signs[:, None]
+        return counts.updated(cells, values, n_cells, len(encoding.vocab))
+
+    return AggregateCube(
+        labels=labels,
+        codes=codes,
+        index={
+            name: cube.index[name].appended(_cell_values(labels[name], codes[name][n_old_cells:]), n_old_cells)
+            if n_cells > n_old_cells else cube.index[name]
+            for name in CUBE_DIMENSIONS
+        },
+        counts=cube.counts.updated(cells, signs, n_cells),
+        cuisine_counts=member_counts(cube.cuisine_counts, dataset.cuisines),
+        facility_counts=member_counts(cube.facility_counts, dataset.facilities),
+        cell_of_row=cell_of_row,
+        lookup=lookup,
+        _buffers=buffers
+    )
+
+def select_cells(cube, spec):
+    """满足筛选条件且仍有餐厅的单元格（调用前需 cube_supports(spec)）"""
+    return np.flatnonzero(filter_bitmap(cube, spec))
+
+def dimension_counts(cube, cells, name, weights=None):
+    """按某个维度对单元格求和（缺失取值不参与），返回以取值为索引的 Series（含计数为0的取值）
+
+    weights 默认为各单元格的餐厅数，也可传入 单元格×列 的计数矩阵，此时返回 DataFrame。
+    """
+    if weights is None:
+        weights = cube.counts.take(cells)
+    codes = cube.codes[name][cells]
+    known = codes >= 0
+    index = pd.Index(cube.labels[name], name=name)
+    if weights.ndim == 1:
+        totals = np.bincount(codes[known], weights=weights[known], minlength=len(index))
+        return pd.Series(totals.astype(np.int64), index=index)
+    totals = np.zeros((len(index), weights.shape[1]), dtype=np.int64)
+    np.add.at(totals, codes[known], weights[known])
+    return pd.DataFrame(totals, index=index)
+
+def cross_counts(cube, cells, rows_name, columns_name):
+    """两个维度的交叉计数表（缺失取值不参与），只保留有餐厅的行列并按取值排序"""
+    rows, columns = cube.codes[rows_name][cells], cube.codes[columns_name][cells]
+    known = (rows >= 0) & (columns >= 0)
+    n_columns = len(cube.labels[columns_name])
+    totals = np.bincount(
+        rows[known] * n_columns + columns[known], weights=cube.counts.take(cells)[known],
+        minlength=len(cube.labels[rows_name]) * n_columns
+    ).astype(np.int64).reshape(-1, n_columns)
+    table = pd.DataFrame(
+        totals,
+        index=pd.Index(cube.labels[rows_name], name=rows_name),
+        columns=pd.Index(cube.labels[columns_name], name=columns_name)
+    )
+    table = table.loc[totals.sum(axis=1) > 0, totals.sum(axis=0) > 0]
+    return table.sort_index(axis=0).sort_index(axis=1)
@@ -0,0 +1,542 @@
+"""数据加载：CSV解析、紧凑类型、列式快照缓存、多热编码与倒排索引"""
+import hashlib
+import os
+import shutil
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
+
+from .autocomplete import build_trigram_index
+from .buffers import AppendBuffer, extended
+from .search import build_search_index
+from .similar import build_similarity_index
+from .spatial import build_spatial_index
+
+# 数据源与快照缓存
+DATA_PATH = 'cleaned.csv'
+SNAPSHOT_DIR = '.snapshot_cache'
+SNAPSHOT_VERSION = 4  # 派生列逻辑或快照格式变化时递增，使旧快照失效
+
+# 流式加载：每块解析/清洗/序列化时的工作内存上限（字节），None 表示一次性处理整表
+CHUNK_MEMORY = 256 << 20
+PROBE_ROWS = 2_000         # 首块行数，用于实测每行内存占用
+WORKING_SET_FACTOR = 4     # 清洗过程中的临时对象约为分块本身的数倍
+
+# 紧凑类型：低基数文本列用分类（字典）编码，价格等级用可空小整数，列表列用Arrow列表
+CATEGORY_COLUMNS = ['Country', 'City', 'Continent', 'Award', 'Price', 'Cuisine']
+SMALL_INT_COLUMNS = {'Price_level': 'Int8'}
+LIST_COLUMNS = ['Cuisine_list', 'Facilities_list']
+LIST_DTYPE = pd.ArrowDtype(pa.list_(pa.string()))
+
+# 筛选用倒排索引覆盖的单值字段
+FILTER_FIELDS = ['Continent', 'City', 'Award', 'Price_level']
+
+# 由原始列推导出的列（增量数据只需提供原始列）
+DERIVED_COLUMNS = ['Cuisine_list', 'Facilities_list', 'Country', 'City', 'Continent']
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """按内容计算源文件指纹，文件变化后快照自动失效"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return f"v{SNAPSHOT_VERSION}-{digest.hexdigest()}"
+
+def snapshot_path(path, fingerprint):
+    """快照文件路径（与源文件同目录，按指纹区分）"""
+    base = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(path)), SNAPSHOT_DIR, f"{base}.{fingerprint}.parquet")
+
+def rows_per_chunk(bytes_per_row, chunk_memory):
+    """按每行内存占用估算分块行数"""
+    return max(PROBE_ROWS, int(chunk_memory / max(bytes_per_row * WORKING_SET_FACTOR, 1)))
+
+def frame_bytes_per_row(df):
+    sample = df.iloc[:PROBE_ROWS]
+    return sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+
+def compact_frame(df):
+    """将处理后的数据框转换为紧凑类型（原地修改并返回）
+
+    Award 等分类列只存放小整数编码（评级4类为int8），Price_level 为可空 Int8，
+    菜系/设施列表为Arrow列表列，不再为每行保存Python列表对象。
+    """
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col, dtype in SMALL_INT_COLUMNS.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    for col in LIST_COLUMNS:
+        if col in df.columns and df[col].dtype != LIST_DTYPE:
+            df[col] = df[col].astype(LIST_DTYPE)
+    return df
+
+def memory_report(before, after):
+    """紧凑化前后各列内存占用（字节）"""
+    report = pd.DataFrame({
+        'before': before.memory_usage(deep=True, index=False),
+        'after': after.memory_usage(deep=True, index=False)
+    })
+    report.loc['Total'] = report.sum()
+    report['ratio'] = (report['after'] / report['before']).round(3)
+    return report
+
+def column_array(series):
+    """列的底层数组：NumPy列取ndarray，分类/可空整数/Arrow列取扩展数组"""
+    return series.to_numpy() if isinstance(series.dtype, np.dtype) else series.array
+
+def concat_arrays(parts):
+    """拼接同一列的多段数组；分类列合并词表（排序），其余按各自类型拼接"""
+    if len(parts) == 1:
+        return parts[0]
+    if isinstance(parts[0], pd.Categorical):
+        # 整块缺失的分类列推断出的类别为 float64，不能与文本类别合并，先统一为 object 类别
+        parts = [part if part.categories.dtype == object else part.set_categories(part.categories.astype(object)) for part in parts]
+        return union_categoricals(parts, sort_categories=True)
+    if isinstance(parts[0], np.ndarray):
+        return np.concatenate(parts)
+    return pd.concat([pd.Series(part, copy=False) for part in parts], ignore_index=True).array
+
+def frame_from_chunks(chunks, empty):
+    """逐块收集各列数组，最后按列拼接：峰值只比最终数据框多出一份列数据，而非整表的多份副本"""
+    pieces = {}
+    for chunk in chunks:
+        # 取出独立的列数组，分块本身随即可以释放
+        for col in chunk.columns:
+            array = column_array(chunk[col])
+            pieces.setdefault(col, []).append(array.copy() if isinstance(array, np.ndarray) else array)
+    if not pieces:
+        return empty()
+    columns = {}
+    for col in list(pieces):
+        parts = pieces.pop(col)
+        columns[col] = concat_arrays(parts)
+        del parts
+    # copy=False 保持每列独立存放，不再合并成二维块（合并会再复制一遍）
+    return pd.DataFrame(columns, copy=False)
+
+def append_frame(df, new_rows, buffers):
+    """把 new_rows（列与 df 相同、已是紧凑类型）追加到 df 之后，返回新的数据框（df 不变）
+
+    buffers 为本版本数据框各列的只追加缓冲区（见 AppendBuffer），原地更新后交给新版本：
+    NumPy列、分类列的编码、可空整数列的值与掩码写入预留容量，Arrow列表列只追加数据块，已有的行都不复制。
+    分类列新出现的取值追加在词表末尾。
+    """
+    n_rows = len(df)
+    columns = {}
+    for col in df.columns:
+        old, new = column_array(df[col]), column_array(new_rows[col])
+        if isinstance(old, pd.Categorical):
+            new = pd.Categorical(new)
+            extra = new.categories[~new.categories.isin(old.categories)]
+            dtype = pd.CategoricalDtype(old.categories.append(extra))
+            remap = dtype.categories.get_indexer(new.categories)
+            codes = np.where(new.codes >= 0, remap[new.codes], -1)
+            # 取值增多使编码需要更宽的整数类型时，按新类型重建缓冲区
+            code_dtype = pd.Categorical.from_codes([], dtype=dtype).codes.dtype
+            if col in buffers and buffers[col].data.dtype != code_dtype:
+                del buffers[col]
+            codes = extended(buffers, col, n_rows, codes.astype(code_dtype), lambda: old.codes.astype(code_dtype))
+            columns[col] = pd.Categorical.from_codes(codes, dtype=dtype, validate=False)
+        elif isinstance(old, pd.arrays.IntegerArray):
+            numpy_dtype = old.dtype.numpy_dtype
+            new = pd.array(new, dtype=old.dtype)
+            values = extended(buffers, (col, 'values'), n_rows, new.to_numpy(numpy_dtype, na_value=0),
+                              lambda: old.to_numpy(numpy_dtype, na_value=0))
+            mask = extended(buffers, (col, 'mask'), n_rows, np.asarray(new.isna()), lambda: np.asarray(old.isna()))
+            columns[col] = pd.arrays.IntegerArray(values, mask)
+        elif isinstance(old, np.ndarray):
+            columns[col] = extended(buffers, col, n_rows, np.asarray(new, dtype=old.dtype), lambda: old)
+        else:
+            chunks = old.__arrow_array__().chunks + new.__arrow_array__().chunks
+            columns[col] = pd.arrays.ArrowExtensionArray(pa.chunked_array(chunks, type=old.dtype.pyarrow_dtype))
+    return pd.DataFrame(columns, copy=False)
+
+def read_snapshot(snapshot_file, chunk_memory=CHUNK_MEMORY):
+    """读取列式快照（分类、小整数、Arrow列表列原样还原）；按内存上限分批转换"""
+    def to_frame(table):
+        df = table.to_pandas(types_mapper=lambda t: LIST_DTYPE if pa.types.is_list(t) else None)
+        return compact_frame(df)  # 统一列表项字段名等细节，已是紧凑类型的列不做转换
+
+    if chunk_memory is None:
+        return to_frame(pq.read_table(snapshot_file))
+    parquet = pq.ParquetFile(snapshot_file)
+    meta = parquet.metadata
+    raw_bytes = sum(meta.row_group(i).total_byte_size for i in range(meta.num_row_groups))
+    batch_rows = rows_per_chunk(raw_bytes / max(meta.num_rows, 1), chunk_memory)
+    return frame_from_chunks(
+        (to_frame(batch) for batch in parquet.iter_batches(batch_size=batch_rows)),
+        empty=lambda: to_frame(parquet.schema_arrow.empty_table())
+    )
+
+def snapshot_schema(df):
+    """由前若干行推断Arrow模式（整表推断会把最大的文本列整列转换一遍）
+
+    样本中推断不出类型（全为空值或空列表）的列，再用该列第一个有效值推断。
+    """
+    schema = pa.Schema.from_pandas(df.iloc[:PROBE_ROWS], preserve_index=False)
+    for i, column in enumerate(schema):
+        undetermined = pa.types.is_null(column.type) or (
+            pa.types.is_list(column.type) and pa.types.is_null(column.type.value_type))
+        if not undetermined:
+            continue
+        values = df[column.name].dropna()
+        if pa.types.is_list(column.type):
+            values = values[values.map(len) > 0]
+        if len(values):
+            schema = schema.set(i, pa.field(column.name, pa.array(values.iloc[:1]).type))
+    return schema
+
+def write_snapshot(df, snapshot_file, chunk_memory=CHUNK_MEMORY):
+    """写入列式快照，并清理同一源文件的旧快照"""
+    snapshot_dir = os.path.dirname(snapshot_file)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    prefix = os.path.basename(snapshot_file).rsplit('.', 2)[0] + '.'
+    current_log = os.path.basename(snapshot_file)[:-len('.parquet')] + '.deltas'
+    for name in os.listdir(snapshot_dir):
+        if name.startswith(prefix) and name.endswith('.parquet'):
+            os.remove(os.path.join(snapshot_dir, name))
+        elif name.startswith(prefix) and name.endswith('.deltas') and name != current_log:
+            shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)  # 旧源文件的增量日志
+    # 先写临时文件再原子替换，避免并发进程读到半截快照
+    tmp_file = f"{snapshot_file}.{os.getpid()}.tmp"
+    if chunk_memory is None:
+        df.to_parquet(tmp_file, index=False)
+    else:
+        # 按行组分段转换为Arrow，避免整表的Arrow副本与数据框同时驻留内存
+        group_rows = rows_per_chunk(frame_bytes_per_row(df), chunk_memory)
+        schema = snapshot_schema(df)
+        with pq.ParquetWriter(tmp_file, schema) as writer:
+            for start in range(0, len(df), group_rows):
+                part = df.iloc[start:start + group_rows]
+                writer.write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False))
+    os.replace(tmp_file, snapshot_file)
+
+def parse_csv(path):
+    """解析原始CSV并生成派生列（菜系/设施列表、国家、城市、大洲）"""
+    return derive_columns(pd.read_csv(path, encoding='utf-8', encoding_errors='ignore'))
+
+def stream_csv(path, chunk_memory=CHUNK_MEMORY):
+    """分块解析CSV：每块独立清洗、生成派生列并转为紧凑类型，块大小按实测的每行内存占用自适应"""
+    def chunks():
+        with pd.read_csv(path, encoding='utf-8', encoding_errors='ignore', chunksize=PROBE_ROWS) as reader:
+            chunk_rows = PROBE_ROWS
+            while True:
+                try:
+                    chunk = reader.get_chunk(chunk_rows)
+                except StopIteration:
+                    return
+                chunk = derive_columns(chunk)
+                chunk_rows = rows_per_chunk(frame_bytes_per_row(chunk), chunk_memory)
+                yield compact_frame(chunk)
+
+    return frame_from_chunks(
+        chunks(),
+        empty=lambda: compact_frame(derive_columns(pd.read_csv(path, encoding='utf-8', encoding_errors='ignore', nrows=0)))
+    )
+
+def derive_columns(df):
+    """清洗原始记录并生成派生列；全量解析与增量更新共用同一套规则"""
+    df = df.dropna(subset=['Name', 'Cuisine', 'Location'], how='all')
+    
+    # 清理空行
+    df = df.dropna(how='all')
+    
+    if 'Price_level' not in df.columns:
+        df['Price_level'] = df['Price'].str.len()
+    
+    # 清理和标准化菜系数据
+    def clean_cuisine(cuisine):
+        if pd.isna(cuisine):
+            return []
+        # 移除多余空格，分割菜系
+        cuisines = [c.strip() for c in str(cuisine).split(',')]
+        # 去重并返回
+        return list(set(cuisines))
+    
+    df['Cuisine_list'] = df['Cuisine'].apply(clean_cuisine)
+
+    # 清理和标准化设施数据
+    def clean_facilities(facilities):
+        if pd.isna(facilities):
+            return []
+        facility_list = [f.strip() for f in str(facilities).split(',') if f.strip()]
+        return list(set(facility_list))
+
+    df['Facilities_list'] = df['FacilitiesAndServices'].apply(clean_facilities)
+    
+    df['Country'] = df['Location'].str.split(',').str[-1].str.strip()
+    df['City'] = df['Location'].str.split(',').str[0].str.strip()
+    
+    # 国家及地区名称标准化
+    country_mapping = {
+        'USA': 'United States',
+        'UK': 'United Kingdom', 
+        'China Mainland': 'China',
+        'Taiwan': 'Taiwan',
+        'Hong Kong': 'Hong Kong'
+    }
+    df['Country'] = df['Country'].replace(country_mapping)
+    
+    # 添加大洲信息
+    continent_mapping = {
+        'Japan': 'Asia', 'China': 'Asia', 'Taiwan': 'Asia', 'Hong Kong': 'Asia',
+        'Singapore': 'Asia', 'South Korea': 'Asia', 'Thailand': 'Asia',
+        'United States': 'North America', 'Canada': 'North America', 'Mexico': 'North America',
+        'France': 'Europe', 'United Kingdom': 'Europe', 'Italy': 'Europe', 
+        'Spain': 'Europe', 'Germany': 'Europe', 'Switzerland': 'Europe',
+        'Netherlands': 'Europe', 'Belgium': 'Europe',
+        'Australia': 'Oceania', 'New Zealand': 'Oceania',
+        'Brazil': 'South America', 'Argentina': 'South America'
+    }
+    df['Continent'] = df['Country'].map(continent_mapping)
+    
+    # 行号即位置，便于与多热编码矩阵按行对齐
+    return df.reset_index(drop=True)
+
+def load_data(path=DATA_PATH, fingerprint=None, chunk_memory=CHUNK_MEMORY):
+    """加载处理后的数据：优先读取指纹匹配的快照，否则解析CSV并写入快照
+
+    chunk_memory 限制分块解析、快照读写时的工作内存（字节），None 表示一次性处理整表。
+    """
+    if fingerprint is None:
+        fingerprint = file_fingerprint(path)
+    snapshot_file = snapshot_path(path, fingerprint)
+    
+    if os.path.exists(snapshot_file):
+        try:
+            return read_snapshot(snapshot_file, chunk_memory)
+        except Exception:
+            pass  # 快照损坏时回退到重新解析
+    
+    df = compact_frame(parse_csv(path)) if chunk_memory is None else stream_csv(path, chunk_memory)
+    
+    try:
+        write_snapshot(df, snapshot_file, chunk_memory)
+    except Exception:
+        pass  # 快照只是加速手段，写入失败（如只读目录）不影响使用
+    
+    return df
+
+@dataclass
+class MultiHot:
+    """列表列的多热编码：词表 + 行×取值 布尔矩阵
+
+    全量构建时词表有序；增量追加的新取值排在词表末尾。
+    """
+    vocab: list
+    matrix: np.ndarray
+    _rows: AppendBuffer = field(default=None, repr=False)  # 矩阵所在的只追加缓冲区，首次追加时建立
+    position: dict = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.position = {value: i for i, value in enumerate(self.vocab)}
+
+    def appended(self, list_series):
+        """追加若干行，返回新的编码（原编码不变）
+
+        新行写入矩阵缓冲区的预留容量；只有出现新取值、矩阵需要变宽时才复制已有的行。
+        """
+        rows, values = list_memberships(list_series)
+        new_values = [value for value in pd.unique(values) if value not in self.position]
+        n_rows, n_values = self.matrix.shape
+        if new_values:
+            buffer = AppendBuffer(np.pad(self.matrix, ((0, 0), (0, len(new_values)))))
+        else:
+            buffer = self._rows or AppendBuffer(self.matrix)
+        vocab = self.vocab + new_values
+        position = {value: i for i, value in enumerate(vocab)}
+        block = np.zeros((len(list_series), len(vocab)), dtype=bool)
+        block[rows, [position[value] for value in values]] = True
+        buffer, matrix = buffer.extend(n_rows, block)
+        return MultiHot(vocab, matrix, buffer)
+
+def list_memberships(list_series, start=0, stop=None):
+    """列表列第 [start, stop) 行展开为 (行号, 取值) 两个数组，行号从 start 起算，空列表不产生记录"""
+    lists = pa.array(list_series.iloc[start:stop], type=LIST_DTYPE.pyarrow_dtype, from_pandas=True)
+    if isinstance(lists, pa.ChunkedArray):
+        lists = lists.combine_chunks()
+    rows = pc.list_parent_indices(lists).to_numpy().astype(np.int64) + start
+    values = pc.list_flatten(lists).to_numpy(zero_copy_only=False)
+    keep = ~pd.isna(values)
+    return rows[keep], values[keep]
+
+def encode_multi_hot(list_series, chunk_rows=500_000):
+    """将列表列编码为排序词表和 行×取值 的布尔矩阵；分块展开，临时对象不随总行数增长"""
+    position = {}
+    row_parts, code_parts = [], []
+    for start in range(0, len(list_series), chunk_rows):
+        rows, values = list_memberships(list_series, start, start + chunk_rows)
+        codes, uniques = pd.factorize(values)
+        first_codes = np.array([position.setdefault(value, len(position)) for value in uniques], dtype=np.int64)
+        row_parts.append(rows)
+        code_parts.append(first_codes[codes])
+    # 按首次出现编号后再映射为排序词表中的位置
+    vocab = sorted(position)
+    remap = np.empty(len(vocab), dtype=np.int64)
+    remap[[position[value] for value in vocab]] = np.arange(len(vocab))
+    matrix = np.zeros((len(list_series), len(vocab)), dtype=bool)
+    if row_parts:
+        matrix[np.concatenate(row_parts), remap[np.concatenate(code_parts)]] = True
+    return MultiHot(vocab, matrix)
+
+def membership_matrix(encoding, row_positions, values):
+    """取指定行、指定取值的子矩阵（词表外的取值列全为False）"""
+    sub = np.zeros((len(row_positions), len(values)), dtype=bool)
+    known = [i for i, value in enumerate(values) if value in encoding.position]
+    if known:
+        cols = [encoding.position[values[i]] for i in known]
+        sub[:, known] = encoding.matrix[np.ix_(row_positions, cols)]
+    return sub
+
+class InvertedIndex:
+    """单值列的倒排索引：取值 -> 升序行号数组
+
+    增量追加的行号先按块挂在对应取值下，首次查询该取值时再合并，
+    因此追加的开销只与增量行数相关。
+    """
+
+    def __init__(self, postings, pending=None):
+        self._postings = postings
+        self._pending = pending or {}
+
+    def __iter__(self):
+        yield from self._postings
+        yield from (value for value in self._pending if value not in self._postings)
+
+    def __len__(self):
+        return len(self._postings) + sum(value not in self._postings for value in self._pending)
+
+    def __contains__(self, value):
+        return value in self._postings or value in self._pending
+
+    def __getitem__(self, value):
+        rows = self.get(value)
+        if rows is None:
+            raise KeyError(value)
+        return rows
+
+    def get(self, value, default=None):
+        chunks = self._pending.get(value)
+        if chunks:
+            base = self._postings.get(value)
+            merged = np.concatenate(([base] if base is not None else []) + chunks)
+            self._postings[value] = merged
+            self._pending.pop(value, None)
+        return self._postings.get(value, default)
+
+    def appended(self, values, start):
+        """追加第 start 行起的取值，返回新的索引（原索引不变）"""
+        pending = {value: list(chunks) for value, chunks in self._pending.items()}
+        for value, rows in build_inverted_index(values)._postings.items():
+            pending.setdefault(value, []).append(rows + start)
+        return InvertedIndex(dict(self._postings), pending)
+
+def build_inverted_index(values):
+    """单值列的倒排索引（缺失值不入索引）"""
+    codes, uniques = pd.factorize(values)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return InvertedIndex({value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques.tolist())})
+
+@dataclass
+class Dataset:
+    """加载后的只读数据集：数据框及其多热编码、倒排索引、空间索引、全文搜索索引
+
+    行号一经分配不再改变：增量更新只追加新行，被删除或更新的旧行在 live 中标记为失效。
+    """
+    df: pd.DataFrame
+    fingerprint: str
+    cuisines: MultiHot
+    facilities: MultiHot
+    index: dict
+    spatial: object = None
+    live: np.ndarray = None  # 有效行位图
+    keys: dict = field(default=None, repr=False)  # (Name, Address) -> 行号，首次增量更新时构建
+    buffers: dict = field(default_factory=dict, repr=False)  # 数据框各列的只追加缓冲区（见 append_frame）
+    deltas_applied: int = 0
+    cube: object = field(default=None, repr=False)  # 预聚合立方体（见 cube.py）
+    cities: object = field(default=None, repr=False)  # 城市坐标累加表（见 geo.CityCoordinates）
+    sort_orders: dict = field(default_factory=dict, repr=False)  # (列, 是否降序) -> 全表排序排列，首次分页排序时构建
+
+    def __post_init__(self):
+        if self.live is None:
+            self.live = np.ones(self.n_rows, dtype=bool)
+
+    @property
+    def n_rows(self):
+        return len(self.df)
+
+    # 全文搜索、自动补全与相似餐厅索引只在首次使用时构建，加载与快照恢复不为其付出代价；
+    # 增量更新只延续已构建的索引（见 built_indexes）
+    LAZY_INDEXES = ('search', 'autocomplete', 'similar')
+
+    @cached_property
+    def search(self):
+        """BM25 搜索索引（见 search.py）"""
+        return build_search_index(self.df)
+
+    @cached_property
+    def autocomplete(self):
+        """三元组自动补全索引（见 autocomplete.py）"""
+        return build_trigram_index(self.df, self.live)
+
+    @cached_property
+    def similar(self):
+        """相似餐厅索引（见 similar.py）"""
+        return build_similarity_index(self)
+
+    def built_indexes(self):
+        """已经构建的延迟索引名"""
+        return [name for name in self.LAZY_INDEXES if name in self.__dict__]
+
+    def live_rows(self, rows=None):
+        """有效行号；给定 rows 时从中剔除已失效的行"""
+        if rows is None:
+            return np.flatnonzero(self.live)
+        rows = np.asarray(rows)
+        return rows[self.live[rows]]
+
+    def column(self, name, rows=None):
+        """按行号取某列的NumPy数组（不复制整张表）
+
+        分类列先按行号取编码再还原为取值；可空整数列含缺失值时转为浮点（缺失为NaN）。
+        """
+        values = column_array(self.df[name])
+        if rows is not None:
+            values = values[rows]
+        if isinstance(values, pd.Categorical):
+            return np.asarray(values)
+        if isinstance(values, pd.arrays.IntegerArray):
+            return values.to_numpy(dtype=float, na_value=np.nan) if values.isna().any() else values.to_numpy(values.dtype.numpy_dtype)
+        return np.asarray(values)
+
+def build_dataset(df, fingerprint=''):
+    """由处理后的数据框构建编码、筛选与空间索引、预聚合立方体和城市坐标表（搜索类索引延迟构建）"""
+    from .cube import build_cube  # 立方体依赖筛选引擎，延迟导入避免循环引用
+    from .geo import city_coordinates
+    
+    df = df.reset_index(drop=True)
+    dataset = Dataset(
+        df=df,
+        fingerprint=fingerprint,
+        cuisines=encode_multi_hot(df['Cuisine_list']),
+        facilities=encode_multi_hot(df['Facilities_list']),
+        index={name: build_inverted_index(df[name]) for name in FILTER_FIELDS},
+        spatial=build_spatial_index(df['Latitude'], df['Longitude'])
+    )
+    dataset.cube = build_cube(dataset)
+    dataset.cities = city_coordinates(dataset)
+    return dataset
+
+def load_dataset(path=DATA_PATH, chunk_memory=CHUNK_MEMORY):
+    """加载数据并构建编码与索引"""
+    fingerprint = file_fingerprint(path)
+    return build_dataset(load_data(path, fingerprint, chunk_memory), fingerprint)
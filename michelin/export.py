@@ -0,0 +1,61 @@
+"""分块导出：逐块生成数据框并依次写入 CSV / Parquet / Arrow IPC 文件，不在内存中拼出完整表"""
+import tempfile
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+EXPORT_CHUNK_ROWS = 20_000
+# 格式 -> (MIME类型, 扩展名)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+}
+
+def row_chunks(n_rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """[0, n_rows) 按块切分的 (起点, 终点)"""
+    return [(start, min(start + chunk_rows, n_rows)) for start in range(0, n_rows, chunk_rows)]
+
+def export_schema(table):
+    """由首块推断导出的Arrow模式：分类（字典）列写为取值类型，首块中全空的列写为字符串"""
+    fields = []
+    for f in table.schema:
+        if pa.types.is_dictionary(f.type):
+            f = f.with_type(f.type.value_type)
+        elif pa.types.is_null(f.type):
+            f = f.with_type(pa.string())
+        fields.append(f)
+    return pa.schema(fields)
+
+def write_export(frames, fmt, sink):
+    """把数据框序列依次写入 sink（二进制文件对象或路径），返回写出的行数
+
+    CSV 只在第一块写表头；Parquet 每块为一个行组；Arrow IPC 每块为一个记录批。
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    n_rows = 0
+    writer = schema = None
+    try:
+        for frame in frames:
+            if fmt == 'csv':
+                sink.write(frame.to_csv(index=False, header=n_rows == 0).encode('utf-8'))
+            else:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    schema = export_schema(table)
+                    writer = pq.ParquetWriter(sink, schema) if fmt == 'parquet' else ipc.new_file(sink, schema)
+                writer.write_table(table.cast(schema))
+            n_rows += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+    return n_rows
+
+def export_bytes(frames, fmt):
+    """导出为字节串：先写入临时文件再一次读出，内存中只有最终文件内容和当前块"""
+    with tempfile.TemporaryFile() as f:
+        write_export(frames, fmt, f)
+        f.seek(0)
+        return f.read()
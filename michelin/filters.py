@@ -0,0 +1,89 @@
+"""筛选引擎：筛选条件与基于倒排索引位图的行选择"""
+from dataclasses import dataclass
+
+import numpy as np
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """侧边栏筛选条件；None或空元组表示该项不过滤
+
+    多选项在构造时规范化为排序去重的元组，相同条件得到相同（可哈希）的对象。
+    near 为 (纬度, 经度, 半径公里)，bbox 为 (最小纬度, 最大纬度, 最小经度, 最大经度)。
+    query 为全文搜索词（规范化为小写、单空格分隔，空字符串视为不搜索）。
+    """
+    continent: object = None
+    city: object = None
+    awards: tuple = ()
+    cuisines: tuple = ()
+    facilities: tuple = ()  # 需同时具备全部设施
+    price_levels: tuple = ()
+    near: object = None
+    bbox: object = None
+    query: object = None
+
+    def __post_init__(self):
+        for name in ('awards', 'cuisines', 'facilities', 'price_levels'):
+            object.__setattr__(self, name, tuple(sorted(set(getattr(self, name)))))
+        for name in ('near', 'bbox'):
+            value = getattr(self, name)
+            if value is not None:
+                object.__setattr__(self, name, tuple(float(v) for v in value))
+        if self.query is not None:
+            object.__setattr__(self, 'query', ' '.join(str(self.query).casefold().split()) or None)
+
+def rows_bitmap(dataset, field, values):
+    """取值集合的行位图（各取值倒排表的并集）"""
+    bitmap = np.zeros(dataset.n_rows, dtype=bool)
+    postings = dataset.index[field]
+    for value in values:
+        rows = postings.get(value)
+        if rows is not None:
+            bitmap[rows] = True
+    return bitmap
+
+def membership_bitmap(encoding, values, how='any'):
+    """多热矩阵列即菜系/设施的行位图：any取并集，all取交集"""
+    cols = [encoding.position[value] for value in values if value in encoding.position]
+    if how == 'all' and len(cols) < len(set(values)):
+        return np.zeros(len(encoding.matrix), dtype=bool)  # 含词表外设施时不可能全部满足
+    sub = encoding.matrix[:, cols]
+    return sub.any(axis=1) if how == 'any' else sub.all(axis=1)
+
+def rows_to_bitmap(dataset, rows):
+    bitmap = np.zeros(dataset.n_rows, dtype=bool)
+    bitmap[rows] = True
+    return bitmap
+
+def filter_bitmap(dataset, spec):
+    """按筛选条件求各字段位图的交集（从有效行出发，已删除的行不会被选中）"""
+    bitmap = dataset.live.copy()
+    if spec.continent is not None:
+        bitmap &= rows_bitmap(dataset, 'Continent', [spec.continent])
+    if spec.city is not None:
+        bitmap &= rows_bitmap(dataset, 'City', [spec.city])
+    if spec.awards:
+        bitmap &= rows_bitmap(dataset, 'Award', spec.awards)
+    if spec.cuisines:
+        bitmap &= membership_bitmap(dataset.cuisines, spec.cuisines, how='any')
+    if spec.facilities:
+        bitmap &= membership_bitmap(dataset.facilities, spec.facilities, how='all')
+    if spec.price_levels:
+        bitmap &= rows_bitmap(dataset, 'Price_level', spec.price_levels)
+    # 空间条件走网格索引，只对候选点计算距离
+    if spec.near is not None:
+        near_rows, _ = dataset.spatial.within_radius(*spec.near)
+        bitmap &= rows_to_bitmap(dataset, near_rows)
+    if spec.bbox is not None:
+        bitmap &= rows_to_bitmap(dataset, dataset.spatial.within_bbox(*spec.bbox))
+    # 全文搜索：任一查询词命中（BM25 得分大于0）
+    if spec.query is not None:
+        bitmap &= dataset.search.scores(spec.query) > 0
+    return bitmap
+
+def select(dataset, spec):
+    """满足筛选条件的行号（升序）"""
+    return np.flatnonzero(filter_bitmap(dataset, spec))
+
+def filter_frame(dataset, spec):
+    """满足筛选条件的数据框（一次性按行号取出）"""
+    return dataset.df.take(select(dataset, spec))
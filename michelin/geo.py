@@ -0,0 +1,162 @@
+"""地理计算：按地图缩放级别的服务端网格聚合，由餐厅经纬度推导的城市坐标表"""
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from .analytics import STAR_AWARDS
+
+# Web墨卡托可表示的纬度范围
+MAX_MERCATOR_LAT = 85.05112878
+# 每个256像素瓦片划分的聚合网格数（约40像素一个单元）
+CLUSTER_CELLS_PER_TILE = 6
+
+def mercator_xy(lat, lon):
+    """经纬度 -> Web墨卡托归一化坐标，x、y 均在 [0, 1] 内"""
+    lat = np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    x = (np.asarray(lon) + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    return x, y
+
+def located_rows(dataset, rows):
+    """有经纬度的行号"""
+    lat = dataset.column('Latitude', rows).astype(float)
+    lon = dataset.column('Longitude', rows).astype(float)
+    return rows[~(np.isnan(lat) | np.isnan(lon))]
+
+def points_center(dataset, rows):
+    """点位中心（经纬度中位数），无坐标时返回 None"""
+    rows = located_rows(dataset, rows)
+    if len(rows) == 0:
+        return None
+    return (float(np.median(dataset.column('Latitude', rows))),
+            float(np.median(dataset.column('Longitude', rows))))
+
+def cluster_points(dataset, rows, zoom, cells_per_tile=CLUSTER_CELLS_PER_TILE, max_clusters=5000):
+    """把餐厅点位聚合到当前缩放级别的屏幕网格中
+
+    返回 (聚合结果, 实际使用的缩放级别)。聚合数超过 max_clusters 时逐级降低缩放级别，
+    保证发送到浏览器的点数有上限。单家餐厅的单元以餐厅名作为标签。
+    """
+    rows = located_rows(dataset, np.asarray(rows))
+    columns = ['Lat', 'Lon', 'Count', 'Starred_Count', 'Avg_Price_Level', 'Label']
+    if len(rows) == 0:
+        return pd.DataFrame(columns=columns), int(zoom)
+    
+    lat = dataset.column('Latitude', rows).astype(float)
+    lon = dataset.column('Longitude', rows).astype(float)
+    x, y = mercator_xy(lat, lon)
+    
+    zoom = int(zoom)
+    while True:
+        n_cells = int(2 ** zoom * cells_per_tile)
+        cell_x = np.minimum((x * n_cells).astype(np.int64), n_cells - 1)
+        cell_y = np.minimum((y * n_cells).astype(np.int64), n_cells - 1)
+        _, inverse, counts = np.unique(cell_y * n_cells + cell_x, return_inverse=True, return_counts=True)
+        if len(counts) <= max_clusters or zoom <= 0:
+            break
+        zoom -= 1
+    inverse = inverse.ravel()
+    
+    price = dataset.column('Price_level', rows).astype(float)
+    has_price = ~np.isnan(price)
+    price_count = np.bincount(inverse, weights=has_price, minlength=len(counts))
+    price_total = np.bincount(inverse, weights=np.where(has_price, price, 0.0), minlength=len(counts))
+    starred = np.isin(dataset.column('Award', rows), STAR_AWARDS)
+    
+    # 每个单元的第一家餐厅（倒序赋值后保留最小下标）
+    first = np.empty(len(counts), dtype=np.int64)
+    first[inverse[::-1]] = np.arange(len(inverse))[::-1]
+    names = dataset.column('Name', rows[first])
+    
+    clusters = pd.DataFrame({
+        'Lat': np.bincount(inverse, weights=lat) / counts,
+        'Lon': np.bincount(inverse, weights=lon) / counts,
+        'Count': counts,
+        'Starred_Count': np.bincount(inverse, weights=starred, minlength=len(counts)).astype(np.int64),
+        'Avg_Price_Level': np.divide(price_total, price_count, out=np.zeros(len(counts)), where=price_count > 0),
+        'Label': np.where(counts == 1, names, [f"{count} 家餐厅" for count in counts]),
+    }, columns=columns)
+    return clusters, zoom
+
+@dataclass
+class CityCoordinates:
+    """各 (City, Country) 有坐标餐厅的经纬度累加量，城市坐标取其平均值
+
+    增量只累加新行、扣除失效行，只改动涉及到的城市；城市序号只增不减，餐厅全部失效的城市计数归零。
+    """
+    labels: list = field(default_factory=list)      # 城市序号 -> (City, Country, Continent)
+    lookup: dict = field(default_factory=dict)      # (City, Country) -> 城市序号
+    sum_lat: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    sum_lon: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    counts: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    @cached_property
+    def frame(self):
+        """城市坐标表：City、Country、Continent、Lat、Lon、Restaurants（有坐标的餐厅数），按餐厅数降序"""
+        present = np.flatnonzero(self.counts > 0)
+        labels = [self.labels[i] for i in present]
+        counts = self.counts[present]
+        cities = pd.DataFrame({
+            'City': [label[0] for label in labels],
+            'Country': [label[1] for label in labels],
+            'Continent': [label[2] for label in labels],
+            'Lat': self.sum_lat[present] / counts,
+            'Lon': self.sum_lon[present] / counts,
+            'Restaurants': counts,
+        })
+        return cities.sort_values(['Restaurants', 'City'], ascending=[False, True], ignore_index=True)
+
+    def appended(self, dataset, start, retired=()):
+        """累加 start 之后的新行、扣除失效的旧行，返回新的坐标表（原表不变）"""
+        updated = CityCoordinates(list(self.labels), dict(self.lookup),
+                                  self.sum_lat.copy(), self.sum_lon.copy(), self.counts.copy())
+        updated._accumulate(dataset, np.asarray(retired, dtype=np.int64), -1)
+        updated._accumulate(dataset, np.arange(start, dataset.n_rows), 1)
+        return updated
+
+    def _accumulate(self, dataset, rows, sign):
+        rows = located_rows(dataset, rows)
+        if len(rows) == 0:
+            return
+        city = dataset.column('City', rows)
+        country = dataset.column('Country', rows)
+        continent = dataset.column('Continent', rows)
+        codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([city, country]))
+        # 只对本批出现的城市查表，新城市追加序号
+        first = np.unique(codes, return_index=True)[1]
+        ids = np.empty(len(pairs), dtype=np.int64)
+        for code, pair in enumerate(pairs):
+            if pair not in self.lookup:
+                self.lookup[pair] = len(self.labels)
+                self.labels.append((pair[0], pair[1], continent[first[code]]))
+            ids[code] = self.lookup[pair]
+        size = len(self.labels)
+        if size > len(self.counts):
+            grow = size - len(self.counts)
+            self.sum_lat = np.concatenate([self.sum_lat, np.zeros(grow)])
+            self.sum_lon = np.concatenate([self.sum_lon, np.zeros(grow)])
+            self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+        targets = ids[codes]
+        np.add.at(self.sum_lat, targets, sign * dataset.column('Latitude', rows).astype(float))
+        np.add.at(self.sum_lon, targets, sign * dataset.column('Longitude', rows).astype(float))
+        np.add.at(self.counts, targets, sign)
+
+def city_coordinates(dataset):
+    """由有效餐厅经纬度构建城市坐标累加表（见 CityCoordinates）"""
+    cities = CityCoordinates()
+    cities._accumulate(dataset, dataset.live_rows(), 1)
+    return cities
+
+def locate_cities(city_counts, cities, continent=None):
+    """给城市统计表合并 Lat、Lon 列（按城市名连接，没有坐标的城市被丢弃）
+
+    cities 为 CityCoordinates；给定 continent 时只取该大洲的城市，同名城市取餐厅最多的一个。
+    """
+    cities = cities.frame
+    if continent is not None:
+        cities = cities[cities['Continent'] == continent]
+    coords = cities.drop_duplicates('City')[['City', 'Lat', 'Lon']]
+    return city_counts.merge(coords, on='City', how='inner')
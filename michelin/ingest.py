@@ -0,0 +1,183 @@
+"""增量更新：按 Name+Address 应用插入/更新/删除，并写入增量日志供重启后重放
+
+增量文件的列与 cleaned.csv 相同，可选的 Operation 列取 insert / update / upsert / delete，
+缺省时按插入或更新处理；删除记录只需提供 Name 和 Address。
+
+    python -m michelin.ingest delta.csv --data cleaned.csv
+"""
+import argparse
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .data import (
+    DATA_PATH,
+    DERIVED_COLUMNS,
+    FILTER_FIELDS,
+    Dataset,
+    append_frame,
+    compact_frame,
+    derive_columns,
+    load_dataset,
+    snapshot_path,
+)
+from .cube import update_cube
+
+KEY_COLUMNS = ['Name', 'Address']
+OPERATION_COLUMN = 'Operation'
+UPSERT_OPERATIONS = {'insert', 'update', 'upsert'}
+DELETE_OPERATIONS = {'delete'}
+
+# 主键映射与日志序号都由增量更新独占维护，同一进程内串行执行
+_LOCK = threading.RLock()
+
+def read_delta(source, name=None):
+    """读取增量文件（CSV或Parquet），source 可为路径或已打开的文件对象"""
+    name = name or (source if isinstance(source, str) else getattr(source, 'name', ''))
+    if str(name).lower().endswith('.parquet'):
+        delta = pd.read_parquet(source)
+    else:
+        delta = pd.read_csv(source, encoding='utf-8', encoding_errors='ignore')
+    return normalize_delta(delta)
+
+def normalize_delta(delta):
+    """校验键列并规范化操作列；同一餐厅出现多次时以最后一条为准"""
+    missing = [col for col in KEY_COLUMNS if col not in delta.columns]
+    if missing:
+        raise ValueError(f"增量数据缺少键列: {', '.join(missing)}")
+    delta = delta.dropna(subset=KEY_COLUMNS).copy()
+    if OPERATION_COLUMN in delta.columns:
+        operations = delta[OPERATION_COLUMN].fillna('upsert').astype(str).str.strip().str.lower()
+    else:
+        operations = pd.Series('upsert', index=delta.index)
+    unknown = sorted(set(operations) - UPSERT_OPERATIONS - DELETE_OPERATIONS)
+    if unknown:
+        raise ValueError(f"未知的增量操作: {', '.join(unknown)}")
+    delta[OPERATION_COLUMN] = np.where(operations.isin(list(DELETE_OPERATIONS)), 'delete', 'upsert')
+    return delta.drop_duplicates(KEY_COLUMNS, keep='last').reset_index(drop=True)
+
+def key_positions(dataset):
+    """(Name, Address) -> 有效行号；首次调用时由有效行构建"""
+    if dataset.keys is None:
+        rows = dataset.live_rows()
+        names = dataset.column('Name', rows)
+        addresses = dataset.column('Address', rows)
+        dataset.keys = dict(zip(zip(names, addresses), rows.tolist()))
+    return dataset.keys
+
+def delta_fingerprint(fingerprint, delta):
+    """在原指纹后链接增量内容的摘要；'+' 之前保持为源文件指纹"""
+    digest = hashlib.blake2b(fingerprint.encode(), digest_size=8)
+    digest.update(pd.util.hash_pandas_object(delta, index=False).to_numpy().tobytes())
+    return f"{fingerprint.partition('+')[0]}+{digest.hexdigest()}"
+
+def apply_delta(dataset, delta):
+    """应用一批增量，返回新的数据集（原数据集不变，可继续服务进行中的查询）
+
+    被删除或更新的旧行只在有效行位图中置为失效，插入或更新的行追加到末尾，
+    因此已有行号保持不变；清洗、编码、倒排索引、空间索引、搜索与自动补全索引、预聚合立方体、相似餐厅索引和城市坐标都只处理增量行。
+    数据框各列、多热编码矩阵写入只追加缓冲区的预留容量，搜索索引的新文档单独成段，已有的行不复制；
+    仍与总量相关的只有有效行位图（每行1字节）和与单元格数、词表大小相关的小数组的复制。
+    """
+    delta = normalize_delta(delta)
+    upserts = delta[delta[OPERATION_COLUMN] == 'upsert'].drop(columns=OPERATION_COLUMN)
+    if len(upserts):
+        required = [col for col in dataset.df.columns if col not in DERIVED_COLUMNS + ['Price_level']]
+        missing = [col for col in required if col not in upserts.columns]
+        if missing:
+            raise ValueError(f"插入/更新记录缺少列: {', '.join(missing)}")
+        new_rows = compact_frame(derive_columns(upserts).reindex(columns=dataset.df.columns))
+    else:
+        new_rows = dataset.df.iloc[:0]
+
+    with _LOCK:
+        keys = key_positions(dataset)
+        # 主键映射随新数据集移交，旧数据集若再被更新会重新构建
+        dataset.keys = None
+        live = dataset.live.copy()
+        retired = [keys.pop(key) for key in zip(delta['Name'], delta['Address']) if key in keys]
+        live[retired] = False
+
+        start = dataset.n_rows
+        positions = np.arange(start, start + len(new_rows))
+        new_rows.index = pd.RangeIndex(start, start + len(new_rows))
+        keys.update(zip(zip(new_rows['Name'], new_rows['Address']), positions.tolist()))
+        # 缓冲区表按版本各自持有，旧数据集再被更新时由 AppendBuffer 复制出自己的缓冲区
+        buffers = dict(dataset.buffers)
+
+        updated = Dataset(
+            df=append_frame(dataset.df, new_rows, buffers) if len(new_rows) else dataset.df,
+            fingerprint=delta_fingerprint(dataset.fingerprint, delta),
+            cuisines=dataset.cuisines.appended(new_rows['Cuisine_list']),
+            facilities=dataset.facilities.appended(new_rows['Facilities_list']),
+            index={name: dataset.index[name].appended(new_rows[name], start) for name in FILTER_FIELDS},
+            spatial=dataset.spatial.appended(positions, new_rows['Latitude'], new_rows['Longitude']),
+            live=np.concatenate([live, np.ones(len(new_rows), dtype=bool)]),
+            keys=keys,
+            buffers=buffers,
+            deltas_applied=dataset.deltas_applied + 1
+        )
+        if dataset.cube is not None:
+            updated.cube = update_cube(dataset.cube, updated, retired, start)
+        # 只延续已构建的延迟索引；未构建的由新数据集在首次使用时整体构建
+        built = dataset.built_indexes()
+        if 'search' in built:
+            updated.search = dataset.search.appended(new_rows, start)
+        if 'autocomplete' in built:
+            updated.autocomplete = dataset.autocomplete.appended(new_rows, start, retired)
+        if 'similar' in built:
+            updated.similar = dataset.similar.appended(updated, start)
+        if dataset.cities is not None:
+            updated.cities = dataset.cities.appended(updated, start, retired)
+        return updated
+
+def delta_log_dir(path, fingerprint):
+    """增量日志目录：与快照同目录，按源文件指纹区分，源文件变化后随旧快照一起清理"""
+    return snapshot_path(path, fingerprint.partition('+')[0])[:-len('.parquet')] + '.deltas'
+
+def _log_files(log_dir):
+    if not os.path.isdir(log_dir):
+        return []
+    return sorted(name for name in os.listdir(log_dir) if name.endswith('.parquet'))
+
+def record_delta(path, fingerprint, delta):
+    """将一批增量追加到日志（按序号命名的Parquet文件），返回文件路径"""
+    log_dir = delta_log_dir(path, fingerprint)
+    with _LOCK:
+        os.makedirs(log_dir, exist_ok=True)
+        log_file = os.path.join(log_dir, f"{len(_log_files(log_dir)) + 1:06d}.parquet")
+        tmp_file = f"{log_file}.{os.getpid()}.tmp"
+        normalize_delta(delta).to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, log_file)
+    return log_file
+
+def replay_delta_log(dataset, path=DATA_PATH):
+    """按序应用日志中尚未应用的增量（无新增量时原样返回）"""
+    log_dir = delta_log_dir(path, dataset.fingerprint)
+    with _LOCK:
+        for name in _log_files(log_dir)[dataset.deltas_applied:]:
+            dataset = apply_delta(dataset, pd.read_parquet(os.path.join(log_dir, name)))
+    return dataset
+
+def ingest_delta(dataset, delta, path=DATA_PATH):
+    """应用增量并写入日志：先追上日志，再确认增量可以应用后才落盘"""
+    with _LOCK:
+        dataset = replay_delta_log(dataset, path)
+        updated = apply_delta(dataset, delta)
+        record_delta(path, dataset.fingerprint, delta)
+        return updated
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='将增量文件写入增量日志，仪表盘下次交互时自动应用')
+    parser.add_argument('delta', help='增量文件（CSV或Parquet）')
+    parser.add_argument('--data', default=DATA_PATH, help='源数据CSV')
+    args = parser.parse_args(argv)
+
+    dataset = ingest_delta(load_dataset(args.data), read_delta(args.delta), args.data)
+    print(f"已记录增量，当前有效餐厅 {int(dataset.live.sum()):,} 家（累计 {dataset.deltas_applied} 批增量）")
+
+if __name__ == '__main__':
+    main()
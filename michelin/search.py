@@ -0,0 +1,156 @@
+"""全文搜索：Description、Name、Cuisine 上的 BM25 倒排索引"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .buffers import AppendBuffer
+
+# 各字段的词频权重（名称、菜系命中比描述中的一次提及更相关）
+SEARCH_FIELDS = {'Name': 3.0, 'Cuisine': 2.0, 'Description': 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have in is it its of on or that the this to was were with'.split()
+)
+
+def fold_array(values):
+    """字符串数组规范化：NFKD去掉重音并转小写，返回Arrow字符串数组（缺失值为null）"""
+    text = pa.array(np.asarray(values, dtype=object), type=pa.string(), from_pandas=True)
+    return pc.utf8_lower(pc.replace_substring_regex(pc.utf8_normalize(text, 'NFKD'), r'\p{Mn}', ''))
+
+def tokenize_array(values):
+    """字符串数组分词：规范化后按非字母数字切分，返回Arrow列表数组"""
+    return pc.split_pattern_regex(fold_array(values), r'[^\p{L}\p{N}]+')
+
+def tokenize(text):
+    """查询分词（与建索引时的规则相同，并去掉停用词）"""
+    tokens = tokenize_array([text])[0].as_py() or []
+    return [token for token in tokens if token and token not in STOPWORDS]
+
+def _field_terms(values, weight):
+    """单个字段展开为 (词, 行号, 权重)，空词和停用词不产生记录"""
+    lists = tokenize_array(values)
+    terms = pc.list_flatten(lists)
+    rows = pc.list_parent_indices(lists)
+    keep = pc.and_(pc.greater(pc.utf8_length(terms), 0), pc.invert(pc.is_in(terms, pa.array(sorted(STOPWORDS)))))
+    terms, rows = terms.filter(keep), rows.filter(keep).to_numpy().astype(np.int64)
+    return terms, rows, np.full(len(rows), weight)
+
+@dataclass
+class PostingSegment:
+    """一段连续行号的倒排表：同一个词的 (行号, 加权词频) 在 rows/tfs 中连续存放，indptr 给出各词的区间"""
+    terms: dict            # 词 -> 序号
+    indptr: np.ndarray     # 第 i 个词的倒排表为 rows[indptr[i]:indptr[i+1]]
+    rows: np.ndarray
+    tfs: np.ndarray
+
+    def postings(self, term):
+        i = self.terms.get(term)
+        if i is None:
+            return None, None
+        return self.rows[self.indptr[i]:self.indptr[i + 1]], self.tfs[self.indptr[i]:self.indptr[i + 1]]
+
+    def merged(self, later):
+        """与行号在其后的段合并为一段"""
+        terms = dict(self.terms)
+        for term in later.terms:
+            terms.setdefault(term, len(terms))
+        later_ids = np.array([terms[term] for term in later.terms], dtype=np.int64)
+        ids = np.concatenate([
+            np.repeat(np.arange(len(self.terms)), np.diff(self.indptr)),
+            np.repeat(later_ids, np.diff(later.indptr))
+        ])
+        # 稳定排序保持每个词内前一段的行在前、行号升序
+        order = np.argsort(ids, kind='stable')
+        return PostingSegment(
+            terms=terms,
+            indptr=np.concatenate([[0], np.cumsum(np.bincount(ids, minlength=len(terms)))]),
+            rows=np.concatenate([self.rows, later.rows])[order],
+            tfs=np.concatenate([self.tfs, later.tfs])[order]
+        )
+
+@dataclass
+class SearchIndex:
+    """BM25 倒排索引：按行号先后分为若干段，查询时依次取各段的倒排表
+
+    增量追加的文档单独成段，最后一段不小于前一段的一半时两段合并，段数因此只随总行数对数增长，
+    追加的均摊开销只与增量行数相关。
+    文档长度为各字段加权词数之和；已删除的行仍计入文档数与平均长度，
+    只影响得分的绝对值，查询时由筛选位图排除。
+    """
+    segments: tuple
+    doc_len: np.ndarray
+    _doc_len_buffer: AppendBuffer = field(default=None, repr=False)  # doc_len 所在的只追加缓冲区，首次追加时建立
+    _last: tuple = field(default=None, repr=False)  # 最近一次查询的 (规范化查询, 得分)
+
+    @property
+    def n_rows(self):
+        return len(self.doc_len)
+
+    def postings(self, term):
+        parts = [segment.postings(term) for segment in self.segments]
+        parts = [part for part in parts if part[0] is not None]
+        if not parts:
+            return None, None
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate([rows for rows, _ in parts]), np.concatenate([tfs for _, tfs in parts])
+
+    def scores(self, query):
+        """所有行的 BM25 得分（查询词任一命中即大于0）；连续相同的查询直接复用上次结果
+
+        _last 由所有会话共享，只读取一次再比较，避免其他线程在检查与返回之间替换成别的查询。
+        """
+        last = self._last
+        if last is not None and last[0] == query:
+            return last[1]
+        scores = np.zeros(self.n_rows)
+        avg_len = self.doc_len.mean() if self.n_rows else 0.0
+        for term in set(tokenize(query)):
+            rows, tfs = self.postings(term)
+            if rows is None:
+                continue
+            idf = np.log1p((self.n_rows - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[rows] / avg_len)
+            scores[rows] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)  # 同一词的倒排表内行号不重复
+        self._last = (query, scores)
+        return scores
+
+    def appended(self, frame, start):
+        """追加第 start 行起的文档，返回新的索引（原索引不变）"""
+        new = build_search_index(frame, start)
+        segments = list(self.segments) + list(new.segments)
+        while len(segments) > 1 and 2 * len(segments[-1].rows) >= len(segments[-2].rows):
+            later = segments.pop()
+            segments[-1] = segments[-1].merged(later)
+        buffer, doc_len = (self._doc_len_buffer or AppendBuffer(self.doc_len)).extend(self.n_rows, new.doc_len)
+        return SearchIndex(tuple(segments), doc_len, buffer)
+
+def build_search_index(df, start=0):
+    """由数据框构建搜索索引；start 为第一行的行号（增量追加时使用）"""
+    parts = [_field_terms(df[name], weight) for name, weight in SEARCH_FIELDS.items() if name in df.columns]
+    # 词经字典编码为整数后，(词, 行) 组合键一次排序去重即可累加词频
+    encoded = pa.chunked_array([terms for terms, _, _ in parts], type=pa.string()).combine_chunks().dictionary_encode()
+    term_ids = encoded.indices.to_numpy().astype(np.int64)
+    rows = np.concatenate([rows for _, rows, _ in parts])
+    weights = np.concatenate([weights for _, _, weights in parts])
+    n_rows = len(df)
+    keys, inverse = np.unique(term_ids * n_rows + rows, return_inverse=True)
+    tfs = np.bincount(inverse.reshape(-1), weights=weights, minlength=len(keys))
+    term_ids, rows = np.divmod(keys, max(n_rows, 1))
+    vocab = encoded.dictionary.to_pylist()
+    segment = PostingSegment(
+        terms={term: i for i, term in enumerate(vocab)},
+        indptr=np.concatenate([[0], np.cumsum(np.bincount(term_ids, minlength=len(vocab)))]),
+        rows=rows + start,
+        tfs=tfs.astype(np.float32)
+    )
+    return SearchIndex(segments=(segment,), doc_len=np.bincount(rows, weights=tfs, minlength=n_rows))
+
+def rank_rows(index, query, rows):
+    """按 BM25 得分降序排列给定行（得分相同保持原顺序），返回 (行号, 得分)"""
+    scores = index.scores(query)[rows]
+    order = np.argsort(-scores, kind='stable')
+    return np.asarray(rows)[order], scores[order]
@@ -0,0 +1,296 @@
+"""相似餐厅推荐：描述 TF-IDF、菜系/设施集合、价格、评级与地理距离的加权相似度
+
+加载时为每家餐厅构建稀疏的 TF-IDF 向量（CSR 三元组 indptr/indices/data），并把各部分特征
+按权重随机投影为同一个低维稠密向量，再用球面 k-means 把向量分到若干单元（倒排文件，IVF）。
+查询时只在最接近的几个单元中计算精确相似度，不与全表逐一比较。
+"""
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+from .buffers import extended
+from .search import _field_terms
+from .spatial import haversine_km
+
+# 各部分相似度的权重（合计为1）
+SIMILARITY_WEIGHTS = {'text': 0.35, 'cuisine': 0.25, 'facilities': 0.1, 'price': 0.1, 'award': 0.1, 'geo': 0.1}
+AWARD_LEVELS = {'Bib Gourmand': 0, '1 Star': 1, '2 Stars': 2, '3 Stars': 3}
+MAX_LEVEL = 3          # 价格等级1-4与评级0-3都映射到 0..MAX_LEVEL
+GEO_SCALE_KM = 300.0   # 地理相似度 exp(-距离/GEO_SCALE_KM)
+MIN_DF = 2             # 只出现在一篇描述中的词不参与相似度
+EMBED_DIM = 128       # 随机投影后的维数
+EMBED_TERMS = 16      # 嵌入向量只使用每篇描述中 TF-IDF 最高的词
+N_PROBE = 8           # 每次查询检查的单元数（单元总数约为行数的平方根）
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLE = 20_000 # 质心在抽样行上训练
+SEED = 0
+# 增量缓冲区超过该行数且超过索引规模的该比例时，整体重建单元列表
+MIN_MERGE_ROWS = 10_000
+MERGE_RATIO = 0.05
+
+def _term_counts(values, vocab=None):
+    """文本列 -> (行号, 词序号, 次数)，按行号、词序号排序
+
+    未给定 vocab 时返回本批文本的词表；给定时按 vocab 编号，词表外的词丢弃。
+    """
+    terms, rows, _ = _field_terms(values, 1.0)
+    encoded = terms.dictionary_encode()
+    ids = encoded.indices.to_numpy().astype(np.int64)
+    words = encoded.dictionary.to_pylist()
+    if vocab is not None:
+        remap = np.array([vocab.get(word, -1) for word in words], dtype=np.int64)
+        ids = remap[ids] if len(words) else ids
+        rows, ids = rows[ids >= 0], ids[ids >= 0]
+        words = None
+    width = max(len(vocab) if vocab is not None else len(words), 1)
+    keys, counts = np.unique(rows * width + ids, return_counts=True)
+    rows, ids = np.divmod(keys, width)
+    return rows, ids, counts, words
+
+def _csr(rows, ids, weights, n_rows):
+    """按行排序的 (行号, 列, 权重) -> 每行 L2 归一化的 CSR 三元组"""
+    norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n_rows))
+    data = (weights / norms[rows]).astype(np.float32)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_rows))])
+    return indptr, ids.astype(np.int32), data
+
+def _project_sparse(indptr, indices, data, matrix):
+    """CSR 矩阵乘投影矩阵（EMBED_DIM × 列数）：逐维对非零项加权求和，临时对象只与非零项数相关"""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    out = np.empty((len(indptr) - 1, len(matrix)), dtype=np.float32)
+    for dim, weights in enumerate(matrix):
+        out[:, dim] = np.bincount(rows, weights=data * weights[indices], minlength=len(out))
+    return out
+
+def _top_terms(indptr, indices, data, n_terms):
+    """每行只保留权重最大的 n_terms 个词并重新归一化（用于嵌入向量，精确相似度仍使用全部词）"""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    # 每行的权重已归一化到 (0, 1]，行号 + (1 - 权重) 一次排序即得到行内按权重降序
+    order = np.argsort(rows + (1.0 - data))
+    keep = order[np.arange(len(order)) - indptr[rows[order]] < n_terms]
+    keep.sort()
+    return _csr(rows[keep], indices[keep], data[keep].astype(float), len(indptr) - 1)
+
+def _project_dense(values, matrix, chunk_rows=50_000):
+    out = np.empty((len(values), len(matrix)), dtype=np.float32)
+    for start in range(0, len(values), chunk_rows):
+        out[start:start + chunk_rows] = values[start:start + chunk_rows].astype(np.float32) @ matrix.T
+    return out
+
+def _gaussian(block, offset, n):
+    """特征块第 offset 列起的 n 列随机投影（EMBED_DIM × n）；结果确定，词表扩展时只需生成新增的列"""
+    rng = np.random.default_rng([SEED, list(SIMILARITY_WEIGHTS).index(block), offset])
+    return rng.standard_normal((EMBED_DIM, n)).astype(np.float32) / np.sqrt(EMBED_DIM)
+
+def _ordinal(levels):
+    """有序等级映射到四分之一圆上的单位向量，内积随等级差减小；缺失为零向量"""
+    angle = levels / MAX_LEVEL * (np.pi / 2)
+    vectors = np.column_stack([np.cos(angle), np.sin(angle)])
+    return np.nan_to_num(vectors)
+
+def _unit_sphere(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.nan_to_num(np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]))
+
+def _row_normalized(matrix):
+    counts = matrix.sum(axis=1, keepdims=True)
+    return matrix / np.sqrt(np.maximum(counts, 1))
+
+def _levels(dataset, rows):
+    """价格与评级等级（0..MAX_LEVEL，缺失为NaN）"""
+    price = dataset.column('Price_level', rows).astype(float) - 1
+    award = np.array([AWARD_LEVELS.get(award, np.nan) for award in dataset.column('Award', rows)], dtype=float)
+    return price, award
+
+def _nearest(embedding, centroids, chunk_rows=20_000):
+    """每行最近（内积最大）的质心，分块计算避免 行数×质心数 的大矩阵"""
+    parts = [np.argmax(embedding[i:i + chunk_rows] @ centroids.T, axis=1) for i in range(0, len(embedding), chunk_rows)]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+def _kmeans(embedding, n_cells):
+    """球面 k-means：在抽样行上迭代，质心为所属单位向量之和的方向；空簇保留原质心"""
+    rng = np.random.default_rng([SEED, len(SIMILARITY_WEIGHTS)])
+    sample = embedding[rng.choice(len(embedding), min(len(embedding), KMEANS_SAMPLE), replace=False)]
+    centroids = sample[rng.choice(len(sample), n_cells, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assigned = _nearest(sample, centroids)
+        sums = np.column_stack([np.bincount(assigned, weights=column, minlength=n_cells) for column in sample.T])
+        norms = np.linalg.norm(sums, axis=1)
+        filled = norms > 0
+        centroids[filled] = sums[filled] / norms[filled, None]
+    return centroids
+
+@dataclass
+class SimilarityIndex:
+    """相似餐厅索引：描述 TF-IDF（CSR）+ 倒排文件（IVF）
+
+    各行的嵌入向量按质心分到 N_CELLS 个单元，cell_rows 按单元存放行号，cell_indptr 给出各单元的区间；
+    查询时只取与查询向量最接近的 N_PROBE 个单元中的行作为候选。嵌入向量本身不保存，需要时按行重算。
+    描述词表、IDF、中心与质心在全量构建时确定，增量追加的行只使用词表内的词并分到最近的已有单元；
+    追加的行先放在缓冲区 extra_rows 中，累积到一定规模后再并入单元列表；CSR 与每行所属单元写入只追加缓冲区。
+    """
+    vocab: dict                  # 词 -> 列号
+    idf: np.ndarray
+    indptr: np.ndarray           # 描述 TF-IDF（CSR）
+    indices: np.ndarray
+    data: np.ndarray
+    projections: dict            # 特征块 -> 随机投影矩阵（EMBED_DIM × 特征数）
+    center: np.ndarray           # 全量构建时嵌入向量的均值
+    centroids: np.ndarray        # 单元 × EMBED_DIM
+    cells: np.ndarray            # 每行所属单元
+    cell_indptr: np.ndarray
+    cell_rows: np.ndarray
+    extra_rows: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    _buffers: dict = field(default_factory=dict, repr=False)  # indptr、indices、data、cells 所在的只追加缓冲区
+
+    def _project(self, dataset, rows, indptr, indices, data):
+        """给定行（及其 TF-IDF 的 CSR）的各特征块投影后按权重相加"""
+        price, award = _levels(dataset, rows)
+        weights = {name: np.sqrt(weight) for name, weight in SIMILARITY_WEIGHTS.items()}
+        blocks = {
+            'cuisine': _row_normalized(dataset.cuisines.matrix[rows]),
+            'facilities': _row_normalized(dataset.facilities.matrix[rows]),
+            'price': _ordinal(price),
+            'award': _ordinal(award),
+            'geo': _unit_sphere(dataset.column('Latitude', rows), dataset.column('Longitude', rows)),
+        }
+        indptr, indices, data = _top_terms(indptr, indices, data, EMBED_TERMS)
+        embedding = weights['text'] * _project_sparse(indptr, indices, data, self.projections['text'])
+        for name, values in blocks.items():
+            embedding += weights[name] * _project_dense(values, self.projections[name])
+        return embedding
+
+    def _normalize(self, embedding):
+        # 各餐厅的等级、位置等分量方向相近，去中心化后内积才能区分远近
+        embedding = embedding - self.center
+        norms = np.linalg.norm(embedding, axis=1, keepdims=True)
+        return np.divide(embedding, norms, out=np.zeros_like(embedding), where=norms > 0)
+
+    def embed(self, dataset, row):
+        """单行的嵌入向量（单位向量）"""
+        lo, hi = self.indptr[row], self.indptr[row + 1]
+        return self._normalize(self._project(dataset, [row], np.array([0, hi - lo]), self.indices[lo:hi], self.data[lo:hi]))[0]
+
+    def candidates(self, dataset, row, n_probe=N_PROBE):
+        """与 row 的嵌入向量最接近的 n_probe 个单元中的行号（升序，含 row 本身）"""
+        nearest = np.argsort(-(self.centroids @ self.embed(dataset, row)), kind='stable')[:n_probe]
+        spans = [self.cell_rows[self.cell_indptr[cell]:self.cell_indptr[cell + 1]] for cell in nearest]
+        if len(self.extra_rows):
+            spans.append(self.extra_rows[np.isin(self.cells[self.extra_rows], nearest)])
+        return np.sort(np.concatenate(spans))
+
+    def text_similarity(self, row, rows):
+        """row 与 rows 的描述余弦相似度（只读取这些行的非零项）"""
+        query = np.zeros(len(self.vocab), dtype=np.float32)
+        query[self.indices[self.indptr[row]:self.indptr[row + 1]]] = self.data[self.indptr[row]:self.indptr[row + 1]]
+        lengths = self.indptr[rows + 1] - self.indptr[rows]
+        positions = np.repeat(self.indptr[rows] - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        products = self.data[positions] * query[self.indices[positions]]
+        return np.bincount(np.repeat(np.arange(len(rows)), lengths), weights=products, minlength=len(rows))
+
+    def appended(self, dataset, start):
+        """为数据集第 start 行起的新行计算特征并分配单元，返回新的索引（原索引不变）"""
+        rows, ids, counts, _ = _term_counts(dataset.df['Description'].iloc[start:], self.vocab)
+        indptr, indices, data = _csr(rows, ids, counts * self.idf[ids], dataset.n_rows - start)
+        projections = dict(self.projections)
+        for name, encoding in (('cuisine', dataset.cuisines), ('facilities', dataset.facilities)):
+            known = projections[name].shape[1]
+            if len(encoding.vocab) > known:
+                projections[name] = np.hstack([projections[name], _gaussian(name, known, len(encoding.vocab) - known)])
+        buffers = dict(self._buffers)
+        updated = replace(
+            self,
+            indptr=extended(buffers, 'indptr', len(self.indptr), self.indptr[-1] + indptr[1:], lambda: self.indptr),
+            indices=extended(buffers, 'indices', len(self.indices), indices, lambda: self.indices),
+            data=extended(buffers, 'data', len(self.data), data, lambda: self.data),
+            projections=projections,
+            _buffers=buffers
+        )
+        new_rows = np.arange(start, dataset.n_rows)
+        embedding = updated._normalize(updated._project(dataset, new_rows, indptr, indices, data))
+        updated.cells = extended(buffers, 'cells', len(self.cells), _nearest(embedding, self.centroids), lambda: self.cells)
+        updated.extra_rows = np.concatenate([self.extra_rows, new_rows])
+        if len(updated.extra_rows) > max(MIN_MERGE_ROWS, MERGE_RATIO * len(self.cells)):
+            updated = _cell_lists(updated)
+        return updated
+
+def _cell_lists(index):
+    """由每行所属单元重建各单元的行号列表，清空缓冲区"""
+    order = np.argsort(index.cells, kind='stable')
+    return replace(
+        index,
+        cell_indptr=np.concatenate([[0], np.cumsum(np.bincount(index.cells, minlength=len(index.centroids)))]),
+        cell_rows=order,
+        extra_rows=np.empty(0, dtype=np.int64)
+    )
+
+def build_similarity_index(dataset):
+    """由数据集（需已完成菜系/设施多热编码）构建相似餐厅索引"""
+    n_rows = dataset.n_rows
+    rows, ids, counts, words = _term_counts(dataset.df['Description'])
+    df = np.bincount(ids, minlength=len(words))
+    kept = np.flatnonzero(df >= MIN_DF)
+    remap = np.full(len(words), -1, dtype=np.int64)
+    remap[kept] = np.arange(len(kept))
+    ids = remap[ids]
+    rows, ids, counts = rows[ids >= 0], ids[ids >= 0], counts[ids >= 0]
+    idf = np.log((1 + n_rows) / (1 + df[kept])) + 1
+    indptr, indices, data = _csr(rows, ids, counts * idf[ids], n_rows)
+
+    projections = {'text': _gaussian('text', 0, len(kept))}
+    for name, size in (('cuisine', len(dataset.cuisines.vocab)), ('facilities', len(dataset.facilities.vocab)),
+                       ('price', 2), ('award', 2), ('geo', 3)):
+        projections[name] = _gaussian(name, 0, size)
+    index = SimilarityIndex(
+        vocab={words[i]: j for j, i in enumerate(kept)},
+        idf=idf,
+        indptr=indptr,
+        indices=indices,
+        data=data,
+        projections=projections,
+        center=np.zeros(EMBED_DIM, dtype=np.float32),
+        centroids=np.zeros((1, EMBED_DIM), dtype=np.float32),
+        cells=np.zeros(n_rows, dtype=np.int64),
+        cell_indptr=None,
+        cell_rows=None
+    )
+    if n_rows:
+        embedding = index._project(dataset, np.arange(n_rows), indptr, indices, data)
+        index.center = embedding.mean(axis=0)
+        embedding = index._normalize(embedding)
+        index.centroids = _kmeans(embedding, max(1, int(round(np.sqrt(n_rows)))))
+        index.cells = _nearest(embedding, index.centroids)
+    return _cell_lists(index)
+
+def similar_rows(dataset, row, k=10):
+    """与第 row 行最相似的 k 家有效餐厅，返回 (行号, 相似度)，相似度降序
+
+    只对候选单元中的行计算各部分的精确相似度：描述余弦、菜系与设施集合余弦、
+    价格与评级 1-等级差/MAX_LEVEL、地理 exp(-距离/GEO_SCALE_KM)，再按 SIMILARITY_WEIGHTS 加权。
+    """
+    index = dataset.similar
+    rows = dataset.live_rows(index.candidates(dataset, row))
+    rows = rows[rows != row]
+
+    parts = {'text': index.text_similarity(row, rows)}
+    for name, encoding in (('cuisine', dataset.cuisines), ('facilities', dataset.facilities)):
+        target = encoding.matrix[row]
+        matrix = encoding.matrix[rows][:, target]
+        sizes = np.sqrt(encoding.matrix[rows].sum(axis=1) * target.sum())
+        parts[name] = np.divide(matrix.sum(axis=1), sizes, out=np.zeros(len(rows)), where=sizes > 0)
+    price, award = _levels(dataset, rows)
+    target_price, target_award = _levels(dataset, [row])
+    parts['price'] = np.nan_to_num(1 - np.abs(price - target_price) / MAX_LEVEL)
+    parts['award'] = np.nan_to_num(1 - np.abs(award - target_award) / MAX_LEVEL)
+    distance = haversine_km(
+        dataset.column('Latitude', [row]), dataset.column('Longitude', [row]),
+        dataset.column('Latitude', rows), dataset.column('Longitude', rows)
+    )
+    parts['geo'] = np.nan_to_num(np.exp(-distance / GEO_SCALE_KM))
+
+    scores = sum(SIMILARITY_WEIGHTS[name] * values for name, values in parts.items())
+    if len(rows) > k:
+        keep = np.argpartition(-scores, k)[:k]
+        rows, scores = rows[keep], scores[keep]
+    order = np.argsort(-scores, kind='stable')
+    return rows[order], scores[order]
@@ -0,0 +1,153 @@
+"""空间索引：经纬度网格分桶，支持半径与矩形范围查询"""
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180.0
+
+# 增量缓冲区超过该点数且超过索引规模的该比例时，整体重建网格
+MIN_MERGE_POINTS = 10_000
+MERGE_RATIO = 0.05
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """球面距离（公里），参数可为数组"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+@dataclass
+class SpatialIndex:
+    """按 cell_deg 度网格分桶的点索引
+
+    行号按网格键排序存放，同一纬度带内连续的经度网格对应 rows 中的一段连续区间，
+    因此每次查询只需对每个纬度带做一次二分查找，再对候选点计算精确距离。
+    增量追加的点先放在缓冲区 extra_* 中逐点比较，累积到一定规模后再并入网格。
+    """
+    cell_deg: float
+    n_lon_cells: int
+    cell_keys: np.ndarray  # 排序后的每个点的网格键
+    rows: np.ndarray       # 与 cell_keys 对齐的行号
+    lat: np.ndarray        # 与 cell_keys 对齐的纬度
+    lon: np.ndarray        # 与 cell_keys 对齐的经度
+    extra_rows: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    extra_lat: np.ndarray = field(default_factory=lambda: np.empty(0))
+    extra_lon: np.ndarray = field(default_factory=lambda: np.empty(0))
+
+    def _cell(self, lat, lon):
+        lat_idx = np.clip(np.floor((np.asarray(lat) + 90.0) / self.cell_deg), 0, None).astype(np.int64)
+        # 先把经度折回 [-180, 180)：查询边界可能超出该范围，网格宽度不整除360°时也能落到点所在的网格
+        lon_idx = np.floor(((np.asarray(lon) + 180.0) % 360.0) / self.cell_deg).astype(np.int64)
+        return lat_idx, lon_idx
+
+    def _candidates(self, lat_min, lat_max, lon_ranges):
+        """纬度区间 × 若干经度网格区间内的候选位置（指向排序后的数组）"""
+        lat_lo, _ = self._cell(lat_min, 0.0)
+        lat_hi, _ = self._cell(lat_max, 0.0)
+        starts, stops = [], []
+        for lat_idx in range(int(lat_lo), int(lat_hi) + 1):
+            base = lat_idx * self.n_lon_cells
+            for lon_lo, lon_hi in lon_ranges:
+                starts.append(base + lon_lo)
+                stops.append(base + lon_hi + 1)
+        if not starts:
+            return np.empty(0, dtype=np.int64)
+        lo = np.searchsorted(self.cell_keys, starts, side='left')
+        hi = np.searchsorted(self.cell_keys, stops, side='left')
+        spans = [np.arange(a, b) for a, b in zip(lo, hi) if b > a]
+        return np.concatenate(spans) if spans else np.empty(0, dtype=np.int64)
+
+    def _lon_cell_ranges(self, lon_min, lon_max):
+        """经度区间对应的网格区间，跨越180°经线时拆成两段"""
+        if lon_max - lon_min >= 360.0 - self.cell_deg:
+            # 两端可能落在同一网格（lo == hi），须扫描整条纬度带
+            return [(0, self.n_lon_cells - 1)]
+        _, lo = self._cell(0.0, lon_min)
+        _, hi = self._cell(0.0, lon_max)
+        lo, hi = int(lo), int(hi)
+        if lo <= hi and lon_min <= lon_max:
+            return [(lo, hi)]
+        return [(lo, self.n_lon_cells - 1), (0, hi)]
+
+    def within_radius(self, lat, lon, radius_km):
+        """距 (lat, lon) 不超过 radius_km 公里的行号（升序）及对应距离"""
+        lat_span = radius_km / KM_PER_DEGREE
+        cos_lat = np.cos(np.radians(min(89.9, abs(lat) + lat_span)))
+        lon_span = 360.0 if lat_span >= 90 else min(360.0, lat_span / max(cos_lat, 1e-6))
+        candidates = self._candidates(
+            max(-90.0, lat - lat_span), min(90.0, lat + lat_span),
+            self._lon_cell_ranges(lon - lon_span, lon + lon_span)
+        )
+        distances = haversine_km(lat, lon, self.lat[candidates], self.lon[candidates])
+        keep = distances <= radius_km
+        rows, distances = self.rows[candidates[keep]], distances[keep]
+        if len(self.extra_rows):
+            extra_distances = haversine_km(lat, lon, self.extra_lat, self.extra_lon)
+            extra_keep = extra_distances <= radius_km
+            rows = np.concatenate([rows, self.extra_rows[extra_keep]])
+            distances = np.concatenate([distances, extra_distances[extra_keep]])
+        order = np.argsort(rows)
+        return rows[order], distances[order]
+
+    def within_bbox(self, lat_min, lat_max, lon_min, lon_max):
+        """矩形范围内的行号（升序）；lon_min > lon_max 表示跨越180°经线"""
+        if lon_min > lon_max:
+            lon_max += 360.0
+        candidates = self._candidates(lat_min, lat_max, self._lon_cell_ranges(lon_min, lon_max))
+        keep = _in_bbox(self.lat[candidates], self.lon[candidates], lat_min, lat_max, lon_min, lon_max)
+        rows = self.rows[candidates[keep]]
+        if len(self.extra_rows):
+            extra_keep = _in_bbox(self.extra_lat, self.extra_lon, lat_min, lat_max, lon_min, lon_max)
+            rows = np.concatenate([rows, self.extra_rows[extra_keep]])
+        return np.sort(rows)
+
+    def appended(self, rows, lat, lon):
+        """追加新点，返回新的索引（原索引不变）；缺失坐标的点不入索引"""
+        rows, lat, lon = _located(np.asarray(rows, dtype=np.int64), lat, lon)
+        extra_rows = np.concatenate([self.extra_rows, rows])
+        extra_lat = np.concatenate([self.extra_lat, lat])
+        extra_lon = np.concatenate([self.extra_lon, lon])
+        if len(extra_rows) > max(MIN_MERGE_POINTS, MERGE_RATIO * len(self.rows)):
+            return _grid_index(
+                np.concatenate([self.rows, extra_rows]),
+                np.concatenate([self.lat, extra_lat]),
+                np.concatenate([self.lon, extra_lon]),
+                self.cell_deg
+            )
+        return replace(self, extra_rows=extra_rows, extra_lat=extra_lat, extra_lon=extra_lon)
+
+def _in_bbox(lat, lon, lat_min, lat_max, lon_min, lon_max):
+    """点是否落在矩形内（lon_max 已按跨经线情况展开）"""
+    lon = np.where(lon < lon_min, lon + 360.0, lon)
+    return (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+
+def _located(rows, lat, lon):
+    """剔除缺失坐标的点"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    keep = ~(np.isnan(lat) | np.isnan(lon))
+    return rows[keep], lat[keep], lon[keep]
+
+def build_spatial_index(lat, lon, cell_deg=0.25):
+    """由经纬度数组构建空间索引，缺失坐标的行不入索引"""
+    rows = np.arange(len(lat))
+    return _grid_index(*_located(rows, lat, lon), cell_deg)
+
+def _grid_index(rows, lat, lon, cell_deg):
+    """按网格键排序构建索引"""
+    index = SpatialIndex(
+        cell_deg=cell_deg,
+        n_lon_cells=int(np.ceil(360.0 / cell_deg)),
+        cell_keys=np.empty(0, dtype=np.int64),
+        rows=rows,
+        lat=lat,
+        lon=lon
+    )
+    lat_idx, lon_idx = index._cell(index.lat, index.lon)
+    keys = lat_idx * index.n_lon_cells + lon_idx
+    order = np.argsort(keys, kind='stable')
+    index.cell_keys = keys[order]
+    index.rows = rows[order]
+    index.lat = index.lat[order]
+    index.lon = index.lon[order]
+    return index
@@ -0,0 +1,56 @@
+"""详情表格的服务端分页：按全表预计算的排序排列切出当前页，只有这一页的行被取出和序列化"""
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = [25, 50, 100, 200]
+SORT_COLUMNS = ['Name', 'City', 'Country', 'Continent', 'Cuisine', 'Award', 'Price_level']
+# 按业务顺序而非字典序排序的列
+CATEGORY_ORDERS = {'Award': ['Bib Gourmand', '1 Star', '2 Stars', '3 Stars']}
+
+def sort_keys(series, order=None):
+    """列 -> (整数排序键, 取值个数)：文本不区分大小写，给定 order 时按其顺序；缺失值的键等于取值个数"""
+    codes, uniques = pd.factorize(series)
+    if order is not None:
+        position = {value: i for i, value in enumerate(order)}
+        ranks = np.array([position.get(value, len(order)) for value in uniques], dtype=np.int64)
+        n_levels = len(order) + 1
+    else:
+        values = pd.Series(uniques)
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(str).str.casefold()
+        # 只差大小写的取值得到相同的键
+        ranks, _ = pd.factorize(values, sort=True)
+        n_levels = len(uniques)
+    return np.where(codes >= 0, ranks[codes], n_levels), n_levels
+
+def sort_order(dataset, column, descending=False):
+    """全表按某列排序的行号排列（缺失值总在最后，相同取值保持行号顺序）
+
+    每个数据集的每个 (列, 方向) 只计算一次，保存在 dataset.sort_orders 中；
+    增量更新得到的新数据集在首次按该列排序时重新计算。
+    """
+    order = dataset.sort_orders.get((column, descending))
+    if order is None:
+        keys, n_levels = sort_keys(dataset.df[column], CATEGORY_ORDERS.get(column))
+        if descending:
+            keys = np.where(keys < n_levels, n_levels - 1 - keys, n_levels)
+        order = dataset.sort_orders[(column, descending)] = np.argsort(keys, kind='stable')
+    return order
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
+
+def page_rows(dataset, rows, page, page_size, column=None, descending=False):
+    """筛选结果的第 page 页（从0起）行号
+
+    column 为 None 时保持 rows 的顺序（如按相关度排好的行）；否则用全表排序排列筛出选中的行，
+    开销只与总行数相关，与筛选结果的多少无关。
+    """
+    rows = np.asarray(rows)
+    start = page * page_size
+    if column is None:
+        return rows[start:start + page_size]
+    order = sort_order(dataset, column, descending)
+    selected = np.zeros(dataset.n_rows, dtype=bool)
+    selected[rows] = True
+    return order[selected[order]][start:start + page_size]
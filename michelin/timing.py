@@ -0,0 +1,108 @@
+"""分阶段耗时统计：计时一次运行中的各阶段，跨运行按阶段求 p50/p99，
+并可追加到 JSON Lines 文件或写出 Prometheus 文本格式（textfile collector）
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+TIMING_WINDOW = 1000  # 每个阶段保留最近的样本数，用于计算分位数
+METRIC_NAME = 'michelin_stage_seconds'
+
+class StageTimer:
+    """单次运行的计时器
+
+    stage() 计时一个代码块；lap() 记录距上一个计时点（上一阶段结束或上一次 lap）的耗时，
+    适合在不改动代码结构的前提下计量“构建图表”这类没有明确边界的步骤。
+    sink(阶段, 秒) 在每记录一个阶段时回调。
+    """
+
+    def __init__(self, sink=None):
+        self.stages = []
+        self.sink = sink
+        self._mark = time.perf_counter()
+
+    def _record(self, name, seconds):
+        self.stages.append((name, seconds))
+        if self.sink is not None:
+            self.sink(name, seconds)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._mark = time.perf_counter()
+            self._record(name, self._mark - start)
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self._record(name, now - self._mark)
+        self._mark = now
+
+    def reset_lap(self):
+        self._mark = time.perf_counter()
+
+    def frame(self):
+        return pd.DataFrame(self.stages, columns=['Stage', 'Seconds'])
+
+class LatencyRecorder:
+    """跨运行累计各阶段耗时；jsonl_path 每条记录追加一行，prometheus_path 在 flush() 时整体重写"""
+
+    def __init__(self, window=TIMING_WINDOW, jsonl_path=None, prometheus_path=None):
+        self.window = window
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self._samples = {}
+        self._count = Counter()
+        self._sum = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, **labels):
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+            self._count[stage] += 1
+            self._sum[stage] += seconds
+            if self.jsonl_path:
+                line = json.dumps({'time': time.time(), 'stage': stage, 'seconds': seconds, **labels}, ensure_ascii=False)
+                with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+
+    def summary(self):
+        """各阶段的次数、p50、p99、最近一次与累计耗时（秒），按 p50 降序"""
+        with self._lock:
+            rows = [
+                (stage, self._count[stage], np.percentile(samples, 50), np.percentile(samples, 99), samples[-1], self._sum[stage])
+                for stage, samples in self._samples.items()
+            ]
+        summary = pd.DataFrame(rows, columns=['Stage', 'Count', 'P50', 'P99', 'Last', 'Total'])
+        return summary.sort_values('P50', ascending=False, ignore_index=True)
+
+    def prometheus_text(self):
+        """summary 类型指标：分位数基于滚动窗口，_sum/_count 为进程内累计值"""
+        lines = [
+            f'# HELP {METRIC_NAME} Michelin dashboard per-stage latency in seconds.',
+            f'# TYPE {METRIC_NAME} summary',
+        ]
+        for row in self.summary().sort_values('Stage').itertuples(index=False):
+            stage = row.Stage.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'{METRIC_NAME}{{stage="{stage}",quantile="0.5"}} {row.P50:.6f}')
+            lines.append(f'{METRIC_NAME}{{stage="{stage}",quantile="0.99"}} {row.P99:.6f}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {row.Total:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {row.Count}')
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """写出 Prometheus 文本文件（先写临时文件再替换，采集端不会读到半个文件）"""
+        if not self.prometheus_path:
+            return
+        tmp_file = f"{self.prometheus_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_file, self.prometheus_path)
@@ -4,8 +4,37 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import os
 import re
 import colorsys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from michelin import (
+    DATA_PATH,
+    FilterSpec,
+    calculate_award_price_distribution,
+    calculate_city_luxury_stats,
+    calculate_cuisine_award_tables,
+    calculate_facility_prevalence,
+    count_cities,
+    get_city_counts,
+    get_common_facilities,
+    get_cuisine_ranking,
+    get_unique_cuisines,
+    get_unique_facilities,
+    haversine_km,
+    load_dataset,
+    rank_rows,
+    select,
+    similar_rows,
+)
+from michelin.cache import ResultCache, cache_key, result_cache_dir
+from michelin.export import EXPORT_FORMATS, export_bytes, row_chunks
+from michelin.geo import cluster_points, locate_cities, points_center
+from michelin.ingest import ingest_delta, read_delta, replay_delta_log
+from michelin.table import PAGE_SIZES, SORT_COLUMNS, page_count, page_rows
+from michelin.timing import LatencyRecorder, StageTimer
 
 # 设置页面
 st.set_page_config(
@@ -15,6 +44,17 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# 【新增】分阶段计时：各阶段耗时累计到进程级记录器（侧边栏调试面板查看 p50/p99）
+# 设置 MICHELIN_TIMING_JSONL / MICHELIN_TIMING_PROM 时追加 JSON Lines 记录、写出 Prometheus 文本文件
+@st.cache_resource
+def get_latency_recorder():
+    return LatencyRecorder(
+        jsonl_path=os.environ.get('MICHELIN_TIMING_JSONL'),
+        prometheus_path=os.environ.get('MICHELIN_TIMING_PROM')
+    )
+
+timer = StageTimer(get_latency_recorder().record)
+
 # 简约风格的CSS
 st.markdown("""
 <style>
@@ -198,261 +238,209 @@ COLOR_SCALES = {
 # 标题
 st.markdown('<h1 class="main-header">🍽️ 米其林餐厅全球分析</h1>', unsafe_allow_html=True)
 
-# 加载数据
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_csv('cleaned.csv', encoding='utf-8', encoding_errors='ignore')
-        df = df.dropna(subset=['Name', 'Cuisine', 'Location'], how='all')
-        
-        # 清理空行
-        df = df.dropna(how='all')
-        
-        if 'Price_level' not in df.columns:
-            df['Price_level'] = df['Price'].str.len()
-        
-        # 清理和标准化菜系数据
-        def clean_cuisine(cuisine):
-            if pd.isna(cuisine):
-                return []
-            # 移除多余空格，分割菜系
-            cuisines = [c.strip() for c in str(cuisine).split(',')]
-            # 去重并返回
-            return list(set(cuisines))
-        
-        df['Cuisine_list'] = df['Cuisine'].apply(clean_cuisine)
-
-        # 【新增】清理和标准化设施数据
-        def clean_facilities(facilities):
-            if pd.isna(facilities):
-                return []
-            facility_list = [f.strip() for f in str(facilities).split(',') if f.strip()]
-            return list(set(facility_list))
-
-        df['Facilities_list'] = df['FacilitiesAndServices'].apply(clean_facilities)
-        
-        df['Country'] = df['Location'].str.split(',').str[-1].str.strip()
-        df['City'] = df['Location'].str.split(',').str[0].str.strip()
-        
-        # 国家及地区名称标准化
-        country_mapping = {
-            'USA': 'United States',
-            'UK': 'United Kingdom', 
-            'China Mainland': 'China',
-            'Taiwan': 'Taiwan',
-            'Hong Kong': 'Hong Kong'
-        }
-        df['Country'] = df['Country'].replace(country_mapping)
-        
-        # 添加大洲信息
-        continent_mapping = {
-            'Japan': 'Asia', 'China': 'Asia', 'Taiwan': 'Asia', 'Hong Kong': 'Asia',
-            'Singapore': 'Asia', 'South Korea': 'Asia', 'Thailand': 'Asia',
-            'United States': 'North America', 'Canada': 'North America', 'Mexico': 'North America',
-            'France': 'Europe', 'United Kingdom': 'Europe', 'Italy': 'Europe', 
-            'Spain': 'Europe', 'Germany': 'Europe', 'Switzerland': 'Europe',
-            'Netherlands': 'Europe', 'Belgium': 'Europe',
-            'Australia': 'Oceania', 'New Zealand': 'Oceania',
-            'Brazil': 'South America', 'Argentina': 'South America'
-        }
-        df['Continent'] = df['Country'].map(continent_mapping)
-        
-        return df
-    except Exception as e:
-        st.error(f"数据加载失败: {e}")
-        return pd.DataFrame()
-
-@st.cache_data
-def get_continent_coordinates():
-    """大洲主要城市的坐标数据"""
-    continent_coords = {
-        'Asia': {
-            'Tokyo': [35.6762, 139.6503], 'Osaka': [34.6937, 135.5023], 
-            'Kyoto': [35.0116, 135.7681], 'Shanghai': [31.2304, 121.4737],
-            'Beijing': [39.9042, 116.4074], 'Hong Kong': [22.3193, 114.1694],
-            'Singapore': [1.3521, 103.8198], 'Seoul': [37.5665, 126.9780],
-            'Bangkok': [13.7563, 100.5018]
-        },
-        'Europe': {
-            'Paris': [48.8566, 2.3522], 'London': [51.5074, -0.1278],
-            'Rome': [41.9028, 12.4964], 'Madrid': [40.4168, -3.7038],
-            'Berlin': [52.5200, 13.4050], 'Amsterdam': [52.3676, 4.9041],
-            'Vienna': [48.2082, 16.3738], 'Brussels': [50.8503, 4.3517]
-        },
-        'North America': {
-            'New York': [40.7128, -74.0060], 'Chicago': [41.8781, -87.6298],
-            'San Francisco': [37.7749, -122.4194], 'Los Angeles': [34.0522, -118.2437],
-            'Toronto': [43.6532, -79.3832], 'Vancouver': [49.2827, -123.1207],
-            'Mexico City': [19.4326, -99.1332]
-        },
-        'South America': {
-            'São Paulo': [-23.5505, -46.6333], 'Rio de Janeiro': [-22.9068, -43.1729],
-            'Buenos Aires': [-34.6037, -58.3816], 'Lima': [-12.0464, -77.0428],
-            'Bogotá': [4.7110, -74.0721]
-        },
-        'Oceania': {
-            'Sydney': [-33.8688, 151.2093], 'Melbourne': [-37.8136, 144.9631],
-            'Auckland': [-36.8485, 174.7633], 'Brisbane': [-27.4698, 153.0251]
-        }
-    }
-    return continent_coords
+# 加载数据（cache_resource：各会话共享同一只读数据集，每次交互不再反序列化整表）
+# 增量更新只生成新数据集并替换容器中的引用，已有行号不变，按行号缓存的结果依然有效
+@st.cache_resource
+def get_dataset_store(path=DATA_PATH):
+    return {'dataset': replay_delta_log(load_dataset(path), path)}
+
+def get_dataset(path=DATA_PATH):
+    store = get_dataset_store(path)
+    # 同步其他会话或命令行写入的增量日志（没有新增量时只列一次目录）
+    store['dataset'] = replay_delta_log(store['dataset'], path)
+    return store['dataset']
+
+try:
+    with timer.stage('load'):
+        dataset = get_dataset()
+except Exception as e:
+    st.error(f"数据加载失败: {e}")
+    st.stop()
 
-df = load_data()
+df = dataset.df
 
 if df.empty:
     st.warning("没有找到数据，请检查数据文件路径")
     st.stop()
 
-# 获取唯一的菜系列表（去重后）
-@st.cache_data
-def get_unique_cuisines(df):
-    """获取去重后的唯一菜系列表"""
-    all_cuisines = []
-    for cuisine_list in df['Cuisine_list'].dropna():
-        all_cuisines.extend(cuisine_list)
-    
-    # 去重并排序
-    unique_cuisines = sorted(list(set(all_cuisines)))
-    return unique_cuisines
-
-# 【新增】获取唯一的设系列表
-@st.cache_data
-def get_unique_facilities(df):
-    all_facilities = []
-    for facility_list in df['Facilities_list'].dropna():
-        all_facilities.extend(facility_list)
-    return sorted(list(set(all_facilities)))
-
-# 获取前N菜系（基于餐厅计数，不是菜系出现次数）
-@st.cache_data
-def get_top_cuisines_by_restaurants(df, top_n=10):
-    """获取基于餐厅数量的前N大菜系"""
-    cuisine_restaurant_count = {}
-    
-    for idx, row in df.iterrows():
-        if isinstance(row['Cuisine_list'], list):
-            for cuisine in row['Cuisine_list']:
-                if cuisine in cuisine_restaurant_count:
-                    cuisine_restaurant_count[cuisine] += 1
-                else:
-                    cuisine_restaurant_count[cuisine] = 1
-    
-    # 按餐厅数量排序
-    sorted_cuisines = sorted(cuisine_restaurant_count.items(), key=lambda x: x[1], reverse=True)
-    top_cuisines = [cuisine for cuisine, count in sorted_cuisines[:top_n]]
-    
-    return top_cuisines
+# 分析结果缓存：键为 (规范化筛选条件, 数据集指纹, 其余参数)，不再哈希数据框或行号数组
+# 内存层按字节预算LRU淘汰，磁盘层位于快照目录下，服务重启后仍可命中
+@st.cache_resource
+def get_result_cache(path=DATA_PATH):
+    return ResultCache(disk_dir=result_cache_dir(path))
+
+# 【新增】各区块的分析在筛选完成后提交到进程级线程池并行预计算，结果写入 ResultCache；
+# 区块渲染时只等待自己用到的结果（计时记为等待时间），其余标签页的结果在后台继续计算，切换时直接命中
+SECTION_WORKERS = max(2, min(4, os.cpu_count() or 1))
+
+@st.cache_resource
+def get_section_pool():
+    """线程池与进行中的预计算（缓存键 -> Future）；分析只读共享的数据集，无需进程间复制"""
+    return {
+        'executor': ThreadPoolExecutor(max_workers=SECTION_WORKERS, thread_name_prefix='michelin-section'),
+        'pending': {},
+        'lock': threading.Lock()
+    }
 
-# 【新增】获取筛选后的前N菜系
-@st.cache_data
-def get_filtered_top_cuisines_by_restaurants(filtered_df, top_n=10):
-    """基于筛选后的数据获取前N大菜系"""
-    cuisine_restaurant_count = {}
-    
-    for idx, row in filtered_df.iterrows():
-        if isinstance(row['Cuisine_list'], list):
-            for cuisine in row['Cuisine_list']:
-                if cuisine in cuisine_restaurant_count:
-                    cuisine_restaurant_count[cuisine] += 1
-                else:
-                    cuisine_restaurant_count[cuisine] = 1
-    
-    # 按餐厅数量排序
-    sorted_cuisines = sorted(cuisine_restaurant_count.items(), key=lambda x: x[1], reverse=True)
-    top_cuisines = [cuisine for cuisine, count in sorted_cuisines[:top_n]]
-    
-    return top_cuisines
+def prefetch(name, compute, dataset, spec, rows, *args, then=None):
+    """在线程池中预计算一项分析并写入结果缓存；已缓存或正在计算时不重复提交
+
+    then(结果) 在工作线程中、本项结果就绪前调用，用于提交依赖本结果的分析，
+    这样等待本结果的区块随后总能看到后续分析已在进行中。
+    """
+    key = cache_key(name, spec, dataset.fingerprint, *args)
+    cache, pool = get_result_cache(), get_section_pool()
+
+    def run():
+        result = cache.get_or_compute(key, lambda: compute(dataset, rows, *args))
+        if then is not None:
+            then(result)
+        return result
+
+    with pool['lock']:
+        if key in pool['pending'] or key in cache:
+            return
+        future = pool['pending'][key] = pool['executor'].submit(run)
+    # 结果已写入缓存后才移出进行中的表
+    future.add_done_callback(lambda _: pool['pending'].pop(key, None))
+
+def cached_result(name, compute, dataset, spec, rows, *args):
+    """rows 须为 spec 在 dataset 上的筛选结果；该项正在预计算时等待其结果
+
+    dataset 须为本次运行筛选所用的数据集，而不是共享存储中的最新数据集：
+    其他会话可能已应用增量，用新指纹保存旧行号算出的结果会污染两级缓存。
+    """
+    key = cache_key(name, spec, dataset.fingerprint, *args)
+    with timer.stage(name):
+        future = get_section_pool()['pending'].get(key)
+        if future is not None:
+            return future.result()
+        return get_result_cache().get_or_compute(key, lambda: compute(dataset, rows, *args))
+
+# 【新增】轻量图表：精简发送到浏览器的图表JSON
+WEBGL_THRESHOLD = 1000      # 散点轨迹点数超过该值时改用WebGL（Scattergl）渲染
+FIGURE_DECIMALS = 4         # 浮点数组保留的小数位（经纬度约10米精度）
+MERGE_POINTS_PER_TRACE = 20  # 平均每条轨迹不超过该点数时才合并同类散点轨迹
+LIGHT_MAP_POINTS = 1500     # 轻量模式下餐厅点位地图的聚合点上限（默认5000）
+ROUNDED_PROPERTIES = ['x', 'y', 'z', 'lat', 'lon', 'customdata']
+
+def rounded(values):
+    """浮点数组按 FIGURE_DECIMALS 取整，其余原样返回"""
+    if values is None or isinstance(values, str):
+        return values
+    array = np.asarray(values)
+    return array.round(FIGURE_DECIMALS) if array.dtype.kind == 'f' else values
+
+def lighten_figure(fig):
+    """轻量化图表：去掉悬停模板未引用的 customdata/hovertext，浮点数组取整，合并同类散点轨迹，
+    点数超过 WEBGL_THRESHOLD 的散点轨迹换成 Scattergl（地图轨迹本身即为WebGL渲染）"""
+    traces = []
+    for trace in fig.data:
+        template = trace.hovertemplate if 'hovertemplate' in trace else None
+        if isinstance(template, str):
+            if 'customdata' not in template:
+                trace.customdata = None
+            if 'hovertext' in trace and 'hovertext' not in template:
+                trace.hovertext = None
+        for prop in ROUNDED_PROPERTIES:
+            if prop in trace and trace[prop] is not None:
+                trace[prop] = rounded(trace[prop])
+        if 'marker' in trace:
+            for prop in ('size', 'color'):
+                if prop in trace.marker and trace.marker[prop] is not None:
+                    trace.marker[prop] = rounded(trace.marker[prop])
+        traces.append(trace)
+    merged = merged_scatter(traces) if fig.layout.showlegend is False else None
+    if merged is not None:
+        traces = [merged]
+    webgl = [trace.type == 'scatter' and trace.x is not None and len(trace.x) > WEBGL_THRESHOLD for trace in traces]
+    if merged is not None or any(webgl):
+        traces = [go.Scattergl({k: v for k, v in t.to_plotly_json().items() if k != 'type'}) if gl else t
+                  for t, gl in zip(traces, webgl)]
+        fig = go.Figure(data=traces, layout=fig.layout)
+    return fig
+
+def merged_scatter(traces):
+    """不显示图例时，把按类别拆分、仅颜色不同的多条散点轨迹合并为一条（颜色改为逐点数组），
+    省去每条轨迹重复的属性；不满足条件或合并后反而更大时返回 None"""
+    first = traces[0] if traces else None
+    if (len(traces) < 2 or first.type not in ('scatter', 'scattergl')
+            or any(t.type != first.type or not isinstance(t.marker.color, str) for t in traces)):
+        return None
+    if any(t.hovertemplate != first.hovertemplate or t.customdata is not None or t.hovertext is not None for t in traces):
+        return None
+    lengths = [len(t.x) for t in traces]
+    # 逐点颜色数组比每条轨迹的公共属性更大时不合并
+    if sum(lengths) > MERGE_POINTS_PER_TRACE * len(traces):
+        return None
+    props = first.to_plotly_json()
+    for prop in ('name', 'legendgroup'):
+        props.pop(prop, None)
+    props['x'] = np.concatenate([np.asarray(t.x) for t in traces])
+    props['y'] = np.concatenate([np.asarray(t.y) for t in traces])
+    props['marker']['color'] = np.repeat([t.marker.color for t in traces], lengths)
+    if first.marker.size is not None and not np.isscalar(first.marker.size):
+        props['marker']['size'] = np.concatenate([np.asarray(t.marker.size) for t in traces])
+    return go.Figure(data=[props]).data[0]
+
+def show_chart(fig, name):
+    """记录图表构建（距上一个计时点）与序列化输出的耗时；轻量模式下先精简图表"""
+    if light_charts:
+        fig = lighten_figure(fig)
+    timer.lap(f'figure:{name}')
+    with timer.stage(f'chart:{name}'):
+        st.plotly_chart(fig, use_container_width=True)
 
-# 【统一】计算菜系与星级分布数据（基于选中的评级）
-@st.cache_data
-def calculate_cuisine_award_distribution(filtered_df, top_cuisines_list, selected_awards):
-    """统一计算菜系与星级分布数据（基于选中的评级）"""
-    distribution_data = []
-    
-    for cuisine in top_cuisines_list:
-        # 筛选包含该菜系的所有餐厅
-        cuisine_restaurants = filtered_df[filtered_df['Cuisine_list'].apply(
-            lambda x: cuisine in x if isinstance(x, list) else False
-        )]
-        
-        # 计算每个选中星级的餐厅数量
-        for award in selected_awards:
-            count = len(cuisine_restaurants[cuisine_restaurants['Award'] == award])
-            
-            if count > 0:
-                distribution_data.append({
-                    'Cuisine': cuisine,
-                    'Award': award,
-                    'Count': count
-                })
-    
-    return pd.DataFrame(distribution_data)
-
-# 【统一】计算菜系统计数据（基于相同的计数逻辑和选中的评级）
-@st.cache_data
-def calculate_cuisine_stats_from_distribution(distribution_df, filtered_df, top_cuisines_list, selected_awards):
-    """基于统一的分布数据计算菜系统计数据"""
-    stats_data = []
-    award_mapping = {'1 Star': 1, '2 Stars': 2, '3 Stars': 3}
-    
-    # 获取选中的星级评级（用于计算平均星级评分）
-    selected_star_awards = [award for award in selected_awards if award in ['1 Star', '2 Stars', '3 Stars']]
-    
-    for cuisine in top_cuisines_list:
-        # 从分布数据中获取该菜系的所有记录
-        cuisine_data = distribution_df[distribution_df['Cuisine'] == cuisine]
-        
-        # 筛选包含该菜系的所有餐厅（用于计算价格等级）
-        cuisine_restaurants = filtered_df[filtered_df['Cuisine_list'].apply(
-            lambda x: cuisine in x if isinstance(x, list) else False
-        )]
-        
-        if not cuisine_data.empty:
-            # 计算总餐厅数量（选中的评级）
-            total_restaurants = cuisine_data['Count'].sum()
-            
-            # 计算有星级餐厅数量和平均星级评分（基于选中的星级评级）
-            starred_data = cuisine_data[cuisine_data['Award'].isin(selected_star_awards)]
-            starred_count = starred_data['Count'].sum()
-            
-            # 计算平均星级评分（只基于选中的有星级的餐厅）
-            if starred_count > 0:
-                total_score = 0
-                for _, row in starred_data.iterrows():
-                    total_score += row['Count'] * award_mapping[row['Award']]
-                avg_award_score = total_score / starred_count
-            else:
-                avg_award_score = 0
-            
-            # 计算平均价格等级（基于所有选中评级的餐厅）
-            avg_price_level = cuisine_restaurants['Price_level'].mean() if len(cuisine_restaurants) > 0 else 0
-            
-            stats_data.append({
-                'Cuisine': cuisine,
-                'Restaurant_Count': total_restaurants,
-                'Avg_Price_Level': avg_price_level,
-                'Starred_Count': starred_count,
-                'Avg_Award_Score': avg_award_score
-            })
-    
-    return pd.DataFrame(stats_data) if stats_data else pd.DataFrame()
+def timed_section(name):
+    """区块装饰器：st.fragment 并整体计时；区块单独重跑时同样记录"""
+    def decorate(render):
+        def run_section():
+            timer.reset_lap()
+            with timer.stage(f'section:{name}'):
+                render()
+            get_latency_recorder().flush()
+        run_section.__name__ = run_section.__qualname__ = render.__name__
+        return st.fragment(run_section)
+    return decorate
+
+def get_filtered_top_cuisines_by_restaurants(dataset, spec, rows, top_n=10):
+    """基于筛选后的数据获取前N大菜系（切片缓存的完整排名）"""
+    return cached_result('cuisine_ranking', get_cuisine_ranking, dataset, spec, rows)['Cuisine'].head(top_n).tolist()
+
+# 【新增】增量更新：按 Name+Address 插入/更新/删除餐厅，写入增量日志后立即生效
+with st.sidebar.expander("🔄 增量更新数据"):
+    delta_file = st.file_uploader("上传增量文件（CSV/Parquet）", type=['csv', 'parquet'], key='delta_file')
+    st.caption("列与 cleaned.csv 相同；可选 Operation 列取 insert/update/delete，缺省按插入或更新处理")
+    if delta_file is not None and st.button("应用增量", key='apply_delta'):
+        try:
+            delta = read_delta(delta_file, delta_file.name)
+            dataset = ingest_delta(get_dataset(), delta)
+            get_dataset_store()['dataset'] = dataset
+            df = dataset.df
+            st.success(f"已应用 {len(delta)} 条增量记录，当前共 {int(dataset.live.sum()):,} 家餐厅")
+        except Exception as e:
+            st.error(f"增量应用失败: {e}")
 
 # 获取数据
-unique_cuisines = get_unique_cuisines(df)
-unique_facilities = get_unique_facilities(df)
+unique_cuisines = get_unique_cuisines(dataset)
+unique_facilities = get_unique_facilities(dataset)
 
 # 侧边栏过滤器
 st.sidebar.header("🔍 数据筛选")
 
+# 【新增】全文搜索：按 BM25 对描述、名称、菜系排序，与下方筛选条件同时生效
+search_query = st.sidebar.text_input("全文搜索", placeholder="描述、名称或菜系关键词，如 omakase", key='search_query')
+
 # 大洲选择菜单
-continents = ['全部'] + sorted(df['Continent'].dropna().unique().tolist())
+continents = ['全部'] + sorted(dataset.index['Continent'])
 selected_continent = st.sidebar.selectbox("选择大洲", continents)
 
 # 城市选择菜单（基于选择的大洲）
 if selected_continent != '全部':
-    available_cities = ['全部'] + sorted(df[df['Continent'] == selected_continent]['City'].dropna().unique().tolist())
+    continent_rows = dataset.live_rows(dataset.index['Continent'][selected_continent])
+    available_cities = ['全部'] + sorted(pd.unique(dataset.column('City', continent_rows)).tolist())
 else:
-    available_cities = ['全部'] + sorted(df['City'].dropna().unique().tolist())
+    available_cities = ['全部'] + sorted(dataset.index['City'])
 
 selected_city = st.sidebar.selectbox("选择城市", available_cities)
 
@@ -525,26 +513,64 @@ if selected_price_levels:
 else:
     st.sidebar.markdown(f'<div class="price-level-label" style="color: #e74c3c; font-weight: bold;">当前选择: 未选择任何价格等级</div>', unsafe_allow_html=True)
 
-# 应用筛选
-filtered_df = df.copy()
-if selected_continent != '全部':
-    filtered_df = filtered_df[filtered_df['Continent'] == selected_continent]
-if selected_city != '全部':
-    filtered_df = filtered_df[filtered_df['City'] == selected_city]
-if selected_awards:  # 只应用选中的评级筛选
-    filtered_df = filtered_df[filtered_df['Award'].isin(selected_awards)]
-if selected_cuisines:
-    filtered_df = filtered_df[filtered_df['Cuisine_list'].apply(
-        lambda x: any(cuisine in x for cuisine in selected_cuisines) if isinstance(x, list) else False
-    )]
-
-# 【新增】应用设施筛选逻辑
-if selected_facilities:
-    filtered_df = filtered_df[filtered_df['Facilities_list'].apply(lambda x: all(facility in x for facility in selected_facilities) if isinstance(x, list) else False)]
-
-# 【修改】应用价格等级筛选 - 多选逻辑
-if selected_price_levels:  # 只有当选择了价格等级时才应用筛选
-    filtered_df = filtered_df[filtered_df['Price_level'].isin(selected_price_levels)]
+# 【新增】位置范围筛选（半径或矩形范围，由空间索引支持）
+st.sidebar.markdown("---")
+st.sidebar.subheader("📍 位置范围")
+location_mode = st.sidebar.radio("位置筛选", ('不限', '半径范围', '矩形范围'), horizontal=True, key='location_mode')
+
+near_filter = None
+bbox_filter = None
+if location_mode != '不限':
+    # 默认以当前大洲/城市下餐厅最多的城市中心为参考点
+    region_spec = FilterSpec(
+        continent=None if selected_continent == '全部' else selected_continent,
+        city=None if selected_city == '全部' else selected_city
+    )
+    region_cities = get_city_counts(dataset, select(dataset, region_spec), region_spec)
+    region_center = None
+    if not region_cities.empty:
+        region_center = points_center(dataset, dataset.live_rows(dataset.index['City'][region_cities['City'].iloc[0]]))
+    region_center = region_center or (48.8566, 2.3522)
+    
+    if location_mode == '半径范围':
+        near_lat = st.sidebar.number_input("中心纬度", min_value=-90.0, max_value=90.0, value=round(region_center[0], 4), format="%.4f")
+        near_lon = st.sidebar.number_input("中心经度", min_value=-180.0, max_value=180.0, value=round(region_center[1], 4), format="%.4f")
+        radius_km = st.sidebar.slider("半径（公里）", min_value=1, max_value=500, value=10)
+        near_filter = (near_lat, near_lon, radius_km)
+    else:
+        lat_range = st.sidebar.slider(
+            "纬度范围", min_value=-90.0, max_value=90.0,
+            value=(max(-90.0, round(region_center[0] - 1, 2)), min(90.0, round(region_center[0] + 1, 2)))
+        )
+        lon_range = st.sidebar.slider(
+            "经度范围", min_value=-180.0, max_value=180.0,
+            value=(max(-180.0, round(region_center[1] - 1, 2)), min(180.0, round(region_center[1] + 1, 2)))
+        )
+        bbox_filter = (lat_range[0], lat_range[1], lon_range[0], lon_range[1])
+
+# 【新增】轻量图表模式：精简悬停数据与浮点精度、大量散点改用WebGL、地图聚合点更少
+st.sidebar.markdown("---")
+light_charts = st.sidebar.toggle(
+    "⚡ 轻量图表", value=True, key='light_charts',
+    help="减小发送到浏览器的图表数据量：去掉未使用的悬停数据、降低浮点精度、大量散点使用WebGL渲染、地图聚合点更少"
+)
+
+# 应用筛选：倒排索引位图求交/并，最后一次性取出结果行
+# 评级、价格等级只有选中时才筛选；设施需包含全部选中项
+timer.lap('sidebar')  # 侧边栏控件（自加载完成起）
+filter_spec = FilterSpec(
+    continent=None if selected_continent == '全部' else selected_continent,
+    city=None if selected_city == '全部' else selected_city,
+    awards=selected_awards,
+    cuisines=selected_cuisines,
+    facilities=selected_facilities,
+    price_levels=selected_price_levels,
+    near=near_filter,
+    bbox=bbox_filter,
+    query=search_query
+)
+with timer.stage('filter'):
+    filtered_rows = select(dataset, filter_spec)
 
 # 关键指标卡片
 st.markdown('<h2 class="section-header">📊 核心指标</h2>', unsafe_allow_html=True)
@@ -555,12 +581,12 @@ with col1:
     st.markdown(f"""
     <div class="metric-card">
         <h3>餐厅总数</h3>
-        <h2>{len(filtered_df):,}</h2>
+        <h2>{len(filtered_rows):,}</h2>
     </div>
     """, unsafe_allow_html=True)
 
 with col2:
-    unique_cities = filtered_df['City'].nunique()
+    unique_cities = count_cities(dataset, filtered_rows, filter_spec)
     st.markdown(f"""
     <div class="metric-card">
         <h3>覆盖城市</h3>
@@ -587,27 +613,107 @@ with col4:
     </div>
     """, unsafe_allow_html=True)
 
+timer.lap('metric_cards')
+
+# 【新增】各分析区块放在标签页中，只计算并渲染当前打开的标签页（切换标签触发重跑）；
+# 区块函数为 st.fragment，区块内的控件（地图模式、菜系数量、分页、热力图维度等）只重跑所在区块，
+# 分析结果经 ResultCache 按筛选条件缓存，输入不变时直接复用
+map_tab, cuisine_tab, price_tab, facility_tab, table_tab = st.tabs(
+    ['🗺️ 大洲餐厅分布', '📈 菜系深度分析', '💰 星级价格与奢华餐厅', '🏨 设施与评级/价格', '📋 餐厅详情'],
+    on_change='rerun', key='section_tabs'
+)
+
+DEFAULT_TOP_CUISINES = 10
+TOP_FACILITIES = 15                          # 只分析最常见的设施，避免图表过于拥挤
+STAR_AWARD_ORDER = ['1 Star', '2 Stars', '3 Stars']
+
+def prefetch_sections():
+    """按当前筛选条件提交各区块（取控件默认值）的分析，当前打开的标签页优先"""
+    def cuisine_jobs():
+        prefetch('cuisine_ranking', get_cuisine_ranking, dataset, filter_spec, filtered_rows, then=lambda ranking: prefetch(
+            'cuisine_award_tables', calculate_cuisine_award_tables, dataset, filter_spec, filtered_rows,
+            ranking['Cuisine'].head(DEFAULT_TOP_CUISINES).tolist(), selected_awards, filter_spec
+        ))
+
+    def price_jobs():
+        prefetch('award_price_distribution', calculate_award_price_distribution, dataset, filter_spec, filtered_rows, filter_spec)
+        prefetch('city_luxury_stats', calculate_city_luxury_stats, dataset, filter_spec, filtered_rows, 4, 2)
+
+    def facility_prevalence(facilities):
+        if facilities:
+            prefetch('facility_prevalence', calculate_facility_prevalence, dataset, filter_spec, filtered_rows, facilities, 'Award', STAR_AWARD_ORDER)
+            prefetch('facility_prevalence', calculate_facility_prevalence, dataset, filter_spec, filtered_rows, facilities, 'Price_level')
+
+    def facility_jobs():
+        prefetch('common_facilities', get_common_facilities, dataset, filter_spec, filtered_rows, TOP_FACILITIES, filter_spec, then=facility_prevalence)
+
+    jobs = [(cuisine_tab, cuisine_jobs), (price_tab, price_jobs), (facility_tab, facility_jobs)]
+    for _, submit in sorted(jobs, key=lambda job: not job[0].open):
+        submit()
+
+if len(filtered_rows) > 0:
+    prefetch_sections()
+
 # 大洲地图展示 - 修改为红色系
-st.markdown('<h2 class="section-header">🗺️ 大洲餐厅分布</h2>', unsafe_allow_html=True)
+@timed_section('map')
+def render_map_section():
+    """大洲地图展示（城市分布或餐厅点位）"""
+    map_mode = st.radio("地图模式", ('城市分布', '餐厅点位'), horizontal=True, key='map_mode')
+
+    if map_mode == '餐厅点位':
+        # 【新增】餐厅点位地图：服务端按缩放级别网格聚合，只发送聚合后的点
+        map_center = points_center(dataset, filtered_rows)
+        if map_center is not None:
+            default_zoom = 10 if selected_city != '全部' else (3 if selected_continent != '全部' else 1)
+            map_zoom = st.slider("地图缩放级别（越大聚合越细）", min_value=1, max_value=16, value=default_zoom)
+            clusters, cluster_zoom = cluster_points(
+                dataset, filtered_rows, map_zoom, max_clusters=LIGHT_MAP_POINTS if light_charts else 5000
+            )
 
-if selected_continent != '全部':
-    continent_coords = get_continent_coordinates()
-    
-    if selected_continent in continent_coords:
-        # 获取该大洲的城市数据
-        continent_cities = filtered_df[filtered_df['Continent'] == selected_continent]['City'].value_counts().reset_index()
-        continent_cities.columns = ['City', 'Count']
-        
-        # 添加坐标
-        continent_cities['Lat'] = continent_cities['City'].map(
-            lambda x: continent_coords[selected_continent].get(x, [None, None])[0]
-        )
-        continent_cities['Lon'] = continent_cities['City'].map(
-            lambda x: continent_coords[selected_continent].get(x, [None, None])[1]
+            fig = go.Figure(go.Scattermapbox(
+                lat=clusters['Lat'],
+                lon=clusters['Lon'],
+                mode='markers',
+                marker=dict(
+                    size=np.clip(6 + 4 * np.log2(clusters['Count']), 6, 30),
+                    color=clusters['Count'],
+                    colorscale=COLOR_SCALES['reds'],
+                    showscale=True,
+                    colorbar=dict(title='餐厅数量'),
+                    opacity=0.85
+                ),
+                text=clusters['Label'],
+                # 餐厅数量直接取自标记颜色，不再在 customdata 中重复发送
+                customdata=clusters[['Starred_Count', 'Avg_Price_Level']],
+                hovertemplate=(
+                    "<b>%{text}</b><br>" +
+                    "餐厅数量: %{marker.color}<br>" +
+                    "星级餐厅: %{customdata[0]}<br>" +
+                    "平均价格等级: %{customdata[1]:.2f}<br>" +
+                    "<extra></extra>"
+                )
+            ))
+
+            fig.update_layout(
+                mapbox_style="open-street-map",
+                mapbox=dict(center=dict(lat=map_center[0], lon=map_center[1]), zoom=map_zoom),
+                height=500,
+                margin=dict(l=0, r=0, t=30, b=0),
+                paper_bgcolor='white',
+                title=f"米其林餐厅点位分布 - {len(clusters):,} 个聚合点 / {int(clusters['Count'].sum()):,} 家餐厅"
+            )
+
+            show_chart(fig, 'map_points')
+            if cluster_zoom < map_zoom:
+                st.caption(f"点位过多，已按缩放级别 {cluster_zoom} 聚合")
+        else:
+            st.info("当前筛选结果中的餐厅没有经纬度数据")
+    elif selected_continent != '全部':
+        # 获取该大洲的城市数据，并合并由餐厅经纬度推导的城市坐标
+        continent_cities = locate_cities(
+            get_city_counts(dataset, filtered_rows, filter_spec), dataset.cities, selected_continent
         )
-        
-        continent_cities = continent_cities.dropna(subset=['Lat', 'Lon'])
-        
+
         if not continent_cities.empty:
             # 创建大洲地图 - 使用红色系颜色方案
             price_desc = f"价格等级: {', '.join(map(str, sorted(selected_price_levels)))}" if selected_price_levels else "所有价格等级"
@@ -624,621 +730,583 @@ if selected_continent != '全部':
                 zoom=3,
                 title=f"{selected_continent} 米其林餐厅分布 - 选中评级: {', '.join(selected_awards)} - {price_desc}"
             )
-            
+
             fig.update_layout(
                 mapbox_style="open-street-map",
                 height=500,
                 margin=dict(l=0, r=0, t=30, b=0),
                 paper_bgcolor='white'
             )
-            
-            st.plotly_chart(fig, use_container_width=True)
+
+            show_chart(fig, 'continent_map')
         else:
             st.info(f"暂无 {selected_continent} 的城市坐标数据")
     else:
-        st.info(f"暂无 {selected_continent} 的地图数据")
-else:
-    # 显示全球视图
-    if not filtered_df.empty:
-        # 获取所有城市的统计数据
-        city_counts = filtered_df['City'].value_counts().reset_index()
-        city_counts.columns = ['City', 'Count']
-        
-        # 为所有城市添加坐标（简化版）
-        all_coords = get_continent_coordinates()
-        city_coords = {}
-        for continent, cities in all_coords.items():
-            city_coords.update(cities)
-        
-        city_counts['Lat'] = city_counts['City'].map(lambda x: city_coords.get(x, [None])[0] if x in city_coords else None)
-        city_counts['Lon'] = city_counts['City'].map(lambda x: city_coords.get(x, [None, None])[1] if x in city_coords else None)
-        
-        city_counts = city_counts.dropna(subset=['Lat', 'Lon'])
-        
-        if not city_counts.empty:
-            price_desc = f"价格等级: {', '.join(map(str, sorted(selected_price_levels)))}" if selected_price_levels else "所有价格等级"
-            fig = px.scatter_mapbox(
-                city_counts,
-                lat='Lat',
-                lon='Lon',
+        # 显示全球视图
+        if len(filtered_rows) > 0:
+            # 获取所有城市的统计数据
+            city_counts = get_city_counts(dataset, filtered_rows, filter_spec)
+
+            # 为所有城市添加坐标（由餐厅经纬度推导）
+            city_counts = locate_cities(city_counts, dataset.cities)
+
+            if not city_counts.empty:
+                price_desc = f"价格等级: {', '.join(map(str, sorted(selected_price_levels)))}" if selected_price_levels else "所有价格等级"
+                fig = px.scatter_mapbox(
+                    city_counts,
+                    lat='Lat',
+                    lon='Lon',
+                    size='Count',
+                    hover_name='City',
+                    hover_data={'Count': True},
+                    size_max=20,
+                    color='Count',
+                    color_continuous_scale=COLOR_SCALES['reds'],  # 使用红色系颜色方案
+                    zoom=1,
+                    title=f"全球米其林餐厅分布 - 选中评级: {', '.join(selected_awards)} - {price_desc}"
+                )
+
+                fig.update_layout(
+                    mapbox_style="open-street-map",
+                    height=500,
+                    margin=dict(l=0, r=0, t=30, b=0),
+                    paper_bgcolor='white'
+                )
+
+                show_chart(fig, 'global_map')
+            else:
+                st.info("暂无全球城市坐标数据")
+        else:
+            st.info("请选择筛选条件来查看地图分布")
+
+if map_tab.open:
+    with map_tab:
+        render_map_section()
+
+# 前N菜系的多维度分析
+@timed_section('cuisine')
+def render_cuisine_section():
+    """前N菜系的多维度分析"""
+    # 添加菜系数量选择器
+    col_config1, col_config2 = st.columns([1, 4])
+
+    with col_config1:
+        # 菜系数量选择旋钮
+        top_n_cuisines = st.number_input(
+            "选择显示菜系数量",
+            min_value=5,
+            max_value=30,  # 增加到30个菜系
+            value=DEFAULT_TOP_CUISINES,
+            step=1,
+            help="选择要显示的前N个菜系数量（最多30个）"
+        )
+
+    # 【统一】获取筛选后的前N菜系数据（排名计时记为 cuisine_ranking）
+    top_n_cuisines_list = get_filtered_top_cuisines_by_restaurants(dataset, filter_spec, filtered_rows, top_n_cuisines)
+
+    # 生成动态颜色序列
+    dynamic_colors = generate_red_colors(len(top_n_cuisines_list))
+
+    # 【统一】使用相同的计数逻辑计算数据（基于选中的评级）
+    distribution_df, cuisine_stats_df = cached_result(
+        'cuisine_award_tables', calculate_cuisine_award_tables, dataset, filter_spec, filtered_rows, top_n_cuisines_list, selected_awards, filter_spec
+    )
+
+    if not distribution_df.empty and not cuisine_stats_df.empty:
+        # 第一行：菜系分布和评级关系
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown(f'<h3 style="color: #34495e; margin-bottom: 1rem;">前{top_n_cuisines}菜系餐厅数量</h3>', unsafe_allow_html=True)
+
+            # 使用统一统计数据
+            sorted_cuisine_stats = cuisine_stats_df.sort_values('Restaurant_Count', ascending=True)
+
+            fig = px.bar(
+                sorted_cuisine_stats,
+                x='Restaurant_Count',
+                y='Cuisine',
+                orientation='h',
+                labels={'Restaurant_Count': '餐厅数量', 'Cuisine': '菜系'},
+                color='Restaurant_Count',
+                color_continuous_scale=COLOR_SCALES['sequential']  # 使用红色系颜色方案
+            )
+
+            fig.update_layout(
+                showlegend=False,
+                height=400,
+                margin=dict(l=0, r=0, t=0, b=0),
+                paper_bgcolor='white',
+                coloraxis_colorbar=dict(
+                    title='餐厅数量'
+                )
+            )
+
+            show_chart(fig, 'cuisine_count')
+
+        with col2:
+            st.markdown(f'<h3 style="color: #34495e; margin-bottom: 1rem;">前{top_n_cuisines}菜系与星级分布</h3>', unsafe_allow_html=True)
+
+            # 创建气泡图 - 使用统一的分布数据
+            fig = px.scatter(
+                distribution_df,
+                x='Cuisine',
+                y='Award',
                 size='Count',
-                hover_name='City',
-                hover_data={'Count': True},
-                size_max=20,
-                color='Count',
-                color_continuous_scale=COLOR_SCALES['reds'],  # 使用红色系颜色方案
-                zoom=1,
-                title=f"全球米其林餐厅分布 - 选中评级: {', '.join(selected_awards)} - {price_desc}"
+                color='Cuisine',
+                hover_name='Cuisine',
+                hover_data={'Count': True, 'Cuisine': False, 'Award': True},
+                size_max=30,
+                labels={
+                    'Cuisine': '菜系',
+                    'Award': '米其林评级',
+                    'Count': '餐厅数量'
+                },
+                color_discrete_sequence=dynamic_colors  # 使用动态生成的红色系颜色
             )
-            
+
+            # 自定义气泡大小范围，确保可视化效果
+            fig.update_traces(
+                marker=dict(
+                    sizemode='area',
+                    sizeref=2.*max(distribution_df['Count'])/(30.**2),
+                    sizemin=4
+                )
+            )
+
             fig.update_layout(
-                mapbox_style="open-street-map",
-                height=500,
-                margin=dict(l=0, r=0, t=30, b=0),
-                paper_bgcolor='white'
+                height=400,
+                margin=dict(l=0, r=0, t=0, b=0),
+                xaxis_tickangle=-45,
+                showlegend=False,
+                paper_bgcolor='white',
+                xaxis_title='菜系',
+                yaxis_title='米其林评级'
             )
-            
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("暂无全球城市坐标数据")
-    else:
-        st.info("请选择筛选条件来查看地图分布")
 
-# 前N菜系的多维度分析
-st.markdown('<h2 class="section-header">📈 菜系深度分析</h2>', unsafe_allow_html=True)
-
-# 添加菜系数量选择器
-col_config1, col_config2 = st.columns([1, 4])
-
-with col_config1:
-    # 菜系数量选择旋钮
-    top_n_cuisines = st.number_input(
-        "选择显示菜系数量",
-        min_value=5,
-        max_value=30,  # 增加到30个菜系
-        value=10,
-        step=1,
-        help="选择要显示的前N个菜系数量（最多30个）"
-    )
+            # 改进悬停信息显示
+            fig.update_traces(
+                hovertemplate="<br>".join([
+                    "菜系: %{x}",
+                    "评级: %{y}",
+                    "餐厅数量: %{marker.size}",
+                    "<extra></extra>"
+                ])
+            )
 
-# 【统一】获取筛选后的前N菜系数据
-top_n_cuisines_list = get_filtered_top_cuisines_by_restaurants(filtered_df, top_n_cuisines)
+            show_chart(fig, 'cuisine_award')
 
-# 生成动态颜色序列
-dynamic_colors = generate_red_colors(len(top_n_cuisines_list))
+        # 第二行：价格分析和星级评分
+        col1, col2 = st.columns(2)
 
-# 【统一】使用相同的计数逻辑计算数据（基于选中的评级）
-distribution_df = calculate_cuisine_award_distribution(filtered_df, top_n_cuisines_list, selected_awards)
-cuisine_stats_df = calculate_cuisine_stats_from_distribution(distribution_df, filtered_df, top_n_cuisines_list, selected_awards)
+        with col1:
+            st.markdown(f'<h3 style="color: #34495e; margin-bottom: 1rem;">前{top_n_cuisines}菜系平均价格等级</h3>', unsafe_allow_html=True)
 
-if not distribution_df.empty and not cuisine_stats_df.empty:
-    # 第一行：菜系分布和评级关系
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown(f'<h3 style="color: #34495e; margin-bottom: 1rem;">前{top_n_cuisines}菜系餐厅数量</h3>', unsafe_allow_html=True)
-        
-        # 使用统一统计数据
-        sorted_cuisine_stats = cuisine_stats_df.sort_values('Restaurant_Count', ascending=True)
-        
-        fig = px.bar(
-            sorted_cuisine_stats,
-            x='Restaurant_Count',
-            y='Cuisine',
-            orientation='h',
-            labels={'Restaurant_Count': '餐厅数量', 'Cuisine': '菜系'},
-            color='Restaurant_Count',
-            color_continuous_scale=COLOR_SCALES['sequential']  # 使用红色系颜色方案
-        )
-        
-        fig.update_layout(
-            showlegend=False,
-            height=400,
-            margin=dict(l=0, r=0, t=0, b=0),
-            paper_bgcolor='white',
-            coloraxis_colorbar=dict(
-                title='餐厅数量'
+            # 使用统一统计数据
+            sorted_price_stats = cuisine_stats_df.sort_values('Avg_Price_Level', ascending=False)
+
+            # 保留两位小数
+            sorted_price_stats['Avg_Price_Level'] = sorted_price_stats['Avg_Price_Level'].round(2)
+
+            fig = px.bar(
+                sorted_price_stats,
+                x='Cuisine',
+                y='Avg_Price_Level',
+                color='Avg_Price_Level',
+                color_continuous_scale=COLOR_SCALES['price_scale']
             )
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        st.markdown(f'<h3 style="color: #34495e; margin-bottom: 1rem;">前{top_n_cuisines}菜系与星级分布</h3>', unsafe_allow_html=True)
-        
-        # 创建气泡图 - 使用统一的分布数据
-        fig = px.scatter(
-            distribution_df,
-            x='Cuisine',
-            y='Award',
-            size='Count',
-            color='Cuisine',
-            hover_name='Cuisine',
-            hover_data={'Count': True, 'Cuisine': False, 'Award': True},
-            size_max=30,
-            labels={
-                'Cuisine': '菜系',
-                'Award': '米其林评级',
-                'Count': '餐厅数量'
-            },
-            color_discrete_sequence=dynamic_colors  # 使用动态生成的红色系颜色
-        )
-        
-        # 自定义气泡大小范围，确保可视化效果
-        fig.update_traces(
-            marker=dict(
-                sizemode='area',
-                sizeref=2.*max(distribution_df['Count'])/(30.**2),
-                sizemin=4
+
+            # 更新图表布局，设置中文标签
+            fig.update_layout(
+                height=400,
+                margin=dict(l=0, r=0, t=0, b=0),
+                xaxis_tickangle=-45,
+                showlegend=False,
+                paper_bgcolor='white',
+                # 设置x轴和y轴标签为中文
+                xaxis_title='菜系',
+                yaxis_title='平均价格等级',
+                # 设置颜色条标题为中文
+                coloraxis_colorbar=dict(
+                    title='平均价格等级'
+                )
             )
-        )
-        
-        fig.update_layout(
-            height=400,
-            margin=dict(l=0, r=0, t=0, b=0),
-            xaxis_tickangle=-45,
-            showlegend=False,
-            paper_bgcolor='white',
-            xaxis_title='菜系',
-            yaxis_title='米其林评级'
-        )
-        
-        # 改进悬停信息显示
-        fig.update_traces(
-            hovertemplate="<br>".join([
-                "菜系: %{x}",
-                "评级: %{y}",
-                "餐厅数量: %{marker.size}",
-                "<extra></extra>"
-            ])
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
-    
-    # 第二行：价格分析和星级评分
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown(f'<h3 style="color: #34495e; margin-bottom: 1rem;">前{top_n_cuisines}菜系平均价格等级</h3>', unsafe_allow_html=True)
-    
-        # 使用统一统计数据
-        sorted_price_stats = cuisine_stats_df.sort_values('Avg_Price_Level', ascending=False)
-        
-        # 保留两位小数
-        sorted_price_stats['Avg_Price_Level'] = sorted_price_stats['Avg_Price_Level'].round(2)
-        
-        fig = px.bar(
-            sorted_price_stats,
-            x='Cuisine',
-            y='Avg_Price_Level',
-            color='Avg_Price_Level',
-            color_continuous_scale=COLOR_SCALES['price_scale']
-        )
-        
-        # 更新图表布局，设置中文标签
-        fig.update_layout(
-            height=400,
-            margin=dict(l=0, r=0, t=0, b=0),
-            xaxis_tickangle=-45,
-            showlegend=False,
-            paper_bgcolor='white',
-            # 设置x轴和y轴标签为中文
-            xaxis_title='菜系',
-            yaxis_title='平均价格等级',
-            # 设置颜色条标题为中文
-            coloraxis_colorbar=dict(
-                title='平均价格等级'
+
+            # 更新悬停信息为中文
+            fig.update_traces(
+                hovertemplate=(
+                    "<b>%{x}</b><br>" +
+                    "平均价格等级: %{y:.2f}<br>" +
+                    "<extra></extra>"
+                )
             )
-        )
-        
-        # 更新悬停信息为中文
-        fig.update_traces(
-            hovertemplate=(
-                "<b>%{x}</b><br>" +
-                "平均价格等级: %{y:.2f}<br>" +
-                "<extra></extra>"
+
+            # 更新y轴格式显示两位小数
+            fig.update_yaxes(tickformat=".2f")
+
+            show_chart(fig, 'cuisine_price')
+
+        with col2:
+            st.markdown(f'<h3 style="color: #34495e; margin-bottom: 1rem;">前{top_n_cuisines}菜系星级评分分布</h3>', unsafe_allow_html=True)
+
+            # 使用统一统计数据
+            sorted_award_stats = cuisine_stats_df.sort_values('Avg_Award_Score', ascending=False)
+
+            # 保留两位小数
+            sorted_award_stats['Avg_Award_Score'] = sorted_award_stats['Avg_Award_Score'].round(2)
+
+            # 创建散点图 - 修复悬停信息问题
+            fig = px.scatter(
+                sorted_award_stats,
+                x='Cuisine',
+                y='Avg_Award_Score',
+                size='Restaurant_Count',
+                color='Avg_Award_Score',
+                hover_data={
+                    'Cuisine': False,  # 不在悬停数据中重复显示
+                    'Avg_Award_Score': ':.2f',
+                    'Restaurant_Count': True,
+                    'Starred_Count': True
+                },
+                size_max=40,
+                labels={
+                    'Cuisine': '菜系',
+                    'Avg_Award_Score': '平均星级评分',
+                    'Restaurant_Count': '总餐厅数量',
+                    'Starred_Count': '有星级餐厅数量'
+                },
+                color_continuous_scale=COLOR_SCALES['sequential']
             )
-        )
-        
-        # 更新y轴格式显示两位小数
-        fig.update_yaxes(tickformat=".2f")
-        
-        st.plotly_chart(fig, use_container_width=True)
-            
-    with col2:
-        st.markdown(f'<h3 style="color: #34495e; margin-bottom: 1rem;">前{top_n_cuisines}菜系星级评分分布</h3>', unsafe_allow_html=True)
-        
+
+            # 自定义气泡大小范围
+            fig.update_traces(
+                marker=dict(
+                    sizemode='area',
+                    sizeref=2.*max(sorted_award_stats['Restaurant_Count'])/(40.**2),
+                    sizemin=8,
+                    opacity=0.7,
+                    line=dict(width=1, color='white')
+                )
+            )
+
+            fig.update_layout(
+                height=400,
+                margin=dict(l=0, r=0, t=0, b=0),
+                xaxis_tickangle=-45,
+                showlegend=False,
+                paper_bgcolor='white',
+                xaxis_title='菜系',
+                yaxis_title='平均星级评分'
+            )
+
+            # 修复悬停信息显示 - 确保有星级餐厅数量显示为整数
+            fig.update_traces(
+                hovertemplate=(
+                    "<b>%{x}</b><br>" +
+                    "平均星级评分: %{y:.2f}<br>" +
+                    "总餐厅数量: %{marker.size}<br>" +
+                    "<extra></extra>"
+                )
+            )
+
+            # 更新y轴格式显示两位小数
+            fig.update_yaxes(tickformat=".2f")
+
+            show_chart(fig, 'cuisine_award_score')
+
+        # 第三行：综合关系气泡图
+        st.markdown(f'<h3 style="color: #34495e; margin-bottom: 1rem;">前{top_n_cuisines}菜系综合关系分析</h3>', unsafe_allow_html=True)
+
         # 使用统一统计数据
-        sorted_award_stats = cuisine_stats_df.sort_values('Avg_Award_Score', ascending=False)
-        
-        # 保留两位小数
-        sorted_award_stats['Avg_Award_Score'] = sorted_award_stats['Avg_Award_Score'].round(2)
-        
-        # 创建散点图 - 修复悬停信息问题
         fig = px.scatter(
-            sorted_award_stats,
-            x='Cuisine',
+            cuisine_stats_df,
+            x='Avg_Price_Level',
             y='Avg_Award_Score',
             size='Restaurant_Count',
-            color='Avg_Award_Score',
+            color='Cuisine',
+            hover_name='Cuisine',
             hover_data={
-                'Cuisine': False,  # 不在悬停数据中重复显示
-                'Avg_Award_Score': ':.2f',
+                'Cuisine': False,
+                'Avg_Price_Level': ':.2f',
+                'Avg_Award_Score': ':.2f', 
                 'Restaurant_Count': True,
                 'Starred_Count': True
             },
             size_max=40,
             labels={
-                'Cuisine': '菜系',
+                'Avg_Price_Level': '平均价格等级',
                 'Avg_Award_Score': '平均星级评分',
-                'Restaurant_Count': '总餐厅数量',
+                'Restaurant_Count': '餐厅数量',
                 'Starred_Count': '有星级餐厅数量'
             },
-            color_continuous_scale=COLOR_SCALES['sequential']
+            color_discrete_sequence=dynamic_colors  # 使用动态生成的红色系颜色
         )
-        
+
         # 自定义气泡大小范围
         fig.update_traces(
             marker=dict(
                 sizemode='area',
-                sizeref=2.*max(sorted_award_stats['Restaurant_Count'])/(40.**2),
+                sizeref=2.*max(cuisine_stats_df['Restaurant_Count'])/(40.**2),
                 sizemin=8,
                 opacity=0.7,
                 line=dict(width=1, color='white')
+            ),
+            hovertemplate=(
+                "<b>%{hovertext}</b><br>" +
+                "平均价格等级: %{x:.2f}<br>" +
+                "平均星级评分: %{y:.2f}<br>" +
+                "餐厅数量: %{marker.size}<br>" +
+                "<extra></extra>"
             )
         )
-        
+
         fig.update_layout(
-            height=400,
+            height=500,
             margin=dict(l=0, r=0, t=0, b=0),
-            xaxis_tickangle=-45,
-            showlegend=False,
+            showlegend=True,
             paper_bgcolor='white',
-            xaxis_title='菜系',
+            xaxis_title='平均价格等级',
             yaxis_title='平均星级评分'
         )
-        
-        # 修复悬停信息显示 - 确保有星级餐厅数量显示为整数
-        fig.update_traces(
-            hovertemplate=(
-                "<b>%{x}</b><br>" +
-                "平均星级评分: %{y:.2f}<br>" +
-                "总餐厅数量: %{marker.size}<br>" +
-                "<extra></extra>"
-            )
-        )
-        
-        # 更新y轴格式显示两位小数
-        fig.update_yaxes(tickformat=".2f")
-        
-        st.plotly_chart(fig, use_container_width=True)
-    
-    # 第三行：综合关系气泡图
-    st.markdown(f'<h3 style="color: #34495e; margin-bottom: 1rem;">前{top_n_cuisines}菜系综合关系分析</h3>', unsafe_allow_html=True)
-    
-    # 使用统一统计数据
-    fig = px.scatter(
-        cuisine_stats_df,
-        x='Avg_Price_Level',
-        y='Avg_Award_Score',
-        size='Restaurant_Count',
-        color='Cuisine',
-        hover_name='Cuisine',
-        hover_data={
-            'Cuisine': False,
-            'Avg_Price_Level': ':.2f',
-            'Avg_Award_Score': ':.2f', 
-            'Restaurant_Count': True,
-            'Starred_Count': True
-        },
-        size_max=40,
-        labels={
-            'Avg_Price_Level': '平均价格等级',
-            'Avg_Award_Score': '平均星级评分',
-            'Restaurant_Count': '餐厅数量',
-            'Starred_Count': '有星级餐厅数量'
-        },
-        color_discrete_sequence=dynamic_colors  # 使用动态生成的红色系颜色
-    )
-    
-    # 自定义气泡大小范围
-    fig.update_traces(
-        marker=dict(
-            sizemode='area',
-            sizeref=2.*max(cuisine_stats_df['Restaurant_Count'])/(40.**2),
-            sizemin=8,
-            opacity=0.7,
-            line=dict(width=1, color='white')
-        ),
-        hovertemplate=(
-            "<b>%{hovertext}</b><br>" +
-            "平均价格等级: %{x:.2f}<br>" +
-            "平均星级评分: %{y:.2f}<br>" +
-            "餐厅数量: %{marker.size}<br>" +
-            "<extra></extra>"
-        )
-    )
-    
-    fig.update_layout(
-        height=500,
-        margin=dict(l=0, r=0, t=0, b=0),
-        showlegend=True,
-        paper_bgcolor='white',
-        xaxis_title='平均价格等级',
-        yaxis_title='平均星级评分'
-    )
-    
-    # 更新坐标轴格式显示两位小数
-    fig.update_xaxes(tickformat=".2f")
-    fig.update_yaxes(tickformat=".2f")
-    
-    st.plotly_chart(fig, use_container_width=True)
 
-else:
-    st.info("暂无菜系数据")
+        # 更新坐标轴格式显示两位小数
+        fig.update_xaxes(tickformat=".2f")
+        fig.update_yaxes(tickformat=".2f")
 
-# --- 【新增】星级价格分布与奢华餐厅占比分析 ---
-st.markdown('<h2 class="section-header">💰 星级价格分布与奢华餐厅分析</h2>', unsafe_allow_html=True)
-
-if not filtered_df.empty:
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.markdown('<h3 style="color: #34495e; margin-bottom: 1rem;">各星级价格区间分布</h3>', unsafe_allow_html=True)
-
-        # 准备数据：星级 vs 价格等级的交叉表
-        award_price_cross = pd.crosstab(
-            filtered_df['Award'],
-            filtered_df['Price_level'],
-            normalize='index'
-        ).round(4) * 100  # 转换为百分比
-
-        # 只保留有数据的星级
-        award_price_cross = award_price_cross.loc[award_price_cross.sum(axis=1) > 0]
-
-        if not award_price_cross.empty:
-            # 创建100%堆叠条形图
-            fig_stacked = go.Figure()
-
-            # 价格等级描述映射
-            price_level_names = {
-                1: "经济型 (¥)",
-                2: "中价位 (¥¥)",
-                3: "高消费 (¥¥¥)",
-                4: "奢华型 (¥¥¥¥)"
-            }
-
-            # 动态生成红色系颜色
-            price_colors = generate_red_colors(len(award_price_cross.columns))
-
-            # 为每个价格等级添加一个条形
-            for i, price_level in enumerate(award_price_cross.columns):
-                price_level_name = price_level_names.get(price_level, f"等级{price_level}")
-
-                fig_stacked.add_trace(go.Bar(
-                    name=price_level_name,
-                    x=award_price_cross.index,
-                    y=award_price_cross[price_level],
-                    marker_color=price_colors[i],
-                    hovertemplate=(
-                            "<b>%{x}</b><br>" +
-                            f"价格等级: {price_level_name}<br>" +
-                            "占比: %{y:.1f}%<br>" +
-                            "<extra></extra>"
-                    )
-                ))
+        show_chart(fig, 'cuisine_bubble')
 
-            # 更新布局
-            fig_stacked.update_layout(
-                barmode='stack',
-                height=400,
-                margin=dict(l=0, r=0, t=30, b=0),
-                paper_bgcolor='white',
-                showlegend=True,
-                xaxis_title="米其林评级",
-                yaxis_title="占比 (%)",
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="right",
-                    x=1
-                )
-            )
+    else:
+        st.info("暂无菜系数据")
 
-            # 设置y轴范围确保显示0-100%
-            fig_stacked.update_yaxes(range=[0, 100])
+if cuisine_tab.open:
+    with cuisine_tab:
+        render_cuisine_section()
 
-            # 添加百分比标签（选择性显示，避免过于拥挤）
-            fig_stacked.update_traces(
-                texttemplate='%{y:.0f}%',
-                textposition='inside',
-                insidetextanchor='middle'
+# --- 【新增】星级价格分布与奢华餐厅占比分析 ---
+@timed_section('price')
+def render_price_section():
+    """星级价格分布与奢华餐厅占比分析"""
+    if len(filtered_rows) > 0:
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown('<h3 style="color: #34495e; margin-bottom: 1rem;">各星级价格区间分布</h3>', unsafe_allow_html=True)
+
+            # 准备数据：星级 vs 价格等级的交叉表
+            award_price_cross = cached_result(
+                'award_price_distribution', calculate_award_price_distribution, dataset, filter_spec, filtered_rows, filter_spec
             )
 
-            st.plotly_chart(fig_stacked, use_container_width=True)
-        else:
-            st.info("当前筛选条件下无星级价格分布数据")
-
-    with col2:
-        st.markdown('<h3 style="color: #34495e; margin-bottom: 1rem;">奢华餐厅占比城市排名</h3>',
-                    unsafe_allow_html=True)
-
-        # 计算各城市奢华餐厅占比
-        if len(filtered_df) > 0:
-            # 定义奢华餐厅（价格等级4）
-            luxury_threshold = 4
-
-            # 按城市分组计算
-            city_stats = filtered_df.groupby('City').agg({
-                'Name': 'count',  # 总餐厅数
-                'Price_level': lambda x: (x == luxury_threshold).sum()  # 奢华餐厅数
-            }).rename(columns={'Name': 'total_restaurants', 'Price_level': 'luxury_count'})
-
-            # 计算奢华占比
-            city_stats['luxury_ratio'] = (city_stats['luxury_count'] / city_stats['total_restaurants'] * 100).round(2)
-
-            # 过滤掉餐厅数量太少的城市（至少2家）
-            city_stats = city_stats[city_stats['total_restaurants'] >= 2]
-
-            # 按奢华占比排序
-            city_stats = city_stats.sort_values('luxury_ratio', ascending=False)
-
-            if not city_stats.empty:
-                # 分页设置
-                cities_per_page = 10
-                total_pages = max(1, (len(city_stats) + cities_per_page - 1) // cities_per_page)
-
-                # 分页控件
-                page_col1, page_col2, page_col3 = st.columns([1, 2, 1])
-                with page_col2:
-                    page_number = st.number_input(
-                        "页码",
-                        min_value=1,
-                        max_value=total_pages,
-                        value=1,
-                        step=1,
-                        key="luxury_page"
-                    )
+            if not award_price_cross.empty:
+                # 创建100%堆叠条形图
+                fig_stacked = go.Figure()
 
-                # 计算当前页的数据范围
-                start_idx = (page_number - 1) * cities_per_page
-                end_idx = min(start_idx + cities_per_page, len(city_stats))
-                current_page_data = city_stats.iloc[start_idx:end_idx]
-
-                # 创建水平条形图
-                fig_luxury = px.bar(
-                    current_page_data.reset_index(),
-                    x='luxury_ratio',
-                    y='City',
-                    orientation='h',
-                    labels={
-                        'luxury_ratio': '奢华餐厅占比 (%)',
-                        'City': '城市',
-                        'total_restaurants': '餐厅总数'
-                    },
-                    hover_data={
-                        'total_restaurants': True,
-                        'luxury_count': True
-                    },
-                    color='luxury_ratio',
-                    color_continuous_scale=COLOR_SCALES['sequential']
-                )
+                # 价格等级描述映射
+                price_level_names = {
+                    1: "经济型 (¥)",
+                    2: "中价位 (¥¥)",
+                    3: "高消费 (¥¥¥)",
+                    4: "奢华型 (¥¥¥¥)"
+                }
+
+                # 动态生成红色系颜色
+                price_colors = generate_red_colors(len(award_price_cross.columns))
+
+                # 为每个价格等级添加一个条形
+                for i, price_level in enumerate(award_price_cross.columns):
+                    price_level_name = price_level_names.get(price_level, f"等级{price_level}")
+
+                    fig_stacked.add_trace(go.Bar(
+                        name=price_level_name,
+                        x=award_price_cross.index,
+                        y=award_price_cross[price_level],
+                        marker_color=price_colors[i],
+                        hovertemplate=(
+                                "<b>%{x}</b><br>" +
+                                f"价格等级: {price_level_name}<br>" +
+                                "占比: %{y:.1f}%<br>" +
+                                "<extra></extra>"
+                        )
+                    ))
 
                 # 更新布局
-                fig_luxury.update_layout(
+                fig_stacked.update_layout(
+                    barmode='stack',
                     height=400,
                     margin=dict(l=0, r=0, t=30, b=0),
                     paper_bgcolor='white',
-                    showlegend=False,
-                    xaxis_title="奢华餐厅占比 (%)",
-                    yaxis_title="城市",
-                    yaxis={'categoryorder': 'total ascending'}
+                    showlegend=True,
+                    xaxis_title="米其林评级",
+                    yaxis_title="占比 (%)",
+                    legend=dict(
+                        orientation="h",
+                        yanchor="bottom",
+                        y=1.02,
+                        xanchor="right",
+                        x=1
+                    )
                 )
 
-                # 更新悬停信息
-                fig_luxury.update_traces(
-                    hovertemplate=(
-                            "<b>%{y}</b><br>" +
-                            "奢华餐厅占比: %{x:.1f}%<br>" +
-                            "奢华餐厅数量: %{customdata[1]}<br>" +
-                            "总餐厅数量: %{customdata[0]}<br>" +
-                            "<extra></extra>"
-                    )
+                # 设置y轴范围确保显示0-100%
+                fig_stacked.update_yaxes(range=[0, 100])
+
+                # 添加百分比标签（选择性显示，避免过于拥挤）
+                fig_stacked.update_traces(
+                    texttemplate='%{y:.0f}%',
+                    textposition='inside',
+                    insidetextanchor='middle'
                 )
 
-                st.plotly_chart(fig_luxury, use_container_width=True)
+                show_chart(fig_stacked, 'award_price_stack')
+            else:
+                st.info("当前筛选条件下无星级价格分布数据")
+
+        with col2:
+            st.markdown('<h3 style="color: #34495e; margin-bottom: 1rem;">奢华餐厅占比城市排名</h3>',
+                        unsafe_allow_html=True)
+
+            # 计算各城市奢华餐厅占比
+            if len(filtered_rows) > 0:
+                # 奢华餐厅（价格等级4）占比，过滤掉餐厅数量太少的城市（至少2家），按占比排序
+                city_stats = cached_result('city_luxury_stats', calculate_city_luxury_stats, dataset, filter_spec, filtered_rows, 4, 2)
+
+                if not city_stats.empty:
+                    # 分页设置
+                    cities_per_page = 10
+                    total_pages = max(1, (len(city_stats) + cities_per_page - 1) // cities_per_page)
+
+                    # 分页控件
+                    page_col1, page_col2, page_col3 = st.columns([1, 2, 1])
+                    with page_col2:
+                        page_number = st.number_input(
+                            "页码",
+                            min_value=1,
+                            max_value=total_pages,
+                            value=1,
+                            step=1,
+                            key="luxury_page"
+                        )
+
+                    # 计算当前页的数据范围
+                    start_idx = (page_number - 1) * cities_per_page
+                    end_idx = min(start_idx + cities_per_page, len(city_stats))
+                    current_page_data = city_stats.iloc[start_idx:end_idx]
+
+                    # 创建水平条形图
+                    fig_luxury = px.bar(
+                        current_page_data.reset_index(),
+                        x='luxury_ratio',
+                        y='City',
+                        orientation='h',
+                        labels={
+                            'luxury_ratio': '奢华餐厅占比 (%)',
+                            'City': '城市',
+                            'total_restaurants': '餐厅总数'
+                        },
+                        hover_data={
+                            'total_restaurants': True,
+                            'luxury_count': True
+                        },
+                        color='luxury_ratio',
+                        color_continuous_scale=COLOR_SCALES['sequential']
+                    )
+
+                    # 更新布局
+                    fig_luxury.update_layout(
+                        height=400,
+                        margin=dict(l=0, r=0, t=30, b=0),
+                        paper_bgcolor='white',
+                        showlegend=False,
+                        xaxis_title="奢华餐厅占比 (%)",
+                        yaxis_title="城市",
+                        yaxis={'categoryorder': 'total ascending'}
+                    )
 
-                # 显示分页信息
-                st.caption(
-                    f"显示 {start_idx + 1}-{end_idx} 个城市，共 {len(city_stats)} 个城市 (第 {page_number}/{total_pages} 页)")
+                    # 更新悬停信息
+                    fig_luxury.update_traces(
+                        hovertemplate=(
+                                "<b>%{y}</b><br>" +
+                                "奢华餐厅占比: %{x:.1f}%<br>" +
+                                "奢华餐厅数量: %{customdata[1]}<br>" +
+                                "总餐厅数量: %{customdata[0]}<br>" +
+                                "<extra></extra>"
+                        )
+                    )
+
+                    show_chart(fig_luxury, 'city_luxury')
+
+                    # 显示分页信息
+                    st.caption(
+                        f"显示 {start_idx + 1}-{end_idx} 个城市，共 {len(city_stats)} 个城市 (第 {page_number}/{total_pages} 页)")
+                else:
+                    st.info("当前筛选条件下无足够的城市数据进行奢华餐厅分析")
             else:
-                st.info("当前筛选条件下无足够的城市数据进行奢华餐厅分析")
-        else:
-            st.info("请调整筛选条件以查看奢华餐厅分析")
-else:
-    st.info("请调整筛选条件以查看分析数据")
+                st.info("请调整筛选条件以查看奢华餐厅分析")
+    else:
+        st.info("请调整筛选条件以查看分析数据")
 
-# --- 【新增】设施与评级/价格分析 ---
-# --- 【新增】设施与评级/价格分析 ---
-st.markdown('<h2 class="section-header">🏨 设施与评级/价格分析</h2>', unsafe_allow_html=True)
+if price_tab.open:
+    with price_tab:
+        render_price_section()
 
-if not filtered_df.empty:
-    # 准备用于分析的数据
-    facility_df = filtered_df.explode('Facilities_list')
-    
-    # 获取最常见的15个设施进行分析，避免图表过于拥挤
-    top_n_facilities = 15
-    if not facility_df.empty and 'Facilities_list' in facility_df.columns and facility_df['Facilities_list'].notna().any():
-        common_facilities = facility_df['Facilities_list'].value_counts().nlargest(top_n_facilities).index.tolist()
-        
-        # 1. 分组条形图
-        st.markdown('<h3 style="color: #34495e; margin-bottom: 1rem;">不同星级餐厅的设施分布 (热门设施)</h3>', unsafe_allow_html=True)
-        
-        analysis_df = facility_df[facility_df['Facilities_list'].isin(common_facilities)]
-        award_order = ['1 Star', '2 Stars', '3 Stars'] # 仅关注星级餐厅
-        analysis_df = analysis_df[analysis_df['Award'].isin(award_order)]
-
-        if not analysis_df.empty:
-            facility_award_counts = analysis_df.groupby(['Facilities_list', 'Award']).size().reset_index(name='Count')
-            
-            fig_bar = px.bar(
-                facility_award_counts,
-                x='Facilities_list',
-                y='Count',
-                color='Award',
-                barmode='group',
-                labels={'Facilities_list': '设施', 'Count': '餐厅数量', 'Award': '米其林评级'},
-                title='热门设施在不同星级餐厅中的数量',
-                category_orders={'Award': award_order, 'Facilities_list': common_facilities},
-                color_discrete_map={ # 适配为红色系
-                    '1 Star': '#f1948a',  # 浅红
-                    '2 Stars': '#e74c3c',  # 主红
-                    '3 Stars': '#a52a2a'   # 深红
-                }
+# --- 【新增】设施与评级/价格分析 ---
+@timed_section('facility')
+def render_facility_section():
+    """设施与评级/价格分析"""
+    if len(filtered_rows) > 0:
+        # 获取最常见的设施进行分析
+        common_facilities = cached_result('common_facilities', get_common_facilities, dataset, filter_spec, filtered_rows, TOP_FACILITIES, filter_spec)
+        if common_facilities:
+            # 1. 分组条形图
+            st.markdown('<h3 style="color: #34495e; margin-bottom: 1rem;">不同星级餐厅的设施分布 (热门设施)</h3>', unsafe_allow_html=True)
+
+            award_order = STAR_AWARD_ORDER # 仅关注星级餐厅
+            award_prevalence, award_counts = cached_result(
+                'facility_prevalence', calculate_facility_prevalence, dataset, filter_spec, filtered_rows, common_facilities, 'Award', award_order
             )
-            fig_bar.update_layout(xaxis_tickangle=-45, paper_bgcolor='white', yaxis_title='餐厅数量', xaxis_title=None)
-            st.plotly_chart(fig_bar, use_container_width=True)
-        else:
-            st.info("根据当前筛选条件，没有足够的星级餐厅设施数据来生成分组条形图。")
+            facility_award_counts = award_counts.rename_axis(index='Facilities_list', columns='Award').stack().reset_index(name='Count')
+            facility_award_counts = facility_award_counts[facility_award_counts['Count'] > 0]
+
+            if not facility_award_counts.empty:
+                fig_bar = px.bar(
+                    facility_award_counts,
+                    x='Facilities_list',
+                    y='Count',
+                    color='Award',
+                    barmode='group',
+                    labels={'Facilities_list': '设施', 'Count': '餐厅数量', 'Award': '米其林评级'},
+                    title='热门设施在不同星级餐厅中的数量',
+                    category_orders={'Award': award_order, 'Facilities_list': common_facilities},
+                    color_discrete_map={ # 适配为红色系
+                        '1 Star': '#f1948a',  # 浅红
+                        '2 Stars': '#e74c3c',  # 主红
+                        '3 Stars': '#a52a2a'   # 深红
+                    }
+                )
+                fig_bar.update_layout(xaxis_tickangle=-45, paper_bgcolor='white', yaxis_title='餐厅数量', xaxis_title=None)
+                show_chart(fig_bar, 'facility_award')
+            else:
+                st.info("根据当前筛选条件，没有足够的星级餐厅设施数据来生成分组条形图。")
 
-        # 2. 热力图
-        st.markdown('<h3 style="color: #34495e; margin-top: 2rem; margin-bottom: 1rem;">设施在不同评级/价格中的普及率</h3>', unsafe_allow_html=True)
-        heatmap_axis = st.radio(
-            "选择热力图分析维度", ('米其林星级', '价格等级'),
-            horizontal=True, key='heatmap_toggle'
-        )
+            # 2. 热力图
+            st.markdown('<h3 style="color: #34495e; margin-top: 2rem; margin-bottom: 1rem;">设施在不同评级/价格中的普及率</h3>', unsafe_allow_html=True)
+            heatmap_axis = st.radio(
+                "选择热力图分析维度", ('米其林星级', '价格等级'),
+                horizontal=True, key='heatmap_toggle'
+            )
 
-        # 确保 heatmap_df 中有有效的设施列表
-        heatmap_df = filtered_df.dropna(subset=['Facilities_list'])
-        heatmap_df = heatmap_df[heatmap_df['Facilities_list'].apply(lambda x: isinstance(x, list) and len(x) > 0 and any(fac in common_facilities for fac in x))]
-        
-        if not heatmap_df.empty:
             if heatmap_axis == '米其林星级':
-                columns = ['1 Star', '2 Stars', '3 Stars']
-                heatmap_data = pd.DataFrame(index=common_facilities, columns=columns).fillna(0.0)
-
-                for award in columns:
-                    total_restaurants = len(heatmap_df[heatmap_df['Award'] == award])
-                    if total_restaurants > 0:
-                        for facility in common_facilities:
-                            count_with_facility = len(heatmap_df[(heatmap_df['Award'] == award) & (heatmap_df['Facilities_list'].apply(lambda x: facility in x))])
-                            heatmap_data.loc[facility, award] = (count_with_facility / total_restaurants) * 100
-                
+                # 与分组条形图共用同一次矩阵乘积结果
+                heatmap_data = award_prevalence
+
                 title = '设施在不同星级餐厅中的普及率 (%)'
                 xaxis_title = '米其林评级'
-            
+
             else: # 价格等级
-                columns = sorted(heatmap_df['Price_level'].dropna().unique().astype(int))
-                heatmap_data = pd.DataFrame(index=common_facilities, columns=columns).fillna(0.0)
-
-                for price_level in columns:
-                    total_restaurants = len(heatmap_df[heatmap_df['Price_level'] == price_level])
-                    if total_restaurants > 0:
-                        for facility in common_facilities:
-                            count_with_facility = len(heatmap_df[(heatmap_df['Price_level'] == price_level) & (heatmap_df['Facilities_list'].apply(lambda x: facility in x))])
-                            heatmap_data.loc[facility, price_level] = (count_with_facility / total_restaurants) * 100
-                
+                heatmap_data, _ = cached_result(
+                    'facility_prevalence', calculate_facility_prevalence, dataset, filter_spec, filtered_rows, common_facilities, 'Price_level'
+                )
+
                 title = '设施在不同价格等级餐厅中的普及率 (%)'
                 xaxis_title = '价格等级'
 
@@ -1252,50 +1320,162 @@ if not filtered_df.empty:
             )
             fig_heatmap.update_layout(paper_bgcolor='white', yaxis={'tickmode': 'array', 'tickvals': common_facilities, 'autorange': 'reversed'})
             fig_heatmap.update_traces(hovertemplate='设施: %{y}<br>' + xaxis_title + ': %{x}<br>普及率: %{z:.1f}%<extra></extra>')
-            st.plotly_chart(fig_heatmap, use_container_width=True)
+            show_chart(fig_heatmap, 'facility_heatmap')
         else:
-            st.info("根据当前筛选条件，没有足够的设施数据来生成热力图。")
+            st.info("当前筛选条件下，餐厅不包含可分析的设施信息。")
     else:
-        st.info("当前筛选条件下，餐厅不包含可分析的设施信息。")
-else:
-    st.info("请调整筛选条件以查看设施分析。")
-    
+        st.info("请调整筛选条件以查看设施分析。")
+
+if facility_tab.open:
+    with facility_tab:
+        render_facility_section()
+
 # 数据表格
-st.markdown('<h2 class="section-header">📋 餐厅详情</h2>', unsafe_allow_html=True)
+EXPORT_LABELS = {'csv': 'CSV', 'parquet': 'Parquet', 'arrow': 'Arrow IPC'}
+
+def detail_frame(rows, relevance=None):
+    """按行号取出详情表格的显示列（只处理给定的行）"""
+    table_df = df.take(rows)
 
-if not filtered_df.empty:
     # 【修改】增加 Description 列
     display_columns = ['Name', 'City', 'Country', 'Continent', 'Price', 'Cuisine', 'Award', 'Price_level', 'Description']
-    available_columns = [col for col in display_columns if col in filtered_df.columns]
-    
-    # 显示筛选后的数据
-    display_df = filtered_df[available_columns].reset_index(drop=True)
-    
+    available_columns = [col for col in display_columns if col in table_df.columns]
+    display_df = table_df[available_columns].reset_index(drop=True)
+
+    # 【新增】半径筛选时显示到中心点的距离
+    if near_filter is not None:
+        display_df['Distance_km'] = haversine_km(
+            near_filter[0], near_filter[1],
+            table_df['Latitude'].to_numpy(), table_df['Longitude'].to_numpy()
+        )
+
+    if relevance is not None:
+        display_df.insert(0, 'Relevance', relevance)
+
     # 如果有数值列，格式化显示两位小数
     numeric_columns = display_df.select_dtypes(include=[np.number]).columns
     for col in numeric_columns:
         display_df[col] = display_df[col].round(2)
-    
-    st.dataframe(
-        display_df,
-        use_container_width=True,
-        height=300
-    )
-    
-    csv = display_df.to_csv(index=False).encode('utf-8')
-    st.download_button(
-        label="📥 下载筛选数据",
-        data=csv,
-        file_name="michelin_restaurants.csv",
-        mime="text/csv"
-    )
-else:
-    st.info("暂无符合条件的数据")
+    return display_df
+
+@timed_section('table')
+def render_table_section():
+    """餐厅详情表格与下载"""
+    # 【新增】快速定位：按名称、地址或城市容错补全（不受筛选条件限制），选中后列出对应餐厅
+    lookup_query = st.text_input("🔎 快速定位餐厅", placeholder="输入名称、地址或城市的一部分，允许拼写错误", key='lookup_query')
+    if lookup_query.strip():
+        with timer.stage('autocomplete'):
+            suggestions = dataset.autocomplete.suggest(lookup_query)
+        if len(suggestions) > 0:
+            field_labels = {'Name': '名称', 'Address': '地址', 'City': '城市'}
+            choice = st.selectbox(
+                "匹配项",
+                range(len(suggestions)),
+                format_func=lambda i: (
+                    f"{field_labels[suggestions['Field'].iloc[i]]}：{suggestions['Value'].iloc[i]}"
+                    f"（{suggestions['Count'].iloc[i]} 家）"
+                ),
+                key='lookup_choice'
+            )
+            matched = suggestions.iloc[choice]
+            matched_rows = dataset.live_rows(dataset.autocomplete.rows(matched['Field'], matched['Value']))
+            lookup_columns = ['Name', 'Address', 'City', 'Country', 'Award', 'Price', 'Cuisine']
+            st.dataframe(df.take(matched_rows)[lookup_columns].reset_index(drop=True), use_container_width=True)
+
+            # 【新增】相似餐厅：加载时已构建特征与近邻索引，这里只在候选单元内计算相似度
+            if len(matched_rows) > 0:
+                selected_row = st.selectbox(
+                    "查看相似餐厅",
+                    matched_rows.tolist(),
+                    format_func=lambda row: f"{df['Name'].iat[row]}（{df['City'].iat[row]}）",
+                    key='similar_row'
+                )
+                with timer.stage('similar'):
+                    neighbour_rows, similarity = similar_rows(dataset, selected_row, k=10)
+                similar_df = df.take(neighbour_rows)[lookup_columns].reset_index(drop=True)
+                similar_df.insert(0, 'Similarity', similarity.round(3))
+                similar_df['Distance_km'] = haversine_km(
+                    df['Latitude'].iat[selected_row], df['Longitude'].iat[selected_row],
+                    dataset.column('Latitude', neighbour_rows), dataset.column('Longitude', neighbour_rows)
+                ).round(0)
+                st.dataframe(similar_df, use_container_width=True)
+        else:
+            st.caption("没有找到匹配的名称、地址或城市")
+        st.markdown("---")
+
+    if len(filtered_rows) > 0:
+        # 【新增】全文搜索时按相关度降序排列，并显示得分
+        table_rows, relevance = filtered_rows, None
+        if filter_spec.query is not None:
+            table_rows, relevance = rank_rows(dataset.search, filter_spec.query, filtered_rows)
+        
+        # 【新增】分页模式：排序使用全表预计算的排列，只取出、序列化当前页的行
+        if st.toggle("分页显示", value=True, key='table_paged'):
+            controls = st.columns([2, 1, 1, 1])
+            sort_column = controls[0].selectbox(
+                "排序",
+                [None] + SORT_COLUMNS,
+                format_func=lambda col: ('相关度' if relevance is not None else '默认顺序') if col is None else col,
+                key='table_sort'
+            )
+            descending = controls[1].toggle("降序", key='table_descending', disabled=sort_column is None)
+            page_size = controls[2].selectbox("每页行数", PAGE_SIZES, index=1, key='table_page_size')
+            n_pages = page_count(len(table_rows), page_size)
+            # 筛选结果变少时页码回到范围内
+            if st.session_state.get('table_page', 1) > n_pages:
+                st.session_state['table_page'] = n_pages
+            page = controls[3].number_input(f"页码（共 {n_pages} 页）", min_value=1, max_value=n_pages, key='table_page')
+
+            with timer.stage('table_page'):
+                rows_on_page = page_rows(dataset, table_rows, page - 1, page_size, sort_column, descending)
+                page_relevance = None
+                if relevance is not None:
+                    page_relevance = dataset.search.scores(filter_spec.query)[rows_on_page]
+                page_df = detail_frame(rows_on_page, page_relevance)
+            st.dataframe(page_df, use_container_width=True, hide_index=True)
+            st.caption(f"第 {page} / {n_pages} 页，共 {len(table_rows)} 家餐厅")
+        else:
+            st.dataframe(
+                detail_frame(table_rows, relevance),
+                use_container_width=True,
+                height=300
+            )
+
+        # 【新增】导出：点击下载时才分块生成文件，页面重跑时不再编码
+        export_format = st.radio(
+            "导出格式", list(EXPORT_FORMATS), format_func=EXPORT_LABELS.get, horizontal=True, key='export_format'
+        )
+        mime, extension = EXPORT_FORMATS[export_format]
+
+        def build_export():
+            frames = (
+                detail_frame(table_rows[start:stop], None if relevance is None else relevance[start:stop])
+                for start, stop in row_chunks(len(table_rows))
+            )
+            # 在独立线程中执行，使用单独的计时器
+            with StageTimer(get_latency_recorder().record).stage(f'export:{export_format}'):
+                return export_bytes(frames, export_format)
+
+        st.download_button(
+            label="📥 下载筛选数据",
+            data=build_export,
+            file_name=f"michelin_restaurants.{extension}",
+            mime=mime,
+            on_click='ignore'
+        )
+    else:
+        st.info("暂无符合条件的数据")
+
+if table_tab.open:
+    with table_tab:
+        render_table_section()
 
 # 显示筛选统计信息
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 📊 筛选统计")
-st.sidebar.markdown(f"**筛选结果**: {len(filtered_df)} 家餐厅")
+st.sidebar.markdown(f"**筛选结果**: {len(filtered_rows)} 家餐厅")
+if filter_spec.query is not None:
+    st.sidebar.markdown(f"**搜索**: {filter_spec.query}")
 if selected_continent != '全部':
     st.sidebar.markdown(f"**大洲**: {selected_continent}")
 if selected_city != '全部':
@@ -1307,6 +1487,21 @@ if selected_price_levels:
 else:
     st.sidebar.markdown(f"**价格等级**: 所有等级")
 
+# 【新增】结果缓存命中情况
+cache_summary = get_result_cache().summary()
+st.sidebar.caption(
+    f"结果缓存: 命中 {cache_summary['hits']} / 磁盘命中 {cache_summary['disk_hits']} / 未命中 {cache_summary['misses']}，"
+    f"淘汰 {cache_summary['evictions']}，占用 {cache_summary['bytes'] / (1 << 20):.1f}MB / {cache_summary['memory_budget'] >> 20}MB"
+)
+
+# 【新增】阶段耗时调试面板：本次运行各阶段耗时与跨运行的 p50/p99（秒）
+if st.sidebar.checkbox("⏱️ 显示阶段耗时", key='show_timing'):
+    st.sidebar.markdown("**本次运行**")
+    st.sidebar.dataframe(timer.frame().round(4), hide_index=True, use_container_width=True)
+    st.sidebar.markdown("**累计（按 p50 降序）**")
+    st.sidebar.dataframe(get_latency_recorder().summary().round(4), hide_index=True, use_container_width=True)
+get_latency_recorder().flush()
+
 # 页脚
 st.markdown("---")
 price_footer = f"价格等级: {', '.join(map(str, sorted(selected_price_levels)))}" if selected_price_levels else "所有价格等级"
@@ -0,0 +1,57 @@
+"""测试夹具：小规模合成数据集（与 cleaned.csv 同列）及覆盖各类条件的筛选组合"""
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_synthetic_csv
+from michelin import FilterSpec, build_dataset, compact_frame, file_fingerprint, parse_csv
+
+N_ROWS = 1500
+
+@pytest.fixture(scope='session')
+def synthetic_csv(tmp_path_factory):
+    return write_synthetic_csv(str(tmp_path_factory.mktemp('data') / 'synthetic.csv'), N_ROWS, seed=7)
+
+@pytest.fixture(scope='session')
+def raw_frame(synthetic_csv):
+    """原始CSV记录（未清洗），用于构造增量"""
+    return pd.read_csv(synthetic_csv, encoding='utf-8', encoding_errors='ignore')
+
+@pytest.fixture(scope='session')
+def reference_df(synthetic_csv):
+    """原仪表盘使用的数据框：菜系、设施为Python列表"""
+    return parse_csv(synthetic_csv)
+
+@pytest.fixture(scope='session')
+def dataset(synthetic_csv):
+    return build_dataset(compact_frame(parse_csv(synthetic_csv)), file_fingerprint(synthetic_csv))
+
+@pytest.fixture(scope='session')
+def cube_specs(reference_df):
+    """只涉及立方体维度的筛选组合（可由立方体回答）"""
+    continent = reference_df['Continent'].value_counts().index[0]
+    city = reference_df['City'].value_counts().index[0]
+    return [
+        FilterSpec(),
+        FilterSpec(continent=continent),
+        FilterSpec(continent=continent, awards=('1 Star', '2 Stars')),
+        FilterSpec(city=city),
+        FilterSpec(city=city, awards=('Bib Gourmand', '3 Stars')),
+        FilterSpec(price_levels=(4,)),
+        FilterSpec(continent=continent, awards=('1 Star',), price_levels=(3, 4)),
+        FilterSpec(city='Atlantis'),
+    ]
+
+@pytest.fixture(scope='session')
+def row_specs(reference_df, dataset):
+    """含菜系、设施、空间范围条件的筛选组合（需逐行判断）"""
+    cuisines = tuple(reference_df['Cuisine_list'].explode().value_counts().index[:3])
+    facilities = tuple(reference_df['Facilities_list'].explode().value_counts().index[:2])
+    lat, lon = reference_df[['Latitude', 'Longitude']].dropna().iloc[0]
+    return [
+        FilterSpec(cuisines=cuisines),
+        FilterSpec(cuisines=cuisines[:1] + ('Martian',), awards=('1 Star', '3 Stars')),
+        FilterSpec(facilities=facilities),
+        FilterSpec(facilities=facilities[:1] + ('Moon view',)),
+        FilterSpec(near=(lat, lon, 300.0)),
+        FilterSpec(bbox=(lat - 5, lat + 5, lon - 5, lon + 5), price_levels=(1, 2)),
+    ]
@@ -0,0 +1,172 @@
+"""向量化分析函数与原仪表盘逐行实现对照"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from michelin import (
+    calculate_cuisine_award_tables,
+    count_cities,
+    get_common_facilities,
+    get_cuisine_ranking,
+    get_filtered_top_cuisines_by_restaurants,
+    get_top_cuisines_by_restaurants,
+    get_unique_cuisines,
+    get_unique_facilities,
+    select,
+)
+from michelin.spatial import haversine_km
+
+AWARDS = ['1 Star', '2 Stars', '3 Stars', 'Bib Gourmand']
+
+# ---- 原仪表盘的逐行实现（参照） ----
+
+def reference_filter(df, spec):
+    filtered_df = df.copy()
+    if spec.continent is not None:
+        filtered_df = filtered_df[filtered_df['Continent'] == spec.continent]
+    if spec.city is not None:
+        filtered_df = filtered_df[filtered_df['City'] == spec.city]
+    if spec.awards:
+        filtered_df = filtered_df[filtered_df['Award'].isin(spec.awards)]
+    if spec.cuisines:
+        filtered_df = filtered_df[filtered_df['Cuisine_list'].apply(
+            lambda x: any(cuisine in x for cuisine in spec.cuisines) if isinstance(x, list) else False
+        )]
+    if spec.facilities:
+        filtered_df = filtered_df[filtered_df['Facilities_list'].apply(lambda x: all(facility in x for facility in spec.facilities) if isinstance(x, list) else False)]
+    if spec.price_levels:
+        filtered_df = filtered_df[filtered_df['Price_level'].isin(spec.price_levels)]
+    # 原仪表盘没有空间条件，按定义逐点判断
+    if spec.near is not None:
+        lat, lon, radius_km = spec.near
+        filtered_df = filtered_df[haversine_km(lat, lon, filtered_df['Latitude'], filtered_df['Longitude']) <= radius_km]
+    if spec.bbox is not None:
+        lat_min, lat_max, lon_min, lon_max = spec.bbox
+        filtered_df = filtered_df[filtered_df['Latitude'].between(lat_min, lat_max) & filtered_df['Longitude'].between(lon_min, lon_max)]
+    return filtered_df
+
+def reference_unique(df, column):
+    values = []
+    for value_list in df[column].dropna():
+        values.extend(value_list)
+    return sorted(list(set(values)))
+
+def reference_cuisine_counts(df):
+    """菜系 -> 餐厅数（按首次出现的先后插入）"""
+    cuisine_restaurant_count = {}
+    for _, row in df.iterrows():
+        if isinstance(row['Cuisine_list'], list):
+            for cuisine in row['Cuisine_list']:
+                if cuisine in cuisine_restaurant_count:
+                    cuisine_restaurant_count[cuisine] += 1
+                else:
+                    cuisine_restaurant_count[cuisine] = 1
+    return cuisine_restaurant_count
+
+def reference_top_cuisines(df, top_n=10):
+    sorted_cuisines = sorted(reference_cuisine_counts(df).items(), key=lambda x: x[1], reverse=True)
+    return [cuisine for cuisine, count in sorted_cuisines[:top_n]]
+
+def reference_distribution(filtered_df, top_cuisines_list, selected_awards):
+    distribution_data = []
+    for cuisine in top_cuisines_list:
+        cuisine_restaurants = filtered_df[filtered_df['Cuisine_list'].apply(
+            lambda x: cuisine in x if isinstance(x, list) else False
+        )]
+        for award in selected_awards:
+            count = len(cuisine_restaurants[cuisine_restaurants['Award'] == award])
+            if count > 0:
+                distribution_data.append({'Cuisine': cuisine, 'Award': award, 'Count': count})
+    return pd.DataFrame(distribution_data)
+
+def reference_stats(distribution_df, filtered_df, top_cuisines_list, selected_awards):
+    stats_data = []
+    award_mapping = {'1 Star': 1, '2 Stars': 2, '3 Stars': 3}
+    selected_star_awards = [award for award in selected_awards if award in ['1 Star', '2 Stars', '3 Stars']]
+    for cuisine in top_cuisines_list:
+        cuisine_data = distribution_df[distribution_df['Cuisine'] == cuisine]
+        cuisine_restaurants = filtered_df[filtered_df['Cuisine_list'].apply(
+            lambda x: cuisine in x if isinstance(x, list) else False
+        )]
+        if not cuisine_data.empty:
+            total_restaurants = cuisine_data['Count'].sum()
+            starred_data = cuisine_data[cuisine_data['Award'].isin(selected_star_awards)]
+            starred_count = starred_data['Count'].sum()
+            if starred_count > 0:
+                total_score = 0
+                for _, row in starred_data.iterrows():
+                    total_score += row['Count'] * award_mapping[row['Award']]
+                avg_award_score = total_score / starred_count
+            else:
+                avg_award_score = 0
+            avg_price_level = cuisine_restaurants['Price_level'].mean() if len(cuisine_restaurants) > 0 else 0
+            stats_data.append({
+                'Cuisine': cuisine,
+                'Restaurant_Count': total_restaurants,
+                'Avg_Price_Level': avg_price_level,
+                'Starred_Count': starred_count,
+                'Avg_Award_Score': avg_award_score
+            })
+    return pd.DataFrame(stats_data) if stats_data else pd.DataFrame()
+
+def first_rows(df):
+    """菜系 -> 首次出现的行"""
+    first = {}
+    for position, cuisines in enumerate(df['Cuisine_list']):
+        for cuisine in cuisines:
+            first.setdefault(cuisine, position)
+    return first
+
+def assert_same_ranking(cuisines, expected, df):
+    """排名一致：数量序列与并列时的首次出现行一致（同一行内的菜系顺序原实现依赖集合迭代顺序，不作要求）"""
+    counts = reference_cuisine_counts(df)
+    first = first_rows(df)
+    assert [counts[c] for c in cuisines] == [counts[c] for c in expected]
+    assert [first[c] for c in cuisines] == [first[c] for c in expected]
+
+# ---- 与原实现对照 ----
+
+def test_unique_values(dataset, reference_df):
+    assert get_unique_cuisines(dataset) == reference_unique(reference_df, 'Cuisine_list')
+    assert get_unique_facilities(dataset) == reference_unique(reference_df, 'Facilities_list')
+
+def test_top_cuisines(dataset, reference_df):
+    assert_same_ranking(get_top_cuisines_by_restaurants(dataset, 12), reference_top_cuisines(reference_df, 12), reference_df)
+
+def test_filtered_ranking(dataset, reference_df, cube_specs, row_specs):
+    for spec in cube_specs + row_specs:
+        filtered_df = reference_filter(reference_df, spec)
+        rows = select(dataset, spec)
+        np.testing.assert_array_equal(rows, filtered_df.index.to_numpy())
+
+        ranking = get_cuisine_ranking(dataset, rows)
+        counts = reference_cuisine_counts(filtered_df)
+        assert dict(zip(ranking['Cuisine'], ranking['Restaurant_Count'].tolist())) == counts
+        assert_same_ranking(ranking['Cuisine'].tolist(), reference_top_cuisines(filtered_df, len(counts)), filtered_df)
+        assert_same_ranking(
+            get_filtered_top_cuisines_by_restaurants(dataset, rows, 10), reference_top_cuisines(filtered_df, 10), filtered_df
+        )
+        assert count_cities(dataset, rows) == filtered_df['City'].nunique()
+
+@pytest.mark.parametrize('awards', [AWARDS, ['1 Star', '3 Stars'], ['Bib Gourmand']])
+def test_cuisine_award_tables(dataset, reference_df, cube_specs, row_specs, awards):
+    for spec in cube_specs + row_specs:
+        spec_awards = [award for award in awards if not spec.awards or award in spec.awards]
+        filtered_df = reference_filter(reference_df, spec)
+        top = reference_top_cuisines(filtered_df, 10) + ['Martian']
+        distribution_df, stats_df = calculate_cuisine_award_tables(dataset, select(dataset, spec), top, spec_awards)
+        # 原实现在空数据框上按列名取值会出错（仪表盘中此时菜系列表为空，不会调用）
+        expected = reference_distribution(filtered_df, top, spec_awards) if len(filtered_df) else pd.DataFrame()
+        if expected.empty:
+            assert distribution_df.empty and stats_df.empty
+            continue
+        pd.testing.assert_frame_equal(distribution_df, expected, check_dtype=False)
+        pd.testing.assert_frame_equal(
+            stats_df, reference_stats(expected, filtered_df, top, spec_awards), check_dtype=False
+        )
+
+def test_common_facilities(dataset, reference_df, cube_specs, row_specs):
+    for spec in cube_specs + row_specs:
+        counts = reference_filter(reference_df, spec)['Facilities_list'].explode().value_counts()
+        facilities = get_common_facilities(dataset, select(dataset, spec), 15)
+        assert [counts[f] for f in facilities] == counts.nlargest(15).tolist()
@@ -0,0 +1,44 @@
+"""查询结果缓存：键包含数据集指纹，数据变化后旧结果不再命中"""
+import pandas as pd
+
+from michelin import FilterSpec, ResultCache, apply_delta, cache_key, get_cuisine_ranking, select
+
+def test_key_normalizes_arguments():
+    spec = FilterSpec(awards=['2 Stars', '1 Star'])
+    assert cache_key('ranking', spec, 'abc', ['x', 'y'], 10) == cache_key('ranking', FilterSpec(awards=('1 Star', '2 Stars')), 'abc', ('x', 'y'), 10)
+    assert hash(cache_key('ranking', spec, 'abc', ['x', 'y']))
+
+def test_fingerprint_separates_entries():
+    cache = ResultCache()
+    spec = FilterSpec(continent='Europe')
+    cache.put(cache_key('ranking', spec, 'v1'), 'old')
+    assert cache.get(cache_key('ranking', spec, 'v1')) == 'old'
+    assert cache.get(cache_key('ranking', spec, 'v2')) is None
+    assert cache.get(cache_key('ranking', FilterSpec(), 'v1')) is None
+    assert (cache.stats['hits'], cache.stats['misses']) == (1, 2)
+
+def test_disk_layer_keyed_on_fingerprint(tmp_path):
+    spec = FilterSpec(price_levels=(4,))
+    ResultCache(disk_dir=str(tmp_path)).put(cache_key('counts', spec, 'v1'), pd.Series([1, 2]))
+    # 新实例（模拟服务重启）只从磁盘层读取
+    cache = ResultCache(disk_dir=str(tmp_path))
+    pd.testing.assert_series_equal(cache.get(cache_key('counts', spec, 'v1')), pd.Series([1, 2]))
+    assert cache.get(cache_key('counts', spec, 'v2')) is None
+    assert (cache.stats['disk_hits'], cache.stats['misses']) == (1, 1)
+
+def test_delta_invalidates_results(dataset, raw_frame):
+    """应用增量后指纹变化，按新指纹重新计算，原版本的结果仍可命中"""
+    cache = ResultCache()
+    spec = FilterSpec()
+
+    def ranking(version):
+        return cache.get_or_compute(
+            cache_key('ranking', spec, version.fingerprint), lambda: get_cuisine_ranking(version, select(version, spec))
+        )
+
+    before = ranking(dataset)
+    updated = apply_delta(dataset, raw_frame.iloc[:50][['Name', 'Address']].assign(Operation='delete'))
+    after = ranking(updated)
+    assert after['Restaurant_Count'].sum() < before['Restaurant_Count'].sum()
+    assert ranking(dataset) is before
+    assert (cache.stats['hits'], cache.stats['misses']) == (1, 2)
@@ -0,0 +1,77 @@
+"""预聚合立方体：可由立方体回答的条件下与逐行计算对照，含增量更新与修正表并回"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from michelin import (
+    FilterSpec,
+    apply_delta,
+    build_cube,
+    calculate_award_price_distribution,
+    calculate_cuisine_award_tables,
+    count_cities,
+    get_city_counts,
+    get_common_facilities,
+    get_cuisine_ranking,
+    select,
+)
+from michelin import cube
+from michelin.cube import cube_supports, select_cells
+
+AWARDS = ['1 Star', '2 Stars', '3 Stars', 'Bib Gourmand']
+
+def assert_cube_matches_rows(dataset, specs):
+    for spec in specs:
+        assert cube_supports(spec)
+        rows = select(dataset, spec)
+        assert dataset.cube.counts.take(select_cells(dataset.cube, spec)).sum() == len(rows)
+        assert count_cities(dataset, rows, spec) == count_cities(dataset, rows)
+        pd.testing.assert_frame_equal(get_city_counts(dataset, rows, spec), get_city_counts(dataset, rows))
+        pd.testing.assert_frame_equal(
+            calculate_award_price_distribution(dataset, rows, spec), calculate_award_price_distribution(dataset, rows),
+            check_index_type=False, check_column_type=False
+        )
+        assert get_common_facilities(dataset, rows, 15, spec) == get_common_facilities(dataset, rows, 15)
+        top = get_cuisine_ranking(dataset, rows)['Cuisine'].head(10).tolist() + ['Martian', 'Unknown Cuisine']
+        for awards in (AWARDS, ['2 Stars'], []):
+            for cube_table, row_table in zip(
+                calculate_cuisine_award_tables(dataset, rows, top, awards, spec),
+                calculate_cuisine_award_tables(dataset, rows, top, awards)
+            ):
+                pd.testing.assert_frame_equal(cube_table, row_table)
+
+def make_delta(raw_frame, seed):
+    """改评级与价格、删除、插入新城市与新菜系/设施"""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(raw_frame), 45, replace=False)
+    updates = raw_frame.iloc[picks[:20]].assign(Award='3 Stars', Price='€€€€', Price_level=4)
+    deletes = raw_frame.iloc[picks[20:30]][['Name', 'Address']].assign(Operation='delete')
+    inserts = raw_frame.iloc[picks[30:]].assign(
+        Name=lambda d: d['Name'] + f' N{seed}',
+        Location='Atlantis, France',
+        Cuisine=f'Martian{seed}, Modern Cuisine',
+        FacilitiesAndServices=f'Moon view {seed},Terrace',
+    )
+    return pd.concat([updates, deletes, inserts], ignore_index=True)
+
+def test_cube_matches_rows(dataset, cube_specs):
+    assert_cube_matches_rows(dataset, cube_specs)
+
+def test_row_specs_skip_cube(row_specs):
+    assert not any(cube_supports(spec) for spec in row_specs)
+    assert not cube_supports(FilterSpec(query='tasting menu'))
+
+@pytest.mark.parametrize('min_merge_cells', [cube.MIN_MERGE_CELLS, 8])
+def test_updated_cube(monkeypatch, dataset, raw_frame, cube_specs, min_merge_cells):
+    """增量更新后的立方体（修正表未并回 / 已并回）与逐行计算、重建的立方体一致"""
+    monkeypatch.setattr(cube, 'MIN_MERGE_CELLS', min_merge_cells)
+    versions = [dataset]
+    for seed in range(3):
+        versions.append(apply_delta(versions[-1], make_delta(raw_frame, seed)))
+    updated = versions[-1]
+    patched = len(updated.cube.counts.patch_cells) > 0
+    assert patched == (min_merge_cells == cube.MIN_MERGE_CELLS)
+    assert_cube_matches_rows(updated, cube_specs)
+    assert updated.cube.counts.dense().sum() == build_cube(updated).counts.dense().sum() == updated.live.sum()
+    # 原版本的立方体不受影响
+    assert_cube_matches_rows(dataset, cube_specs)
@@ -0,0 +1,33 @@
+"""数据加载：流式分块解析与一次性解析结果一致"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_restaurants
+from michelin import compact_frame, data, load_data, parse_csv
+from michelin.data import CATEGORY_COLUMNS, stream_csv
+
+@pytest.fixture
+def sparse_csv(tmp_path):
+    """前 PROBE_ROWS 行（默认的首块）评级、价格全部缺失，其后500行菜系全部缺失"""
+    df = generate_restaurants(3000, seed=3)
+    df.loc[:data.PROBE_ROWS - 1, ['Award', 'Price']] = np.nan
+    df.loc[data.PROBE_ROWS:data.PROBE_ROWS + 499, 'Cuisine'] = np.nan
+    path = tmp_path / 'sparse.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+def test_stream_all_missing_chunks(monkeypatch, sparse_csv):
+    monkeypatch.setattr(data, 'PROBE_ROWS', 500)
+    streamed = stream_csv(sparse_csv, chunk_memory=1)
+    expected = compact_frame(parse_csv(sparse_csv))
+    pd.testing.assert_frame_equal(streamed, expected)
+    assert streamed['Award'].iloc[:2000].isna().all()
+
+def test_load_data_streaming(sparse_csv):
+    """默认的流式加载（首块 PROBE_ROWS 行整块缺失评级）与整表解析一致，快照往返后不变"""
+    expected = compact_frame(parse_csv(sparse_csv))
+    pd.testing.assert_frame_equal(load_data(sparse_csv), expected)
+    # 第二次从快照读取（缺失的文本在快照中为 None），分类列的类别与编码不变
+    reloaded = load_data(sparse_csv)
+    pd.testing.assert_frame_equal(reloaded[CATEGORY_COLUMNS], expected[CATEGORY_COLUMNS])
@@ -0,0 +1,100 @@
+"""增量更新与全量重建对照：筛选结果、菜系排名、星级×价格交叉表、城市计数与城市坐标"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from michelin import (
+    apply_delta,
+    build_dataset,
+    calculate_award_price_distribution,
+    compact_frame,
+    derive_columns,
+    get_city_counts,
+    get_cuisine_ranking,
+    select,
+)
+from michelin.geo import city_coordinates
+
+def make_delta(raw_frame, seed, tag):
+    """一批增量：更新（改评级与价格）、删除、插入（含新城市、新菜系和新设施）"""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(raw_frame), 60, replace=False)
+    updates = raw_frame.iloc[picks[:25]].assign(Award='3 Stars', Price='€€€€', Price_level=4)
+    deletes = raw_frame.iloc[picks[25:40]][['Name', 'Address']].assign(Operation='delete')
+    inserts = raw_frame.iloc[picks[40:]].assign(
+        Name=lambda d: d['Name'] + f' {tag}',
+        Location='Atlantis, France',
+        Cuisine='Martian, Modern Cuisine',
+        FacilitiesAndServices='Moon view,Terrace',
+        Latitude=48.0,
+        Longitude=2.0,
+    )
+    return pd.concat([updates, deletes, inserts], ignore_index=True)
+
+def replay(raw_frame, delta):
+    """增量对应的原始记录：去掉涉及的餐厅，插入/更新的记录按增量顺序追加到末尾"""
+    touched = pd.MultiIndex.from_frame(delta[['Name', 'Address']])
+    keep = ~pd.MultiIndex.from_frame(raw_frame[['Name', 'Address']]).isin(touched)
+    upserts = delta[delta['Operation'].isna()].drop(columns='Operation')
+    return pd.concat([raw_frame[keep], upserts], ignore_index=True)
+
+def rebuild(raw_frame):
+    return build_dataset(compact_frame(derive_columns(raw_frame.copy())))
+
+def keys(dataset, rows):
+    return list(zip(dataset.column('Name', rows), dataset.column('Address', rows)))
+
+def assert_equivalent(updated, rebuilt, specs):
+    for spec in specs:
+        rows, expected_rows = select(updated, spec), select(rebuilt, spec)
+        assert keys(updated, rows) == keys(rebuilt, expected_rows)
+
+        ranking, expected = get_cuisine_ranking(updated, rows), get_cuisine_ranking(rebuilt, expected_rows)
+        # 新菜系排在增量词表末尾，同一行内并列的菜系顺序可能不同，逐项比较数量
+        assert ranking['Restaurant_Count'].tolist() == expected['Restaurant_Count'].tolist()
+        assert dict(zip(ranking['Cuisine'], ranking['Restaurant_Count'])) == dict(zip(expected['Cuisine'], expected['Restaurant_Count']))
+
+        for by_spec in (spec, None):
+            pd.testing.assert_frame_equal(
+                calculate_award_price_distribution(updated, rows, by_spec),
+                calculate_award_price_distribution(rebuilt, expected_rows, by_spec),
+                check_index_type=False, check_column_type=False
+            )
+            pd.testing.assert_frame_equal(get_city_counts(updated, rows, by_spec), get_city_counts(rebuilt, expected_rows, by_spec))
+
+    cities, expected = updated.cities.frame, rebuilt.cities.frame
+    pd.testing.assert_frame_equal(cities.drop(columns=['Lat', 'Lon']), expected.drop(columns=['Lat', 'Lon']))
+    np.testing.assert_allclose(cities[['Lat', 'Lon']], expected[['Lat', 'Lon']])
+    pd.testing.assert_frame_equal(cities, city_coordinates(updated).frame)
+
+@pytest.fixture(scope='module')
+def deltas(raw_frame):
+    return make_delta(raw_frame, 1, 'A'), make_delta(raw_frame, 2, 'B')
+
+def test_single_delta(dataset, raw_frame, deltas, cube_specs, row_specs):
+    updated = apply_delta(dataset, deltas[0])
+    assert updated.fingerprint != dataset.fingerprint
+    assert updated.live.sum() == len(replay(raw_frame, deltas[0]))
+    assert_equivalent(updated, rebuild(replay(raw_frame, deltas[0])), cube_specs + row_specs)
+
+def test_chained_deltas(dataset, raw_frame, deltas, cube_specs, row_specs):
+    updated = apply_delta(apply_delta(dataset, deltas[0]), deltas[1])
+    expected = rebuild(replay(replay(raw_frame, deltas[0]), deltas[1]))
+    assert_equivalent(updated, expected, cube_specs + row_specs)
+
+def test_branched_versions(dataset, raw_frame, deltas, cube_specs, row_specs):
+    """同一版本先后应用两批增量：两个新版本互不影响，原版本不变"""
+    before = [keys(dataset, select(dataset, spec)) for spec in cube_specs]
+    first = apply_delta(dataset, deltas[0])
+    second = apply_delta(dataset, deltas[1])
+    assert_equivalent(first, rebuild(replay(raw_frame, deltas[0])), cube_specs + row_specs)
+    assert_equivalent(second, rebuild(replay(raw_frame, deltas[1])), cube_specs + row_specs)
+    assert [keys(dataset, select(dataset, spec)) for spec in cube_specs] == before
+    assert_equivalent(dataset, rebuild(raw_frame), cube_specs)
+
+def test_delete_only(dataset, raw_frame):
+    delta = raw_frame.iloc[:10][['Name', 'Address']].assign(Operation='delete')
+    updated = apply_delta(dataset, delta)
+    assert updated.n_rows == dataset.n_rows
+    assert updated.live.sum() == dataset.live.sum() - 10
+    assert_equivalent(updated, rebuild(raw_frame.iloc[10:]), [])
@@ -0,0 +1,89 @@
+"""空间索引与逐点暴力计算对照，含180°经线两侧与高纬度的点"""
+import numpy as np
+import pytest
+
+from michelin import build_spatial_index, haversine_km, spatial
+
+def random_points(seed, n=4000):
+    """全球随机点 + 聚集在180°经线两侧和极地附近的点，约2%缺少坐标"""
+    rng = np.random.default_rng(seed)
+    lat = np.concatenate([rng.uniform(-90, 90, n), rng.uniform(-20, 20, n // 4), rng.uniform(80, 90, n // 8)])
+    lon = np.concatenate([rng.uniform(-180, 180, n), rng.uniform(177, 183, n // 4), rng.uniform(-180, 180, n // 8)])
+    lon = np.where(lon >= 180, lon - 360, lon)
+    missing = rng.random(len(lat)) < 0.02
+    lat[missing] = np.nan
+    return lat, lon
+
+def brute_radius(lat, lon, center_lat, center_lon, radius_km):
+    distances = haversine_km(center_lat, center_lon, lat, lon)
+    return np.flatnonzero(distances <= radius_km)
+
+def brute_bbox(lat, lon, lat_min, lat_max, lon_min, lon_max):
+    in_lat = (lat >= lat_min) & (lat <= lat_max)
+    if lon_min <= lon_max:
+        in_lon = (lon >= lon_min) & (lon <= lon_max)
+    else:
+        in_lon = (lon >= lon_min) | (lon <= lon_max)
+    return np.flatnonzero(in_lat & in_lon)
+
+RADIUS_QUERIES = [
+    (48.85, 2.35, 500.0),
+    (0.0, 179.9, 300.0),       # 中心紧挨180°经线
+    (-5.0, -179.5, 800.0),
+    (10.0, 180.0, 150.0),
+    (89.5, 0.0, 200.0),        # 覆盖北极
+    (-60.0, 120.0, 3000.0),
+    (0.0, 0.0, 25000.0),       # 覆盖全球
+    (20.0, 30.0, 0.0),
+]
+
+BBOX_QUERIES = [
+    (40.0, 55.0, -10.0, 20.0),
+    (-20.0, 20.0, 175.0, -175.0),   # 跨越180°经线
+    (-90.0, 90.0, 179.0, -179.0),
+    (-10.0, 10.0, 170.0, 180.0),
+    (-10.0, 10.0, -180.0, -170.0),
+    (80.0, 90.0, -180.0, 180.0),
+    (5.0, 5.0, 10.0, 10.0),
+]
+
+@pytest.fixture(scope='module', params=[0.25, 0.7, 2.0])
+def points(request):
+    lat, lon = random_points(0)
+    return lat, lon, build_spatial_index(lat, lon, cell_deg=request.param)
+
+@pytest.mark.parametrize('query', RADIUS_QUERIES)
+def test_within_radius(points, query):
+    lat, lon, index = points
+    rows, distances = index.within_radius(*query)
+    np.testing.assert_array_equal(rows, brute_radius(lat, lon, *query))
+    np.testing.assert_allclose(distances, haversine_km(query[0], query[1], lat[rows], lon[rows]))
+
+@pytest.mark.parametrize('query', BBOX_QUERIES)
+def test_within_bbox(points, query):
+    lat, lon, index = points
+    np.testing.assert_array_equal(index.within_bbox(*query), brute_bbox(lat, lon, *query))
+
+@pytest.mark.parametrize('lon_min, lon_max', [(-156.196, -156.210), (10.0, 9.9), (179.95, 179.9), (-179.9, -179.95)])
+def test_bbox_spanning_almost_360(points, lon_min, lon_max):
+    """跨越180°经线、经度跨度略小于360°的矩形：两端落在同一网格时仍须扫描整条纬度带"""
+    lat, lon, index = points
+    rows = index.within_bbox(-84.43, 56.94, lon_min, lon_max)
+    np.testing.assert_array_equal(rows, brute_bbox(lat, lon, -84.43, 56.94, lon_min, lon_max))
+    assert len(rows) > 0.9 * len(brute_bbox(lat, lon, -84.43, 56.94, -180.0, 180.0))
+
+@pytest.mark.parametrize('merged', [False, True])
+def test_appended_points(monkeypatch, merged):
+    """追加的点先在缓冲区中逐点比较，超过阈值后并入网格，两种状态的结果都应与暴力计算一致"""
+    if merged:
+        monkeypatch.setattr(spatial, 'MIN_MERGE_POINTS', 100)
+    lat, lon = random_points(1)
+    n_base = len(lat) - 500
+    index = build_spatial_index(lat[:n_base], lon[:n_base])
+    index = index.appended(np.arange(n_base, len(lat)), lat[n_base:], lon[n_base:])
+    assert (len(index.extra_rows) == 0) == merged
+    for query in RADIUS_QUERIES:
+        rows, _ = index.within_radius(*query)
+        np.testing.assert_array_equal(rows, brute_radius(lat, lon, *query))
+    for query in BBOX_QUERIES:
+        np.testing.assert_array_equal(index.within_bbox(*query), brute_bbox(lat, lon, *query))